@@ -1,9 +1,11 @@
 import streamlit as st
 import pandas as pd
 import json
-from groq import Groq
 from dotenv import load_dotenv
-import os
+import llm_pipeline
+from llm_pipeline import SAMPLING_PARAMS, LLMConfigError
+from model_router import SMALL_MODEL
+from schema_compiler import compile_schema
 
 load_dotenv()
 
@@ -18,18 +20,29 @@ def load_schema():
         st.stop()
 
 
-def llm(schema, prompt):
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+@st.cache_resource
+def get_shared_client():
+    # One pooled client for every session and rerun; errors are not cached
+    return llm_pipeline.get_client()
 
+def get_client():
+    try:
+        return get_shared_client()
+    except LLMConfigError as e:
+        st.error(str(e))
+        st.stop()
+
+
+def llm(schema, prompt, client):
     completion = client.chat.completions.create(
-        model="openai/gpt-oss-20b",
+        model=SMALL_MODEL,
         messages=[
             {
                 "role": "user",
                 "content": (
                     "You are a JSON converter for trading strategies.\n"
                     "Convert user instructions into JSON blocks conforming to this schema:\n"
-                    f"{schema}"
+                    f"{compile_schema(schema, prompt)}"
                 )
             },
             {
@@ -41,9 +54,7 @@ def llm(schema, prompt):
                 "content": prompt
             }
         ],
-        temperature=0.2,
-        max_completion_tokens=4096,
-        top_p=1,
+        **SAMPLING_PARAMS,
     )
 
     return completion.choices[0].message.content
@@ -67,9 +78,11 @@ if run:
         st.error("Please enter a strategy instruction.")
         st.stop()
 
+    client = get_client()
     with st.spinner("🔄 Generating JSON using LLM..."):
+        raw_json_output = None
         try:
-            raw_json_output = llm(schema, prompt)
+            raw_json_output = llm(schema, prompt, client)
             parsed_data = json.loads(raw_json_output)
         except Exception as e:
             st.error(f"❌ Error generating or parsing JSON: {e}")
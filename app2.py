@@ -1,85 +1,112 @@
 import streamlit as st
 import pandas as pd
 import json
-from groq import Groq
 from dotenv import load_dotenv
-import os
-from json_to_yaml import convert_json_to_text
+from json_patch import JSONPatchError
+from json_to_yaml import phase_lines, render_phase_texts, set_header_lines
+from keyword_catalog import get_catalog
+from llm_cache import LLMCache
+import llm_pipeline
+import metrics
+from llm_pipeline import SAMPLING_PARAMS, MAX_VALIDATION_RETRIES, LLMConfigError, llm_completion, llm_stream
+from schema_registry import SchemaLoadError
+from schema_validator import correction_message, get_validator
+from strategy_model import load_strategy, render_strategy
+from stream_parser import IncrementalPhaseParser, StreamJSONError
+from text_to_json import TextParseError, parse_strategy_text
+import json_repair
+import fast_path
+from json_repair import repair_json, reask_message, truncation_message
 import time
 
 load_dotenv()
 
-SCHEMA_PATH = "schemas/test_schemav3.json"
+schemas = llm_pipeline.schemas
 
-def load_schema():
+def load_schema(name):
+    # Parsed once per file content; a rerun only stat()s the file
     try:
-        with open(SCHEMA_PATH, "r") as f:
-            return json.load(f)
-    except Exception as e:
-        st.error(f"Error loading schema from {SCHEMA_PATH}: {e}")
+        return schemas.get(name)
+    except SchemaLoadError as e:
+        st.error(f"Error loading schema: {e}")
         st.stop()
 
-def llm(schema, prompt):
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        st.error("GROQ_API_KEY not found in environment variables.")
+@st.cache_resource
+def get_shared_client():
+    # One pooled client for every session and rerun; errors are not cached
+    return llm_pipeline.get_client()
+
+def get_client():
+    try:
+        return get_shared_client()
+    except LLMConfigError as e:
+        st.error(str(e))
         st.stop()
 
-    client = Groq(api_key=api_key)
+@st.cache_resource
+def start_metrics_endpoint():
+    # One /metrics listener per process, only when METRICS_PORT is set
+    return metrics.serve_metrics() if metrics.METRICS_PORT else None
 
-    system_rules = """
-    CRITICAL RULES:
-    1. DEFAULT CONDITION: If the user DOES NOT specify an explicit entry condition (e.g., they just say "Buy Call"), you MUST generate this default condition:
-       LTP(Underlying Instrument) > 0.
-       Do NOT generate "1 >= 1" or empty groups.
-    
-    2. OFFSET PARSING:
-       - If user says "ATM+2" or "2 strikes OTM", set 'selection_method': 'ATM' and 'offset': 2.
-       - If user says "ATM-1", set 'selection_method': 'ATM' and 'offset': -1.
-       - If user says "ITM", set 'selection_method': 'ITM' (or offset as appropriate).
-
-    3. STRANGLE / OTM LOGIC (VERY IMPORTANT):
-       - If the user asks for a "Strangle" or mentions "+/- X strikes" (e.g. "+-2"):
-         - The CALL option MUST have a POSITIVE offset (e.g., offset: 2).
-         - The PUT option MUST have a NEGATIVE offset (e.g., offset: -2).
-       - Never use the same positive offset for both legs in a Strangle.
+def generate_streaming(schema, prompt, placeholder, prune_schema=True, correction=None, schema_version=None, trace=None,
+                       route=None):
     """
-    completion = client.chat.completions.create(
-        model="openai/gpt-oss-120b", # Ensure this model is available in your Groq tier
-        messages=[
-            {
-                "role": "user",
-                "content": (
-                    "You are a JSON converter for trading strategies.\n"
-                    "You are a trading strategy assistant. Output ONLY valid JSON.\n"
-                    f"{system_rules}\n"
-                    "Convert user instructions into JSON blocks conforming to this schema:\n"
-                    f"{schema}"
-                )
-            },
-            {
-                "role": "user",
-                "content": "Now convert the following input into JSON. And only give the final json nothing else:"
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        temperature=0.2,
-        max_completion_tokens=4096,
-        top_p=1,
+    Parses the stream incrementally and renders each phase as soon as it closes.
+    Returns (raw_text, parsed_data, repair_stage, finish_reason).
+    """
+    trace = trace or metrics.Trace()
+    parser = IncrementalPhaseParser()
+    lines = []
+    last_set = None
+    deltas = llm_stream(
+        schema, prompt, prune_schema, correction,
+        client=get_client(), schema_version=schema_version, trace=trace, route=route,
+    )
+    try:
+        for delta in deltas:
+            for set_position, set_index, phase in parser.feed(delta):
+                if set_position != last_set:
+                    lines.extend(set_header_lines(set_index if set_index is not None else set_position + 1))
+                    last_set = set_position
+                lines.extend(phase_lines(phase))
+                placeholder.code("\n".join(lines), language="yaml")
+        raw_text, parsed_data, stage = parser.document_text, parser.close(), "direct"
+    except StreamJSONError:
+        # Rendering stops at the first bad token; the rest is collected for local repair
+        raw_text = parser.text + "".join(deltas)
+        with trace.span("parse") as span:
+            parsed_data, stage = repair_json(raw_text)
+            span.set(repair_stage=stage)
+    # llm_stream records why the stream ended on its llm_call span
+    finish_reason = next(
+        (span.attrs.get("finish_reason") for span in reversed(trace.spans) if span.name == "llm_call"), None,
     )
+    return raw_text, parsed_data, stage, finish_reason
 
-    return completion.choices[0].message.content
+@st.cache_resource
+def get_semantic_cache():
+    # Process-wide like the LLM cache: every session's conversions can be reused
+    return llm_pipeline.semantic_cache
+
+@st.cache_resource
+def get_llm_cache():
+    # Shared across reruns and sessions so the in-memory tier survives widget interactions
+    return LLMCache()
 
 st.set_page_config(page_title="Strategy JSON Visualizer", layout="wide")
 
 st.title("Trading Strategy JSON Visualizer")
-st.caption(f"Using schema: `{SCHEMA_PATH}`")
+schema_names = schemas.available()
+schema_name = st.selectbox(
+    "Schema", schema_names,
+    index=schema_names.index(schemas.active) if schemas.active in schema_names else 0,
+)
 
 # Load schema now
-schema = load_schema()
+schema_entry = load_schema(schema_name)
+schema = schema_entry.schema
+st.caption(f"Using schema: `{schema_entry.path}` ({schema_entry.tokens} schema tokens unpruned)")
+start_metrics_endpoint()
 
 # Create layout
 col1, col2 = st.columns([1, 1])
@@ -87,68 +114,431 @@ col1, col2 = st.columns([1, 1])
 with col1:
     st.subheader("Input")
     prompt = st.text_area("Enter strategy instruction", height=150, placeholder="e.g. Buy Nifty ATM Call if Time > 9:30")
+    bypass_cache = st.checkbox("Bypass response cache", value=False)
+    stream_output = st.checkbox("Stream output", value=True)
+    use_fast_path = st.checkbox("Skip the LLM for common templates", value=True)
+    use_semantic_cache = st.checkbox("Reuse conversions of near-identical prompts", value=True)
+    use_routing = st.checkbox("Send simple prompts to the small model", value=True)
+    use_hedging = st.checkbox("Race a second request when the first is slow", value=False)
+    high_priority = st.checkbox("High priority (race from the start)", value=False, disabled=not use_hedging)
+    show_diagnostics = st.checkbox("Show diagnostics", value=False)
+    # Without an earlier strategy in this session the prompt is converted as usual
+    edit_last = st.checkbox("Edit the last strategy (send only the change)", value=False)
     run = st.button("Generate")
 
 MAX_RETRIES = 5
 RETRY_DELAY = 0
 
-if run:
+# --- FOLLOW-UP EDIT: the model returns a JSON Patch against the last strategy instead of all of it ---
+edit_done = False
+if run and edit_last and prompt.strip() and "strategy_json" in st.session_state:
+    try:
+        with st.spinner("🔄 Editing the last strategy"):
+            edit_result = llm_pipeline.edit_strategy(
+                schema, st.session_state["strategy_json"], prompt, client=get_client(),
+                schema_version=schema_entry.version, phase_texts=st.session_state.get("phase_texts"),
+            )
+    except (json.JSONDecodeError, JSONPatchError) as e:
+        st.warning(f"Could not apply the change as a patch ({e}); regenerating the whole strategy.")
+    except Exception as e:
+        # API and other failures: regenerating would most likely fail the same way
+        st.error(f"An unexpected error occurred while editing: {e}")
+        st.stop()
+    else:
+        edit_done = True
+        strategy = load_strategy(edit_result["json"])
+        st.session_state["strategy"] = strategy
+        st.session_state["strategy_json"] = edit_result["json"]
+        st.session_state["strategy_text"] = edit_result["text"]
+        st.session_state["phase_texts"] = edit_result["phase_texts"]
+        st.session_state["strategy_revision"] += 1
+        if edit_result.get("validation_errors"):
+            st.warning(
+                "Edited strategy does not fully conform to the schema:\n"
+                + "\n".join(f"- `{pointer or '/'}`: {message}" for pointer, message in edit_result["validation_errors"][:10])
+            )
+        st.success("✔ Edited successfully!")
+        llm_calls = [span for span in edit_result["spans"] if span["span"] == "llm_call"]
+        st.caption(
+            f"Patch: {len(edit_result['patch'])} operation(s) | "
+            f"completion tokens {sum(span['completion_tokens'] for span in llm_calls)} | "
+            f"phases re-rendered: {edit_result['rerendered']} | model {edit_result['route']['model']}"
+        )
+        with col2:
+            st.subheader("Output")
+            st.code(edit_result["text"], language="yaml")
+            with st.expander("View Patch"):
+                st.json(edit_result["patch"])
+            with st.expander("View Raw JSON"):
+                st.json(edit_result["json"])
+        if show_diagnostics:
+            with st.expander("Diagnostics", expanded=True):
+                st.dataframe(pd.DataFrame(edit_result["spans"]))
+
+if run and not edit_done:
     if not prompt.strip():
         st.error("Please enter a strategy instruction.")
         st.stop()
 
+    trace = metrics.Trace("app")
     retry_count = 0
     parsed_data = None # Initialize parsed_data outside the loop
     raw_json_output = None # Initialize raw_json_output outside the loop
 
+    # --- ROUTING: simple prompts go to the small model, escalating if its output is unusable ---
+    router = llm_pipeline.router
+    route, complexity = router.route(prompt, schema_entry.keyword_index, allow_small=use_routing)
+    trace.event("route", route=route.name, score=complexity.score)
+    escalated = False
+    prune_schema = True
+
+    llm_cache = get_llm_cache()
+    # Keyed by the first route, so an escalated answer is served without retrying the small model
+    cache_key = llm_cache.make_key(
+        prompt, schema_entry.version, route.model,
+        {**SAMPLING_PARAMS, "max_completion_tokens": route.max_completion_tokens},
+    )
+    use_cache = not bypass_cache
+    correction = None # Set after a failed local repair or a schema violation
+    repair_stage = None
+    with trace.span("schema_load", schema=schema_entry.name):
+        validator = get_validator(schema, schema_entry.version)
+        catalog = get_catalog(schema, schema_entry.version)
+    keyword_fixes = []
+    validation_issues = []
+    validation_retries = 0
+    invalid_attempt = None # Last parsed-but-invalid output, rendered if re-asks run out
+    truncated_attempt = None # Last output cut off at the token limit, rendered only as a last resort
+    cut_off = False
+    hedge_result = None
+
+    if stream_output:
+        with col2:
+            st.subheader("Output")
+            stream_placeholder = st.empty()
+
+    # --- FAST PATH: formulaic prompts are parsed locally ---
+    with trace.span("fast_path", enabled=use_fast_path) as span:
+        # Templates build v3 JSON: a schema that rejects it sends the prompt to the LLM
+        fast = fast_path.parse(prompt, validator=validator) if use_fast_path else None
+        span.set(hit=fast is not None)
+    if fast is not None:
+        parsed_data = fast.strategy
+        from_cache = False
+
+    # --- NEAR-DUPLICATE CACHE: an earlier conversion with this prompt's entities substituted ---
+    semantic_cache = get_semantic_cache()
+    semantic_hit = None
+    if parsed_data is None and use_semantic_cache and not bypass_cache:
+        with trace.span("semantic_lookup") as span:
+            semantic_hit = semantic_cache.lookup(prompt, schema_entry.version, validator)
+            span.set(hit=semantic_hit is not None)
+        if semantic_hit is not None:
+            parsed_data = semantic_hit.strategy
+            from_cache = False
+
     with st.spinner("🔄 Generating Output"):
-        while retry_count < MAX_RETRIES:
+        while parsed_data is None and retry_count < MAX_RETRIES:
             try:
+                # --- CACHE LOOKUP ---
+                with trace.span("cache_lookup", enabled=use_cache) as span:
+                    raw_json_output = llm_cache.get(cache_key) if use_cache else None
+                    from_cache = raw_json_output is not None
+                    span.set(hit=from_cache)
+
                 # --- LLM CALL ---
-                raw_json_output = llm(schema, prompt)
-                
-                # --- PARSING STEP ---
-                parsed_data = json.loads(raw_json_output)
+                # Retries fall back to the full keyword catalogue
+                hedge_now = use_hedging and retry_count == 0
+                hedge_checked = finish_reason = None
+                if from_cache:
+                    with trace.span("parse", source="cache"):
+                        parsed_data = json.loads(raw_json_output)
+                elif stream_output and not hedge_now:
+                    # --- STREAMING: phases are parsed and rendered as they close ---
+                    raw_json_output, parsed_data, repair_stage, finish_reason = generate_streaming(
+                        schema, prompt, stream_placeholder, prune_schema=prune_schema, correction=correction,
+                        schema_version=schema_entry.version, trace=trace, route=route,
+                    )
+                else:
+                    if hedge_now:
+                        # --- HEDGED: parallel attempts, the first valid one wins ---
+                        raw_json_output, route, hedge_checked, hedge_result = llm_pipeline.hedged_llm(
+                            schema, prompt, validator, client=get_client(), schema_version=schema_entry.version,
+                            trace=trace, route=route, priority=high_priority,
+                        )
+                        if isinstance(hedge_checked, json.JSONDecodeError):
+                            raise hedge_checked
+                    else:
+                        raw_json_output, finish_reason = llm_completion(
+                            schema, prompt, prune_schema=prune_schema, correction=correction,
+                            client=get_client(), schema_version=schema_entry.version, trace=trace, route=route,
+                        )
+
+                    if hedge_checked is not None:
+                        # The winning attempt was already repaired, canonicalized and validated
+                        parsed_data, repair_stage, keyword_fixes, _, validation_issues = hedge_checked
+                    else:
+                        # --- PARSING STEP (with local repair before any retry) ---
+                        with trace.span("parse") as span:
+                            parsed_data, repair_stage = repair_json(raw_json_output)
+                            span.set(repair_stage=repair_stage)
+
+                if repair_stage not in (None, "direct"):
+                    # Cache the repaired document so it is not repaired again
+                    raw_json_output = json.dumps(parsed_data)
+
+                # --- KEYWORDS: near-miss names are fixed locally instead of costing a re-ask ---
+                if hedge_checked is None:
+                    with trace.span("canonicalize") as span:
+                        keyword_fixes = catalog.canonicalize(parsed_data)
+                        span.set(rewrites=len(keyword_fixes))
+                if keyword_fixes and not from_cache:
+                    raw_json_output = json.dumps(parsed_data)
+
+                # --- VALIDATION: schema violations get one re-ask naming the broken paths ---
+                if hedge_checked is None:
+                    with trace.span("validate") as span:
+                        validation_issues = validator.validate(parsed_data)
+                        span.set(issues=len(validation_issues))
+
+                # --- TRUNCATION: output cut off at the token limit is re-asked, not balanced into a success ---
+                cut_off = not from_cache and (finish_reason == "length" or repair_stage == "balance")
+                if cut_off and retry_count + 1 < MAX_RETRIES:
+                    truncated_attempt = (raw_json_output, parsed_data, repair_stage, validation_issues)
+                    larger = router.escalate(route)
+                    if larger is not None:
+                        router.record_outcome(route, complexity, ok=False, escalated=True)
+                        route, correction, prune_schema, escalated = larger, None, True, True
+                        trace.retry("escalation", retry_count + 1)
+                    else:
+                        correction = truncation_message()
+                        prune_schema = False
+                        trace.retry("truncated", retry_count + 1)
+                    parsed_data = None
+                    retry_count += 1
+                    use_cache = False
+                    continue
+                larger = router.escalate(route) if not from_cache and retry_count + 1 < MAX_RETRIES else None
+                if validation_issues and larger is not None:
+                    # The small model's output breaks the schema: ask the large model afresh
+                    router.record_outcome(route, complexity, ok=False, escalated=True)
+                    invalid_attempt = (raw_json_output, parsed_data, repair_stage, validation_issues)
+                    route, correction, prune_schema, escalated = larger, None, True, True
+                    trace.retry("escalation", retry_count + 1)
+                    parsed_data = None
+                    retry_count += 1
+                    use_cache = False
+                    continue
+                if (validation_issues and not from_cache and validation_retries < MAX_VALIDATION_RETRIES
+                        and retry_count + 1 < MAX_RETRIES):
+                    validation_retries += 1
+                    invalid_attempt = (raw_json_output, parsed_data, repair_stage, validation_issues)
+                    correction = correction_message(validation_issues)
+                    prune_schema = False
+                    trace.retry("validation", retry_count + 1)
+                    parsed_data = None
+                    retry_count += 1
+                    use_cache = False
+                    continue
+
+                # Only outputs that parse (and were not cut short) are worth caching
+                if not from_cache and not cut_off:
+                    llm_cache.set(cache_key, raw_json_output)
                 
                 # If parsing succeeds, break the retry loop
-                st.success("JSON generated and parsed successfully!")
+                if not cut_off:
+                    st.success("JSON generated and parsed successfully!")
                 break 
             
             except json.JSONDecodeError as e:
                 # Handle specific JSON parsing error
+                # Local repair failed: the small model escalates, the large one gets a targeted re-ask
+                larger = router.escalate(route)
+                if larger is not None and not from_cache:
+                    router.record_outcome(route, complexity, ok=False, escalated=True)
+                    route, correction, prune_schema, escalated = larger, None, True, True
+                    trace.retry("escalation", retry_count + 1)
+                else:
+                    correction = reask_message(e)
+                    prune_schema = False
+                    trace.retry("json_decode", retry_count + 1)
+                raw_json_output = getattr(e, "original", raw_json_output)
+                parsed_data = None
                 retry_count += 1
+                use_cache = False # A bad cached entry must not be served again
                 if retry_count < MAX_RETRIES:
                     time.sleep(RETRY_DELAY) # Wait before the next attempt
                 
             except Exception as e:
                 # Handle other potential exceptions (e.g., LLM call failure)
                 st.error(f"An unexpected error occurred: {e}")
+                trace.close("error", "llm")
                 if 'raw_json_output' in locals() and raw_json_output:
                     with st.expander("See Raw Output"):
                         st.code(raw_json_output, language="json")
                 st.stop()
     
     # --- Post-Retry Logic ---
+    if parsed_data is None and invalid_attempt is not None:
+        # The re-ask did not produce usable JSON: fall back to the invalid but parseable output
+        raw_json_output, parsed_data, repair_stage, validation_issues = invalid_attempt
+        cut_off = False
+    elif parsed_data is None and truncated_attempt is not None:
+        # Last resort: the balanced document, flagged below because its tail is missing
+        raw_json_output, parsed_data, repair_stage, validation_issues = truncated_attempt
+        cut_off = True
+
     if parsed_data is not None:
         # Proceed only if data was successfully parsed
         # --- CONVERSION STEP ---
-        readable_text = convert_json_to_text(parsed_data)
+        # Parsed once into the typed model, which later tools reuse from the session
+        with trace.span("render"):
+            strategy = load_strategy(parsed_data)
+            st.session_state["strategy"] = strategy
+            readable_text = render_strategy(strategy)
+            # Kept for the edit pane, which parses edited text back against this document
+            st.session_state["strategy_json"] = parsed_data
+            st.session_state["strategy_text"] = readable_text
+            st.session_state["phase_texts"] = render_phase_texts(parsed_data)
+            st.session_state["strategy_revision"] = st.session_state.get("strategy_revision", 0) + 1
         st.success("Output conversion complete.")
         # st.write(readable_text) # Display the final result
     else:
         # This runs if the loop finished without successful parsing
         st.error(f"Failed to generate and parse valid JSON after {MAX_RETRIES} attempts.")
+        router.record_outcome(route, complexity, ok=False)
+        trace.close("parse_error", "llm")
         if raw_json_output:
             with st.expander("See Last Raw Output"):
                 st.code(raw_json_output, language="json")
         st.stop()
 
-    st.success("✔ Generated successfully!")
+    source = "fast_path" if fast is not None else "semantic_cache" if semantic_hit else "cache" if from_cache else "llm"
+    if source == "llm":
+        trace.registry.observe("attempts", retry_count + 1, metrics.COUNT_BUCKETS, help="LLM attempts per request")
+        router.record_outcome(route, complexity, ok=not validation_issues and not cut_off)
+    trace.close("truncated" if cut_off else "invalid" if validation_issues else "ok", source)
+    if source in ("llm", "cache") and not validation_issues and not cut_off:
+        semantic_cache.add(prompt, parsed_data, schema_entry.version)
+
+    if cut_off:
+        st.warning(
+            "The model's output was cut off at the token limit; only what was complete is shown. "
+            "Retry, or shorten the instruction."
+        )
+    if validation_issues:
+        st.warning(
+            "Output does not fully conform to the schema:\n"
+            + "\n".join(f"- `{issue.pointer or '/'}`: {issue.message}" for issue in validation_issues[:10])
+        )
+    if not cut_off:
+        st.success("✔ Generated successfully!")
+    if fast is not None:
+        st.caption(
+            f"Fast path: {fast.template} (confidence {fast.confidence:.0%}, "
+            f"{fast.elapsed_us:.0f} µs) | hit rate {fast_path.stats.report()['hit_rate']:.0%}"
+        )
+    if semantic_hit is not None:
+        changes = ", ".join(f"{field} {old} → {new}" for field, old, new in semantic_hit.substitutions) or "none"
+        st.caption(
+            f"Reused the conversion of “{semantic_hit.source_prompt}” "
+            f"(similarity {semantic_hit.similarity:.0%}; substituted {changes})"
+        )
+    if use_semantic_cache:
+        st.caption(
+            f"Near-duplicate cache: {semantic_cache.stats['entries']} prompts | "
+            f"hit rate {semantic_cache.hit_rate():.0%}"
+        )
+    stats = llm_cache.stats
+    st.caption(
+        f"Cache: {'hit' if from_cache else 'miss'} | "
+        f"hits {stats['memory_hits'] + stats['disk_hits']} "
+        f"(memory {stats['memory_hits']}, disk {stats['disk_hits']}) | "
+        f"misses {stats['misses']} | hit rate {llm_cache.hit_rate():.0%}"
+    )
+    if source == "llm":
+        st.caption(
+            f"Model: {route.model} ({route.name} route, complexity {complexity.score:g}"
+            f"{', escalated' if escalated else ''}) | max tokens {route.max_completion_tokens}"
+        )
+    if hedge_result is not None:
+        hedge_report = llm_pipeline.hedger.report()
+        st.caption(
+            f"Hedging: {hedge_result.launched} parallel attempt(s), "
+            f"{'attempt ' + str(hedge_result.winner + 1) + ' won' if hedge_result.ok else 'none valid'} | "
+            f"hedge rate {hedge_report['hedge_rate']:.0%} | extra tokens {hedge_report['extra_token_ratio']:.0%}"
+        )
+    if keyword_fixes:
+        st.caption("Keyword names corrected: " + ", ".join(f"{old} → {new}" for _, old, new, _ in keyword_fixes))
+    st.caption(
+        f"Parse: {repair_stage or 'direct'} | "
+        f"LLM calls saved by local repair: {json_repair.stats.llm_calls_saved}"
+    )
+    conn = llm_pipeline.connection_stats.as_dict()
+    st.caption(
+        f"Connections: new {conn['new_connections']} | reused {conn['reused_connections']} "
+        f"| reuse rate {conn['reuse_rate']:.0%}"
+    )
 
     # Show Readable Text in the second column
     with col2:
-        st.subheader("Output")
-        st.code(readable_text, language="yaml")
+        if stream_output:
+            stream_placeholder.code(readable_text, language="yaml")
+        else:
+            st.subheader("Output")
+            st.code(readable_text, language="yaml")
         
         with st.expander("View Raw JSON"):
-            st.json(parsed_data)
\ No newline at end of file
+            st.json(parsed_data)
+
+    if show_diagnostics:
+        with st.expander("Diagnostics", expanded=True):
+            st.caption(f"This request: {trace.total() * 1000:.0f} ms across {len(trace.spans)} spans")
+            st.dataframe(pd.DataFrame(trace.rows()))
+            st.caption("All requests since start (seconds / tokens; quantiles estimated from histogram buckets)")
+            st.dataframe(pd.DataFrame(metrics.registry.summary()))
+            st.caption(f"Routes (small model up to complexity {router.small_max_score:g})")
+            st.json(router.report())
+            if use_hedging:
+                st.caption("Hedged requests (first-attempt latency is a lower bound where it was cancelled)")
+                st.json(llm_pipeline.hedger.report())
+            if metrics.METRICS_PORT:
+                st.caption(f"Prometheus endpoint: http://127.0.0.1:{metrics.METRICS_PORT}/metrics")
+            if metrics.METRICS_FILE:
+                st.caption(f"Prometheus text file: `{metrics.METRICS_FILE}`")
+
+# --- EDIT OUTPUT: tweak strikes, quantities or conditions without another LLM call ---
+if "strategy_json" in st.session_state:
+    with col2:
+        st.subheader("Edit output")
+        edited_text = st.text_area(
+            "Change the rendered strategy, then apply",
+            value=st.session_state["strategy_text"],
+            height=300,
+            key=f"edit_text_{st.session_state['strategy_revision']}",
+        )
+        if st.button("Apply edits"):
+            t0 = time.perf_counter()
+            try:
+                edited = parse_strategy_text(
+                    edited_text, base=st.session_state["strategy_json"],
+                    catalog=get_catalog(schema, schema_entry.version),
+                )
+            except TextParseError as e:
+                st.error(f"Could not read the edited text: {e}")
+            else:
+                edit_issues = get_validator(schema, schema_entry.version).validate(edited)
+                strategy = load_strategy(edited)
+                st.session_state["strategy"] = strategy
+                st.session_state["strategy_json"] = edited
+                st.session_state["strategy_text"] = render_strategy(strategy)
+                st.session_state["phase_texts"] = render_phase_texts(edited)
+                st.caption(f"Parsed in {(time.perf_counter() - t0) * 1000:.1f} ms (no LLM call)")
+                if edit_issues:
+                    st.warning(
+                        "Edited strategy does not fully conform to the schema:\n"
+                        + "\n".join(f"- `{issue.pointer or '/'}`: {issue.message}" for issue in edit_issues[:10])
+                    )
+                st.code(st.session_state["strategy_text"], language="yaml")
+                with st.expander("View Raw JSON"):
+                    st.json(edited)
\ No newline at end of file
@@ -0,0 +1,798 @@
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from condition_optimizer import OperandTable, operand_key, optimize_conditions
+from json_to_yaml import DIALECTS, detect_schema_version
+
+# Bucket length of each schema timeframe; "All" means the data's own bars
+TIMEFRAMES = {
+    "1m": 60, "3m": 180, "5m": 300, "10m": 600, "15m": 900, "30m": 1800, "1h": 3600,
+    "1d": 86400, "day": 86400, "1w": 7 * 86400,
+}
+# Intraday candles start at the NSE open (09:15), so 1h candles are 09:15-10:15, ...
+SESSION_OPEN = 9 * 3600 + 15 * 60
+# Timestamps are naive exchange time in seconds; 1970-01-01 was a Thursday
+WEEK_ANCHOR = -3 * 86400
+TIMESTAMP_COLUMNS = ("timestamp", "datetime", "date", "time")
+PRICE_COLUMNS = ("open", "high", "low", "close", "volume")
+CHUNK_ROWS = 1 << 16
+# exp_smooth works in blocks over which decay**-k stays below 1e150
+_MAX_EXPONENT = 150 * math.log(10)
+
+
+class BacktestError(ValueError):
+    """Raised for data that cannot be loaded or conditions the engine cannot evaluate."""
+
+
+class Bars:
+    """Columnar OHLCV bars; `timestamp` is int64 seconds of each bar's open, `last` that of its final source bar."""
+    __slots__ = ("timestamp", "open", "high", "low", "close", "volume", "last", "_interval")
+
+    def __init__(self, timestamp, open, high, low, close, volume=None, last=None):
+        self.timestamp = np.asarray(timestamp, dtype=np.int64)
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.zeros(len(self.close)) if volume is None else np.asarray(volume, dtype=np.float64)
+        self.last = self.timestamp if last is None else last
+        self._interval = None
+
+    def __len__(self):
+        return len(self.timestamp)
+
+    @property
+    def interval(self):
+        """Typical seconds between bars (the median gap, so session breaks do not count)."""
+        if self._interval is None:
+            self._interval = int(np.median(np.diff(self.timestamp))) if len(self) > 1 else 60
+        return self._interval
+
+    def resample(self, seconds):
+        """Candles of `seconds` each, aligned to the session open (days and weeks to midnight)."""
+        anchor = WEEK_ANCHOR if seconds >= TIMEFRAMES["1w"] else 0 if seconds >= 86400 else SESSION_OPEN
+        bucket = (self.timestamp - anchor) // seconds
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bucket)) + 1))
+        ends = np.concatenate((starts[1:], [len(self)])) - 1
+        return Bars(
+            self.timestamp[starts],
+            self.open[starts],
+            np.maximum.reduceat(self.high, starts),
+            np.minimum.reduceat(self.low, starts),
+            self.close[ends],
+            np.add.reduceat(self.volume, starts),
+            last=self.last[ends],
+        )
+
+
+def _timestamps(column):
+    column = np.asarray(column)
+    if np.issubdtype(column.dtype, np.datetime64):
+        return column.astype("datetime64[s]").astype(np.int64)
+    if np.issubdtype(column.dtype, np.number):
+        return column.astype(np.int64)
+    try:
+        return column.astype(np.int64)
+    except ValueError:
+        return column.astype("datetime64[s]").astype(np.int64)
+
+
+def load_ohlcv(path):
+    """
+    Bars from a CSV with a header row (a timestamp/datetime column, then
+    open, high, low, close and optionally volume, in any order) or from an
+    .npy array: structured with those field names, or plain (N, 5|6) with
+    epoch seconds first. Timestamps are epoch seconds or ISO dates.
+    """
+    if path.endswith(".npy"):
+        data = np.load(path, allow_pickle=False)
+        if data.dtype.names:
+            names = {name.lower(): name for name in data.dtype.names}
+            stamp = next((names[c] for c in TIMESTAMP_COLUMNS if c in names), None)
+            missing = [c for c in PRICE_COLUMNS[:4] if c not in names]
+            if stamp is None or missing:
+                raise BacktestError(f"{path}: needs a timestamp field and {', '.join(PRICE_COLUMNS[:4])}")
+            columns = [data[names[c]] if c in names else None for c in PRICE_COLUMNS]
+            return Bars(_timestamps(data[stamp]), *columns)
+        if data.ndim != 2 or data.shape[1] not in (5, 6):
+            raise BacktestError(f"{path}: expected a structured array or an (N, 5|6) array")
+        return Bars(data[:, 0], *(data[:, i] for i in range(1, data.shape[1])))
+
+    with open(path, encoding="utf-8") as f:
+        header = [name.strip().lower() for name in f.readline().split(",")]
+    stamp = next((header.index(c) for c in TIMESTAMP_COLUMNS if c in header), None)
+    missing = [c for c in PRICE_COLUMNS[:4] if c not in header]
+    if stamp is None or missing:
+        raise BacktestError(f"{path}: header needs a timestamp column and {', '.join(PRICE_COLUMNS[:4])}")
+    present = [c for c in PRICE_COLUMNS if c in header]
+    try:
+        prices = np.loadtxt(path, delimiter=",", skiprows=1, usecols=[header.index(c) for c in present], ndmin=2)
+        stamps = np.loadtxt(path, delimiter=",", skiprows=1, usecols=stamp, dtype=str, ndmin=1)
+    except ValueError as e:
+        raise BacktestError(f"{path}: {e}") from None
+    columns = {c: prices[:, i] for i, c in enumerate(present)}
+    return Bars(_timestamps(stamps), *(columns.get(c) for c in PRICE_COLUMNS))
+
+
+class DataSource:
+    """
+    Bars by symbol_token: given up front, or loaded on first use from
+    `directory` as "<symbol>.npy" or "<symbol>.csv" (spaces may also be
+    underscores, e.g. NIFTY_50.csv).
+    """
+
+    def __init__(self, directory=None, bars=None):
+        self.directory = directory
+        self._bars = dict(bars or {})
+
+    def bars(self, symbol):
+        bars = self._bars.get(symbol)
+        if bars is None:
+            bars = self._bars[symbol] = load_ohlcv(self._path(symbol))
+        return bars
+
+    def _path(self, symbol):
+        if self.directory:
+            for name in dict.fromkeys((symbol, symbol.replace(" ", "_"))):
+                for ext in (".npy", ".csv"):
+                    path = os.path.join(self.directory, name + ext)
+                    if os.path.exists(path):
+                        return path
+        raise BacktestError(f"no data for {symbol!r}" + (f" in {self.directory}" if self.directory else ""))
+
+
+# --- Indicators ---
+# Each takes the candles of its timeframe and the operand's parameters, and
+# returns one value per candle (NaN until enough candles have closed).
+INDICATORS = {}
+
+
+def register_indicator(*names):
+    """Registers `fn(bars, params) -> ndarray` for the given function_name values."""
+    def decorator(fn):
+        for name in names:
+            INDICATORS[name] = fn
+        return fn
+    return decorator
+
+
+def _param(params, default, *names):
+    for name in names:
+        if name in params:
+            value = params[name]
+            if isinstance(value, dict) and value.get("type") == "number":
+                value = value.get("title", value.get("value"))
+            try:
+                return type(default)(float(value))
+            except (TypeError, ValueError):
+                raise BacktestError(f"parameter {name!r} must be a number, not {value!r}") from None
+    return default
+
+
+def _period(params, default=14):
+    period = _param(params, default, "period", "length", "timeperiod")
+    if period < 1:
+        raise BacktestError(f"period must be at least 1, not {period}")
+    return period
+
+
+def _source(bars, params):
+    source = str(params.get("source", params.get("series", "close"))).lower()
+    if source == "hl2":
+        return (bars.high + bars.low) / 2
+    if source == "hlc3":
+        return (bars.high + bars.low + bars.close) / 3
+    if source in PRICE_COLUMNS:
+        return getattr(bars, source)
+    raise BacktestError(f"unknown source series {source!r}")
+
+
+def _shift(x, n=1):
+    out = np.empty_like(x)
+    out[:n] = np.nan
+    out[n:] = x[:-n]
+    return out
+
+
+def _first_finite(x):
+    finite = np.flatnonzero(~np.isnan(x))
+    return finite[0] if len(finite) else len(x)
+
+
+def rolling_sum(x, n):
+    out = np.full(len(x), np.nan)
+    first = _first_finite(x)
+    if len(x) - first >= n:
+        total = np.cumsum(x[first:])
+        out[first + n - 1] = total[n - 1]
+        out[first + n:] = total[n:] - total[:-n]
+    return out
+
+
+def sma(x, n):
+    return rolling_sum(x, n) / n
+
+
+def rolling_std(x, n):
+    # Shifted by the first value so the sum of squares does not cancel
+    first = _first_finite(x)
+    shifted = x - (x[first] if first < len(x) else 0.0)
+    mean = sma(shifted, n)
+    variance = sma(shifted * shifted, n) - mean * mean
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def _rolling(x, n, reduce):
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = reduce(sliding_window_view(x, n), axis=1)
+    return out
+
+
+def exp_smooth(x, alpha, seed):
+    """
+    y[t] = (1 - alpha) * y[t-1] + alpha * x[t], seeded with the mean of the
+    first `seed` finite values and NaN before. The recursion is solved in
+    closed form over blocks, y[s+k] = d**k * (y[s] + alpha * cumsum(x / d**k)),
+    so it runs as array operations rather than a loop per bar.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.full(len(x), np.nan)
+    first = _first_finite(x)
+    start = first + seed - 1
+    if start >= len(x):
+        return y
+    y[start] = x[first:start + 1].mean()
+    decay = 1.0 - alpha
+    if decay <= 0:
+        y[start + 1:] = x[start + 1:]
+        return y
+    rest, out = x[start + 1:], y[start + 1:]
+    block = max(1, int(_MAX_EXPONENT / -math.log(decay)))
+    powers = decay ** np.arange(1, min(block, len(rest)) + 1)
+    previous = y[start]
+    for s in range(0, len(rest), block):
+        chunk = rest[s:s + block]
+        scale = powers[:len(chunk)]
+        out[s:s + len(chunk)] = scale * (previous + alpha * np.cumsum(chunk / scale))
+        previous = out[s + len(chunk) - 1]
+    return y
+
+
+def ema(x, n):
+    return exp_smooth(x, 2.0 / (n + 1), n)
+
+
+def wilder(x, n):
+    return exp_smooth(x, 1.0 / n, n)
+
+
+def true_range(bars):
+    previous = _shift(bars.close)
+    previous[0] = bars.close[0] if len(bars) else np.nan
+    return np.maximum(bars.high - bars.low, np.maximum(np.abs(bars.high - previous), np.abs(bars.low - previous)))
+
+
+@register_indicator("OPEN", "HIGH", "LOW", "CLOSE")
+def _series(bars, params, name=None):
+    return _source(bars, {"source": name or params.get("source", "close")})
+
+
+@register_indicator("Volume series")
+def _volume(bars, params):
+    return bars.volume
+
+
+@register_indicator("Typical Price")
+def _typical(bars, params):
+    return (bars.high + bars.low + bars.close) / 3
+
+
+@register_indicator("SMA", "Mean")
+def _sma(bars, params):
+    return sma(_source(bars, params), _period(params))
+
+
+@register_indicator("EMA")
+def _ema(bars, params):
+    return ema(_source(bars, params), _period(params))
+
+
+@register_indicator("DEMA")
+def _dema(bars, params):
+    n = _period(params)
+    once = ema(_source(bars, params), n)
+    return 2 * once - ema(once, n)
+
+
+@register_indicator("TEMA")
+def _tema(bars, params):
+    n = _period(params)
+    once = ema(_source(bars, params), n)
+    twice = ema(once, n)
+    return 3 * once - 3 * twice + ema(twice, n)
+
+
+@register_indicator("WMA")
+def _wma(bars, params):
+    n = _period(params)
+    x = _source(bars, params)
+    out = np.full(len(x), np.nan)
+    if len(x) >= n:
+        out[n - 1:] = np.convolve(x, np.arange(n, 0, -1, dtype=np.float64), "valid") / (n * (n + 1) / 2)
+    return out
+
+
+@register_indicator("VWMA")
+def _vwma(bars, params):
+    n = _period(params)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return rolling_sum(_source(bars, params) * bars.volume, n) / rolling_sum(bars.volume, n)
+
+
+@register_indicator("Sum")
+def _sum(bars, params):
+    return rolling_sum(_source(bars, params), _period(params))
+
+
+@register_indicator("Stdev")
+def _stdev(bars, params):
+    return rolling_std(_source(bars, params), _period(params))
+
+
+@register_indicator("Lower Bolinger")
+def _lower_bollinger(bars, params):
+    x, n = _source(bars, params), _period(params, 20)
+    return sma(x, n) - _param(params, 2.0, "std_dev", "stddev", "deviation", "multiplier") * rolling_std(x, n)
+
+
+@register_indicator("ROC")
+def _roc(bars, params):
+    x, n = _source(bars, params), _period(params, 10)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * (x / _shift(x, n) - 1) if len(x) > n else np.full(len(x), np.nan)
+
+
+@register_indicator("Donchain Ch Upper")
+def _donchian_upper(bars, params):
+    return _rolling(bars.high, _period(params, 20), np.max)
+
+
+@register_indicator("Donchain Ch Lower")
+def _donchian_lower(bars, params):
+    return _rolling(bars.low, _period(params, 20), np.min)
+
+
+@register_indicator("Donchain Ch Middle")
+def _donchian_middle(bars, params):
+    return (_donchian_upper(bars, params) + _donchian_lower(bars, params)) / 2
+
+
+@register_indicator("RSI")
+def _rsi(bars, params):
+    x = _source(bars, params)
+    n = _period(params)
+    delta = np.diff(x, prepend=np.nan)
+    # `+ delta * 0` keeps the leading NaN, so smoothing starts after it
+    gain = wilder(np.where(delta > 0, delta, 0.0) + delta * 0, n)
+    loss = wilder(np.where(delta < 0, -delta, 0.0) + delta * 0, n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(loss == 0, 100.0, 100 - 100 / (1 + gain / loss))
+
+
+@register_indicator("TR")
+def _tr(bars, params):
+    return true_range(bars)
+
+
+@register_indicator("ATR")
+def _atr(bars, params):
+    return wilder(true_range(bars), _period(params))
+
+
+@register_indicator("ADX", "DI+", "DI-")
+def _adx(bars, params, name="ADX"):
+    n = _period(params)
+    up, down = np.diff(bars.high, prepend=np.nan), -np.diff(bars.low, prepend=np.nan)
+    plus = np.where((up > down) & (up > 0), up, 0.0) + up * 0
+    minus = np.where((down > up) & (down > 0), down, 0.0) + down * 0
+    tr = true_range(bars)
+    tr[0] = np.nan
+    with np.errstate(divide="ignore", invalid="ignore"):
+        smoothed = wilder(tr, n)
+        di_plus, di_minus = 100 * wilder(plus, n) / smoothed, 100 * wilder(minus, n) / smoothed
+        if name == "DI+":
+            return di_plus
+        if name == "DI-":
+            return di_minus
+        return wilder(100 * np.abs(di_plus - di_minus) / (di_plus + di_minus), n)
+
+
+@register_indicator("CCI")
+def _cci(bars, params):
+    n = _period(params, 20)
+    tp = (bars.high + bars.low + bars.close) / 3
+    mean = sma(tp, n)
+    deviation = np.full(len(tp), np.nan)
+    if len(tp) >= n:
+        windows = sliding_window_view(tp, n)
+        # In chunks: the |window - mean| temporary is rows x n
+        for s in range(0, len(windows), CHUNK_ROWS):
+            rows = windows[s:s + CHUNK_ROWS]
+            deviation[n - 1 + s:n - 1 + s + len(rows)] = np.abs(rows - mean[n - 1 + s:n - 1 + s + len(rows), None]).mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (tp - mean) / (0.015 * deviation)
+
+
+@register_indicator("MACD", "Macdsignal", "Macdhist")
+def _macd(bars, params, name="MACD"):
+    x = _source(bars, params)
+    line = ema(x, _param(params, 12, "fast", "fast_period")) - ema(x, _param(params, 26, "slow", "slow_period"))
+    if name == "MACD":
+        return line
+    signal = ema(line, _param(params, 9, "signal", "signal_period"))
+    return signal if name == "Macdsignal" else line - signal
+
+
+@register_indicator("SUPERTREND")
+def _supertrend(bars, params):
+    """The trailing band: below price in an uptrend, above it in a downtrend. Its bands carry over bar by bar."""
+    n = _period(params, 10)
+    multiplier = _param(params, 3.0, "multiplier", "factor")
+    atr = wilder(true_range(bars), n)
+    mid = (bars.high + bars.low) / 2
+    upper, lower = (mid + multiplier * atr).tolist(), (mid - multiplier * atr).tolist()
+    close = bars.close.tolist()
+    start = _first_finite(atr)
+    if start >= len(close):
+        return np.full(len(close), np.nan)
+    final_upper, final_lower, up = upper[start], lower[start], close[start] >= mid[start]
+    out = [math.nan] * start + [final_lower if up else final_upper]
+    append = out.append
+    previous = close[start]
+    # The bands' carry-over is sequential: one tight pass over plain floats
+    for u, l, c in zip(upper[start + 1:], lower[start + 1:], close[start + 1:]):
+        if u < final_upper or previous > final_upper:
+            final_upper = u
+        if l > final_lower or previous < final_lower:
+            final_lower = l
+        if up:
+            if c < final_lower:
+                up = False
+        elif c > final_upper:
+            up = True
+        append(final_lower if up else final_upper)
+        previous = c
+    return np.array(out)
+
+
+# Indicators sharing one implementation tell themselves apart by name
+_NAMED = {_series, _adx, _macd}
+
+
+# --- Keywords ---
+KEYWORDS = {
+    "LTP": lambda bars, now: bars.close,
+    "Volume": lambda bars, now: bars.volume,
+    "Now": lambda bars, now: (now // 60 % 1440).astype(np.float64),
+    "Hour": lambda bars, now: (now // 3600 % 24).astype(np.float64),
+    "Minute": lambda bars, now: (now // 60 % 60).astype(np.float64),
+    "Week Day": lambda bars, now: ((now // 86400 + 3) % 7).astype(np.float64),
+}
+
+
+def literal(value):
+    """A constant operand as a float; "HH:MM" is minutes since midnight, to compare with Now."""
+    if isinstance(value, dict) and value.get("type") == "number":
+        value = value.get("title", value.get("value"))
+    if isinstance(value, str) and ":" in value:
+        hours, _, minutes = value.partition(":")
+        if hours.strip().isdigit() and minutes.strip().isdigit():
+            return float(int(hours) * 60 + int(minutes))
+    if isinstance(value, bool):
+        raise BacktestError(f"not a number: {value!r}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BacktestError(f"not a number or HH:MM time: {value!r}") from None
+
+
+def _is_literal(op):
+    return not isinstance(op, dict) or op.get("type") == "number"
+
+
+def operand_symbol(op, default=None):
+    """symbol_token of an operand's instrument (in `inputs` or beside it), else `default`."""
+    inputs = op.get("inputs")
+    instrument = (isinstance(inputs, dict) and inputs.get("instrument")) or op.get("instrument")
+    if isinstance(instrument, dict) and instrument.get("symbol_token"):
+        return instrument["symbol_token"]
+    return default
+
+
+def operand_params(op):
+    """An indicator's parameters: its `params` and `inputs` other than the instrument."""
+    params = {}
+    for field in ("params", "inputs"):
+        values = op.get(field)
+        if isinstance(values, dict):
+            params.update((k, v) for k, v in values.items() if k != "instrument")
+    return params
+
+
+def operand_offset(op):
+    """An operand's position_offset: 0 is the latest candle, -1 the one before."""
+    offset = op.get("position_offset") or 0
+    if not isinstance(offset, int) or offset > 0:
+        raise BacktestError(f"position_offset must be 0 or negative, not {offset!r}")
+    return offset
+
+
+# --- Compiled conditions ---
+class Program:
+    """
+    A condition tree compiled for vectorized evaluation: `table` holds its
+    distinct operands (each fetched once), `steps` is the tree in postfix
+    order. A step is ("compare", left, operator, right), whose sides are
+    ("slot", i) or ("const", float), or ("group", logic, member count).
+    """
+    __slots__ = ("table", "steps")
+
+    def __init__(self, table, steps):
+        self.table = table
+        self.steps = steps
+
+
+def compile_conditions(node):
+    """
+    Compiles a v3 condition tree, simplified first by optimize_conditions.
+    Standalone keywords (Set Runtime, ...) carry state from bar to bar and
+    raise BacktestError, as do unknown operators and group logic.
+    """
+    node = optimize_conditions(node)
+    table = OperandTable()
+    steps = []
+    stack = [(node, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, dict):
+            raise BacktestError(f"not a condition: {node!r}")
+        c_type = node.get("condition_type")
+        if c_type == "GROUP":
+            logic = node.get("connection_logic", "AND")
+            if logic not in ("AND", "OR"):
+                raise BacktestError(f"unknown connection_logic {logic!r}")
+            if expanded:
+                steps.append(("group", logic, len(node.get("conditions", []))))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.get("conditions", [])))
+        elif c_type == "COMPARE":
+            operator = node.get("operator")
+            if operator not in COMPARATORS:
+                raise BacktestError(f"unknown operator {operator!r}")
+            sides = [
+                ("const", literal(side)) if _is_literal(side) else ("slot", table.add(side))
+                for side in (node.get("left"), node.get("right"))
+            ]
+            steps.append(("compare", sides[0], operator, sides[1]))
+        else:
+            name = node.get("keyword") or node.get("pattern_name") or c_type
+            raise BacktestError(f"{name!r} cannot be evaluated in a vectorized backtest")
+    return Program(table, steps)
+
+
+def _crosses(above):
+    def crosses(a, b):
+        if np.ndim(a) == 0 and np.ndim(b) == 0:
+            return np.False_ # constants never cross
+        a, b = np.broadcast_arrays(a, b)
+        result = np.zeros(len(a), dtype=bool)
+        if above:
+            result[1:] = (a[1:] > b[1:]) & (a[:-1] <= b[:-1])
+        else:
+            result[1:] = (a[1:] < b[1:]) & (a[:-1] >= b[:-1])
+        return result
+    return crosses
+
+
+COMPARATORS = {
+    ">": np.greater, "<": np.less, ">=": np.greater_equal, "<=": np.less_equal,
+    "==": np.equal, "!=": np.not_equal,
+    "Crosses Above": _crosses(True), "Crosses Below": _crosses(False),
+}
+
+
+class Backtester:
+    """
+    Evaluates compiled conditions at the close of every bar of the `base`
+    symbol. An operand on a higher timeframe takes the value of its last
+    completed candle (offset -1 is the one before), so no signal looks
+    ahead; another symbol's value is its latest bar at or before the base
+    bar. Candles and indicators are computed once per (symbol, timeframe,
+    function, parameters) and cached for every later operand, phase and
+    strategy.
+    """
+
+    def __init__(self, source, base=None):
+        self.source = source
+        self.base = base
+        self._candles = {}
+        self._index = {}
+        self._indicators = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def bars(self):
+        if self.base is None:
+            raise BacktestError("no base symbol: pass base= or run a strategy that names an instrument")
+        return self.source.bars(self.base)
+
+    def candles(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        candles = self._candles.get(key)
+        if candles is None:
+            bars = self.source.bars(symbol)
+            seconds = TIMEFRAMES.get(timeframe)
+            if seconds is None and timeframe not in (None, "All"):
+                raise BacktestError(f"unknown timeframe {timeframe!r}")
+            if seconds is not None and seconds < bars.interval:
+                raise BacktestError(f"{symbol!r} has {bars.interval}s bars, too coarse for {timeframe}")
+            candles = bars if seconds is None or seconds == bars.interval else bars.resample(seconds)
+            self._candles[key] = candles
+        return candles
+
+    def index(self, symbol, timeframe):
+        """
+        Per base bar, the position of the last candle completed by its close
+        (-1: none yet); None when the candles are the base bars themselves.
+        """
+        key = (symbol, timeframe)
+        if key not in self._index:
+            base = self.bars
+            candles = self.candles(symbol, timeframe)
+            if candles is base:
+                self._index[key] = None
+            else:
+                self._index[key] = np.searchsorted(candles.last, base.timestamp, side="right") - 1
+        return self._index[key]
+
+    def indicator(self, op):
+        """An indicator operand over its own candles, cached; the offset is applied by the caller."""
+        name = op["function_name"]
+        fn = INDICATORS.get(name)
+        if fn is None:
+            raise BacktestError(f"indicator {name!r} is not supported by the backtest engine")
+        params = operand_params(op)
+        symbol, timeframe = operand_symbol(op, self.base), op.get("timeframe")
+        key = (symbol, timeframe, name, operand_key(params))
+        values = self._indicators.get(key)
+        if values is None:
+            self.misses += 1
+            candles = self.candles(symbol, timeframe)
+            values = fn(candles, params, name) if fn in _NAMED else fn(candles, params)
+            self._indicators[key] = values
+        else:
+            self.hits += 1
+        return symbol, timeframe, values
+
+    def operand(self, op):
+        """An operand's value at every base bar (NaN where not yet known)."""
+        if op.get("function_name"):
+            symbol, timeframe, values = self.indicator(op)
+            offset = operand_offset(op)
+        elif op.get("keyword") in KEYWORDS:
+            symbol, timeframe, offset = operand_symbol(op, self.base), None, 0
+            bars = self.candles(symbol, None)
+            # Bars are stamped with their open; a bar is evaluated at its close
+            values = KEYWORDS[op["keyword"]](bars, bars.timestamp + bars.interval)
+        else:
+            name = op.get("keyword") or op.get("pattern_name") or operand_key(op)
+            raise BacktestError(f"operand {name!r} is not supported by the backtest engine")
+        index = self.index(symbol, timeframe)
+        if index is None:
+            return values if offset == 0 else _shift(values, -offset)
+        # Position -1 of the padded values is the NaN for "no candle yet"
+        return np.append(values, np.nan)[np.maximum(index + offset, -1)]
+
+    def evaluate(self, program):
+        """Boolean signal per base bar."""
+        slots = [self.operand(op) for op in program.table.operands]
+        n = len(self.bars)
+        values = []
+        for step in program.steps:
+            if step[0] == "compare":
+                _, left, operator, right = step
+                a = slots[left[1]] if left[0] == "slot" else left[1]
+                b = slots[right[1]] if right[0] == "slot" else right[1]
+                with np.errstate(invalid="ignore"):
+                    result = COMPARATORS[operator](a, b)
+                values.append(np.broadcast_to(result, (n,)) if np.ndim(result) == 0 else result)
+            else:
+                _, logic, count = step
+                members = values[len(values) - count:]
+                del values[len(values) - count:]
+                values.append((np.logical_and if logic == "AND" else np.logical_or).reduce(members))
+        return values[0] if values else np.zeros(n, dtype=bool)
+
+    def run(self, json_data):
+        """
+        Entry/exit signals of every phase of a v3 strategy: a list of
+        {"set_index", "phase_type", "signal"} with one bool per base bar.
+        A phase without conditions has signal None. Without a `base`, the
+        first instrument named in the conditions is the base.
+        """
+        if detect_schema_version(json_data) != "v3":
+            raise BacktestError("only v3 strategies can be backtested")
+        dialect = DIALECTS["v3"]
+        results = []
+        for strategy_set in json_data.get("strategy_sets", []):
+            for phase in strategy_set.get("phases", []):
+                conditions = phase.get(dialect.conditions_key)
+                signal = None
+                if conditions:
+                    program = compile_conditions(conditions)
+                    if self.base is None:
+                        symbols = (operand_symbol(op, self.base) for op in program.table.operands)
+                        self.base = next((symbol for symbol in symbols if symbol is not None), None)
+                    signal = self.evaluate(program)
+                results.append({
+                    "set_index": strategy_set.get("set_index", dialect.default_set_index),
+                    "phase_type": phase.get("phase_type", dialect.default_phase_type),
+                    "signal": signal,
+                })
+        return results
+
+
+def summarize(results, bars):
+    """Bars signalled per phase, with the first and last signal time."""
+    summary = []
+    for result in results:
+        signal = result["signal"]
+        row = {"set_index": result["set_index"], "phase_type": result["phase_type"]}
+        if signal is None:
+            row["signals"] = None
+        else:
+            hits = np.flatnonzero(signal)
+            row["signals"] = int(len(hits))
+            if len(hits):
+                row["first"] = str(bars.timestamp[hits[0]].astype("datetime64[s]"))
+                row["last"] = str(bars.timestamp[hits[-1]].astype("datetime64[s]"))
+        summary.append(row)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entry/exit signals of a strategy JSON over local OHLCV files.")
+    parser.add_argument("strategy", help="strategy JSON file")
+    parser.add_argument("--data", required=True, help="directory of <symbol>.csv / <symbol>.npy files")
+    parser.add_argument("--base", help="symbol_token whose bars are evaluated (default: the first in the conditions)")
+    args = parser.parse_args(argv)
+
+    with open(args.strategy, encoding="utf-8") as f:
+        strategy = json.load(f)
+    backtester = Backtester(DataSource(args.data), base=args.base)
+    t0 = time.perf_counter()
+    try:
+        results = backtester.run(strategy)
+    except BacktestError as e:
+        sys.exit(f"error: {e}")
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "base": backtester.base,
+        "bars": len(backtester.bars),
+        "seconds": round(elapsed, 3),
+        "phases": summarize(results, backtester.bars),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+
+from llm_cache import file_sha256
+from llm_pipeline import DEFAULT_SCHEMA_PATH, MAX_RETRIES, connection_stats, convert, get_client, load_schema
+
+RETRYABLE_STATUS = {408, 409, 429}
+ID_FIELDS = ("id", "request_id")
+PROMPT_FIELDS = ("prompt", "body", "text", "instruction")
+
+
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimitedClient:
+    """
+    Wraps a Groq-style client so that every chat.completions.create() call,
+    re-asks and escalations included, first takes a token from `bucket`.
+    The pipeline calls it from worker threads; the bucket belongs to `loop`.
+    """
+
+    def __init__(self, client, bucket, loop):
+        self._client = client
+        self._bucket = bucket
+        self._loop = loop
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        asyncio.run_coroutine_threadsafe(self._bucket.acquire(), self._loop).result()
+        return self._client.chat.completions.create(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def is_retryable(exc):
+    """429/5xx and connection-level failures are worth backing off for."""
+    status = status_code(exc)
+    if status is None:
+        return exc.__class__.__name__ in ("APIConnectionError", "APITimeoutError")
+    return status in RETRYABLE_STATUS or status >= 500
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def _pick(record, fields, explicit):
+    if explicit:
+        return record.get(explicit)
+    for field in fields:
+        if record.get(field) is not None:
+            return record[field]
+    return None
+
+
+def read_prompts(path, id_field=None, prompt_field=None):
+    """
+    Yields (id, prompt, error) from a JSONL file; ids default to the line
+    number. A line that is not a JSON object yields (line number, None, reason).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield str(line_no), None, f"line {line_no} is not valid JSON ({e})"
+                continue
+            if not isinstance(record, dict):
+                yield str(line_no), None, f"line {line_no} is not a JSON object"
+                continue
+            item_id = _pick(record, ID_FIELDS, id_field)
+            prompt = _pick(record, PROMPT_FIELDS, prompt_field)
+            yield str(item_id if item_id is not None else line_no), prompt, None
+
+
+def completed_ids(path):
+    """Ids already present in an output file: the checkpoint for resuming."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(str(json.loads(line)["id"]))
+            except (ValueError, KeyError):
+                continue  # a torn last line from an interrupted run
+    return done
+
+
+def compact_failures(path, succeeded):
+    """
+    Rewrites a failures file with one record per id, the latest, dropping
+    ids that have since succeeded; resumed runs retry failed ids and
+    append their records again.
+    """
+    if not os.path.exists(path):
+        return
+    latest = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                item_id = str(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue  # a torn last line from an interrupted run
+            latest.pop(item_id, None)
+            latest[item_id] = line if line.endswith("\n") else line + "\n"
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.writelines(line for item_id, line in latest.items() if item_id not in succeeded)
+    os.replace(tmp, path)
+
+
+async def run_batch(
+    items,
+    convert_fn,
+    client,
+    output_path,
+    failures_path,
+    concurrency=4,
+    rate=None,
+    burst=None,
+    max_attempts=5,
+    base_delay=1.0,
+    max_delay=30.0,
+):
+    """
+    Converts (id, prompt, error) items from read_prompts with at most
+    `concurrency` in flight; items with an error are recorded as failures.
+    `convert_fn(prompt, client=client)` is the blocking pipeline and runs in
+    worker threads. With `rate`, the client is wrapped so that each LLM
+    request, not each prompt, waits for the token bucket.
+    Results and failures are appended as they finish, so an interrupted run
+    resumes by skipping ids already in `output_path`; failed ids are retried
+    and `failures_path` is compacted to their latest outcome at the end.
+    """
+    done = completed_ids(output_path)
+    if rate:
+        client = RateLimitedClient(client, TokenBucket(rate, burst), asyncio.get_running_loop())
+    queue = asyncio.Queue(maxsize=concurrency * 2)
+    summary = {"succeeded": 0, "failed": 0, "skipped": 0, "retries": 0}
+    started = time.monotonic()
+
+    with open(output_path, "a", encoding="utf-8") as out, open(failures_path, "a", encoding="utf-8") as failed:
+
+        def write(f, record):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+
+        async def process(item_id, prompt):
+            t0 = time.monotonic()
+            for attempt in range(max_attempts):
+                try:
+                    result = await asyncio.to_thread(convert_fn, prompt, client=client)
+                except Exception as e:
+                    if is_retryable(e) and attempt + 1 < max_attempts:
+                        summary["retries"] += 1
+                        await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
+                        continue
+                    summary["failed"] += 1
+                    write(failed, {
+                        "id": item_id,
+                        "prompt": prompt,
+                        "error_type": e.__class__.__name__,
+                        "status_code": status_code(e),
+                        "error": str(e),
+                        "attempts": attempt + 1,
+                    })
+                    return
+
+                summary["succeeded"] += 1
+                done.add(item_id)
+                write(out, {
+                    "id": item_id,
+                    "prompt": prompt,
+                    **result,
+                    "latency_ms": round((time.monotonic() - t0) * 1000, 1),
+                })
+                return
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    await process(*item)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        for item_id, prompt, error in items:
+            if item_id in done:
+                summary["skipped"] += 1
+                continue
+            if error:
+                summary["failed"] += 1
+                write(failed, {"id": item_id, "prompt": None, "error_type": "MalformedLine", "error": error})
+                continue
+            if not prompt:
+                summary["failed"] += 1
+                write(failed, {"id": item_id, "prompt": prompt, "error_type": "EmptyPrompt", "error": "No prompt"})
+                continue
+            await queue.put((item_id, prompt))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    elapsed = time.monotonic() - started
+    summary["elapsed_s"] = round(elapsed, 3)
+    processed = summary["succeeded"] + summary["failed"]
+    summary["throughput_per_s"] = round(processed / elapsed, 2) if elapsed else 0.0
+    compact_failures(failures_path, done)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert strategy prompts from a JSONL file in bulk.")
+    parser.add_argument("input", help="JSONL file with one prompt per line")
+    parser.add_argument("--output", help="results JSONL (default: <input>.results.jsonl); also the resume checkpoint")
+    parser.add_argument("--failures", help="failures JSONL (default: <input>.failures.jsonl)")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0, help="max LLM requests per second (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=None)
+    parser.add_argument("--max-attempts", type=int, default=5, help="attempts per prompt on 429/5xx")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES, help="re-asks per prompt on unparseable JSON")
+    parser.add_argument("--id-field")
+    parser.add_argument("--prompt-field")
+    parser.add_argument("--stub", action="store_true", help="use the offline stub client instead of Groq")
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    stem = os.path.splitext(args.input)[0]
+    output = args.output or f"{stem}.results.jsonl"
+    failures = args.failures or f"{stem}.failures.jsonl"
+
+    if args.stub:
+        from stub_llm import StubGroq
+        client = StubGroq(latency=args.stub_latency)
+    else:
+        client = get_client()
+
+    schema = load_schema(args.schema)
+    convert_fn = functools.partial(
+        convert,
+        schema,
+        max_retries=args.max_retries,
+        schema_version=file_sha256(args.schema),
+    )
+
+    summary = asyncio.run(run_batch(
+        read_prompts(args.input, args.id_field, args.prompt_field),
+        convert_fn,
+        client,
+        output,
+        failures,
+        concurrency=args.concurrency,
+        rate=args.rate or None,
+        burst=args.burst,
+        max_attempts=args.max_attempts,
+    ))
+    summary["connections"] = connection_stats.as_dict()
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Vectorized backtest: signal arrays for synthetic strategies over millions of bars.
+
+    python -m benchmarks.backtest [--bars 2000000] [--strategies 200] [--conditions 8]
+
+Writes random-walk 1m bars (375 a day from 09:15) for each underlying of
+benchmarks.synthetic as .npy files in a temporary directory, then runs the
+corpus through backtest.Backtester. "cold" is the first strategy, which
+pays for loading and the indicators it needs; "warm" reruns every strategy
+against the filled indicator cache. The exponential smoothers are checked
+against a plain per-bar loop first; the run exits 1 on a mismatch.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backtest import Backtester, DataSource, ema, wilder
+from benchmarks.synthetic import UNDERLYINGS, corpus
+
+BARS_PER_DAY = 375
+SESSION_OPEN = np.datetime64("2015-01-01T09:15", "s").astype(np.int64)
+
+
+def random_walk(n, seed):
+    rng = np.random.default_rng(seed)
+    day, minute = np.divmod(np.arange(n), BARS_PER_DAY)
+    timestamp = SESSION_OPEN + day * 86400 + minute * 60
+    close = 20000 * np.exp(np.cumsum(rng.normal(0, 4e-4, n)))
+    open = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 2e-4, n)) * close
+    high, low = np.maximum(open, close) + spread, np.minimum(open, close) - spread
+    volume = rng.integers(1000, 50000, n).astype(np.float64)
+    return np.column_stack((timestamp, open, high, low, close, volume))
+
+
+def check_smoothing(n=5000):
+    x = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, n))
+    worst = 0.0
+    for period in (2, 14, 200):
+        for alpha, fn in ((2 / (period + 1), ema), (1 / period, wilder)):
+            expected = [math.nan] * n
+            expected[period - 1] = x[:period].mean()
+            for i in range(period, n):
+                expected[i] = (1 - alpha) * expected[i - 1] + alpha * x[i]
+            worst = max(worst, float(np.nanmax(np.abs(fn(x, period) - np.array(expected)))))
+    return worst
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=2_000_000, help="1m bars per symbol")
+    parser.add_argument("--strategies", type=int, default=200)
+    parser.add_argument("--conditions", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    worst = check_smoothing()
+    if worst > 1e-9:
+        print(f"exponential smoothing differs from the per-bar loop by {worst}", file=sys.stderr)
+        sys.exit(1)
+
+    strategies = corpus(args.strategies, seed=args.seed, n_conditions=args.conditions)
+    with tempfile.TemporaryDirectory() as directory:
+        for i, (_, token) in enumerate(UNDERLYINGS):
+            np.save(os.path.join(directory, f"{token}.npy"), random_walk(args.bars, args.seed + i))
+        source = DataSource(directory)
+        t0 = time.perf_counter()
+        for _, token in UNDERLYINGS:
+            source.bars(token)
+        load_s = time.perf_counter() - t0
+
+    # One backtester per underlying, each evaluated on its own bars
+    tokens = dict(UNDERLYINGS)
+    backtesters = {token: Backtester(source, base=token) for token in tokens.values()}
+
+    def backtester_for(strategy):
+        return backtesters[tokens[strategy["strategy_sets"][0]["phases"][0]["positions"][0]["instrument"]["symbol_token"]]]
+
+    def computed():
+        return sum(backtester.misses for backtester in backtesters.values())
+
+    t0 = time.perf_counter()
+    backtester_for(strategies[0]).run(strategies[0])
+    cold_s = time.perf_counter() - t0
+    results = {}
+    for label in ("first_pass", "warm"):
+        before = computed()
+        signals = 0
+        t0 = time.perf_counter()
+        for strategy in strategies:
+            for phase in backtester_for(strategy).run(strategy):
+                if phase["signal"] is not None:
+                    signals += int(phase["signal"].sum())
+        elapsed = time.perf_counter() - t0
+        results[label] = {
+            "ms_per_strategy": round(elapsed / len(strategies) * 1000, 2),
+            "bars_per_s": round(len(strategies) * args.bars / elapsed),
+            "indicators_computed": computed() - before,
+            "signals": signals,
+        }
+
+    print(json.dumps({
+        "bars_per_symbol": args.bars,
+        "symbols": len(UNDERLYINGS),
+        "load_npy_s": round(load_s, 3),
+        "cold_first_strategy_s": round(cold_s, 3),
+        **results,
+        "cache": {
+            "hits": sum(backtester.hits for backtester in backtesters.values()),
+            "misses": computed(),
+        },
+        "smoothing_max_error": worst,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
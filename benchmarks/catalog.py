@@ -0,0 +1,122 @@
+"""
+Keyword canonicalization on synthetic misspellings of every schema keyword.
+
+    python -m benchmarks.catalog [--variants 5] [--seed 7]
+
+Each keyword gets case/spacing variants and single-edit typos (deletion,
+substitution, adjacent swap). A rewrite to another keyword counts as
+`wrong`; a variant left alone counts as `missed`. Timings are per lookup
+with the result cache cleared, then per canonicalize() of a strategy.
+"""
+import argparse
+import copy
+import json
+import random
+import string
+import time
+
+from benchmarks.suite import percentile
+from keyword_catalog import KeywordCatalog, load_reference, normalize
+from llm_pipeline import DEFAULT_SCHEMA_PATH, schemas
+from stub_llm import default_strategy
+
+
+def typo(rng, name):
+    chars = list(name)
+    letters = [i for i, c in enumerate(chars) if c.isalpha()]
+    if len(letters) < 2:
+        return name
+    kind = rng.choice(("delete", "substitute", "swap", "case", "space"))
+    i = rng.choice(letters)
+    if kind == "delete":
+        del chars[i]
+    elif kind == "substitute":
+        chars[i] = rng.choice(string.ascii_lowercase)
+    elif kind == "swap" and i + 1 < len(chars):
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    elif kind == "case":
+        return name.swapcase()
+    elif kind == "space":
+        return name.replace(" ", "") if " " in name else name.replace("", " ").strip()
+    return "".join(chars)
+
+
+def strategy_with(names):
+    """default_strategy with one extra comparison per (field, name)."""
+    strategy = default_strategy("NIFTY")
+    phase = strategy["strategy_sets"][0]["phases"][0]
+    conditions = [phase["conditions"]]
+    for field, name in names:
+        operand = {field: name, "timeframe": "5m", "position_offset": 0}
+        conditions.append({"condition_type": "COMPARE", "left": operand, "operator": ">", "right": 0})
+    phase["conditions"] = {"condition_type": "AND", "conditions": conditions}
+    return strategy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--variants", type=int, default=5, help="typos per keyword")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    t0 = time.perf_counter()
+    catalog = KeywordCatalog(schemas.get(args.schema).schema, load_reference())
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    cases = []
+    for field, index in catalog.fields.items():
+        for _, keyword in index.keywords:
+            if keyword is None:
+                continue
+            for _ in range(args.variants):
+                variant = typo(rng, keyword.name)
+                if variant != keyword.name and normalize(variant) not in index.exact | index.aliases.keys():
+                    cases.append((field, variant, keyword.name))
+
+    fixed = wrong = missed = 0
+    examples = []
+    lookup_s = []
+    for field, variant, expected in cases:
+        catalog._cache.clear()
+        t0 = time.perf_counter()
+        match = catalog.lookup(variant, field)
+        lookup_s.append(time.perf_counter() - t0)
+        if match is None:
+            missed += 1
+        elif match.keyword.name == expected:
+            fixed += 1
+        else:
+            wrong += 1
+            examples.append(f"{variant!r} -> {match.keyword.name!r} (meant {expected!r})")
+
+    strategies = [
+        strategy_with(rng.sample([(field, variant) for field, variant, _ in cases], 4)) for _ in range(200)
+    ]
+    canonicalize_s = []
+    for strategy in strategies:
+        document = copy.deepcopy(strategy)
+        t0 = time.perf_counter()
+        catalog.canonicalize(document)
+        canonicalize_s.append(time.perf_counter() - t0)
+
+    lookup_s.sort()
+    canonicalize_s.sort()
+    print(json.dumps({
+        "keywords": sum(len(index.exact) for index in catalog.fields.values()),
+        "aliases": {field: len(index.aliases) for field, index in catalog.fields.items()},
+        "build_ms": round(build_ms, 2),
+        "typos": len(cases),
+        "fixed": fixed,
+        "wrong": wrong,
+        "missed": missed,
+        "recall": round(fixed / len(cases), 3) if cases else 0.0,
+        "lookup_us": {q: round(percentile(lookup_s, n) * 1e6, 1) for q, n in (("p50", 50), ("p99", 99))},
+        "canonicalize_us": {q: round(percentile(canonicalize_s, n) * 1e6, 1) for q, n in (("p50", 50), ("p99", 99))},
+        "wrong_examples": examples[:10],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
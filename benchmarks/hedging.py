@@ -0,0 +1,123 @@
+"""
+Hedged generation against a single attempt, on an in-process StubGroq
+with a heavy-tailed latency and some unparseable completions.
+
+    python -m benchmarks.hedging [--requests 200] [--concurrency 8] [--stall 0.05]
+
+Each mode runs the same request stream through llm_pipeline.convert(hedge=True);
+"off" races a single attempt, so every mode takes the same streaming path.
+Reports request latency quantiles, LLM calls and tokens per request.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_pipeline
+import metrics
+from benchmarks.suite import percentile
+from hedging import ConcurrencyBudget, Hedger
+from stub_llm import StubGroq, default_responder
+
+PROMPTS = (
+    "Buy NIFTY ATM call when RSI(14) on 5m crosses above 60",
+    "Sell BANKNIFTY straddle if EMA 9 crosses below EMA 21",
+    "Buy FINNIFTY ATM+1 put when supertrend turns red, exit at 15:10",
+    "Buy SENSEX ATM call when MACD crosses above signal on 15m",
+)
+MODES = {
+    "off": {"max_attempts": 1, "priority": False},
+    "hedged": {"max_attempts": 2, "priority": False},
+    "priority": {"max_attempts": 2, "priority": True},
+}
+
+
+def make_client(args, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def latency():
+        with lock:
+            stall = rng.random() < args.stall
+            base = rng.lognormvariate(0, 0.3) * args.latency
+        return base * args.stall_factor if stall else base
+
+    def responder(messages):
+        content = default_responder(messages)
+        with lock:
+            broken = rng.random() < args.malformed
+        return content[: len(content) // 3] + '"}' if broken else content
+
+    return StubGroq(latency=latency, responder=responder, stream_chunk_size=64)
+
+
+def run_mode(args, schema, mode):
+    options = MODES[mode]
+    llm_pipeline.hedger = Hedger(
+        ConcurrencyBudget(args.budget), max_attempts=options["max_attempts"],
+        quantile=args.quantile, default_delay=args.default_delay,
+    )
+    metrics.registry.clear()
+    client = make_client(args, args.seed)
+    latencies, failures = [], 0
+
+    def one(i):
+        nonlocal failures
+        t0 = time.perf_counter()
+        try:
+            llm_pipeline.convert(
+                schema, PROMPTS[i % len(PROMPTS)], client=client, use_fast_path=False, use_semantic_cache=False,
+                hedge=True, priority=options["priority"],
+            )
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(one, range(args.requests)))
+    time.sleep(args.latency * args.stall_factor) # let cancelled attempts report their tokens
+    tokens = sum(v for (name, _), v in metrics.registry.counters.items() if name == "llm_tokens_total")
+    ordered = sorted(latencies)
+    report = llm_pipeline.hedger.report()
+    return {
+        "latency_s": {f"p{q}": round(percentile(ordered, q), 3) for q in (50, 95, 99)},
+        "failed": failures,
+        "llm_calls_per_request": round(client.calls / args.requests, 3),
+        "tokens_per_request": round(tokens / args.requests),
+        "hedge_rate": report["hedge_rate"],
+        "hedge_wins": report["hedge_wins"],
+        "denied": report["denied"],
+        "budget_peak": report["budget"]["peak"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight")
+    parser.add_argument("--budget", type=int, default=12, help="LLM attempts in flight")
+    parser.add_argument("--latency", type=float, default=0.1, help="median attempt seconds")
+    parser.add_argument("--stall", type=float, default=0.05, help="fraction of attempts that stall")
+    parser.add_argument("--stall-factor", type=float, default=10.0)
+    parser.add_argument("--malformed", type=float, default=0.05, help="fraction of unparseable completions")
+    parser.add_argument("--quantile", type=float, default=0.9)
+    parser.add_argument("--default-delay", type=float, default=0.2)
+    parser.add_argument("--modes", default="off,hedged,priority")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    schema = llm_pipeline.load_schema()
+    results = {mode: run_mode(args, schema, mode) for mode in args.modes.split(",")}
+    if "off" in results:
+        base = results["off"]
+        for mode, result in results.items():
+            if mode != "off":
+                result["tail_saved_s"] = {q: round(base["latency_s"][q] - v, 3) for q, v in result["latency_s"].items()}
+                result["extra_tokens"] = round(result["tokens_per_request"] / base["tokens_per_request"] - 1, 3)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
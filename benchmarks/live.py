@@ -0,0 +1,134 @@
+"""
+Live evaluator: bar and tick throughput, checked against the vectorized backtest.
+
+    python -m benchmarks.live [--bars 20000] [--strategies 200] [--ticks-per-bar 4]
+
+Streams random-walk 1m bars (benchmarks.backtest.random_walk) of every
+underlying, interleaved in time, into one live_evaluator.LiveEvaluator
+holding the whole synthetic corpus. Each phase's value after every bar of
+its underlying but the last is compared with backtest.Backtester's signal;
+the run exits 1 on a mismatch. Then the same bars are timed again, and
+once more as ticks (open, high/low, close, ... per bar, in the bar's
+minute), against a fresh evaluator each time.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from backtest import Backtester, Bars, DataSource
+from benchmarks.backtest import random_walk
+from benchmarks.synthetic import UNDERLYINGS, corpus
+from live_evaluator import LiveEvaluator
+
+
+def _underlying(strategy):
+    symbol = strategy["strategy_sets"][0]["phases"][0]["positions"][0]["instrument"]["symbol_token"]
+    return dict(UNDERLYINGS)[symbol]
+
+
+def _stream(data):
+    """(token, timestamp, open, high, low, close, volume) rows of every underlying, bar by bar."""
+    columns = {token: [column.tolist() for column in rows.T] for token, rows in data.items()}
+    for i in range(len(next(iter(data.values())))):
+        for token, (timestamp, open, high, low, close, volume) in columns.items():
+            yield token, int(timestamp[i]), open[i], high[i], low[i], close[i], volume[i]
+
+
+def _ticks(rows, per_bar):
+    """Ticks spread over each bar's minute, through its open, high and low to its close."""
+    step = 60 // per_bar
+    for token, timestamp, open, high, low, close, volume in rows:
+        prices = [open, high, low, close] if per_bar >= 4 else [open, close]
+        prices += [close] * (per_bar - len(prices))
+        for j, price in enumerate(prices[:per_bar]):
+            yield token, timestamp + j * step, price, volume / per_bar
+
+
+def _evaluator(strategies):
+    evaluator = LiveEvaluator()
+    for strategy in strategies:
+        evaluator.add_strategy(strategy)
+    return evaluator
+
+
+def check(strategies, data):
+    """Phase/bar values that differ from the backtest, and the number compared."""
+    source = DataSource(bars={token: Bars(*rows.T[:1].astype(np.int64), *rows.T[1:]) for token, rows in data.items()})
+    backtesters = {token: Backtester(source, base=token) for token in data}
+    expected = [[result["signal"] for result in backtesters[_underlying(s)].run(s)] for s in strategies]
+
+    evaluator = _evaluator(strategies)
+    by_token = {}
+    for strategy_id, strategy in enumerate(strategies):
+        by_token.setdefault(_underlying(strategy), []).append(strategy_id)
+    bar = dict.fromkeys(data, 0)
+    # At the last bar the backtest's trailing candles count as complete (no data follows); live they are still open
+    last = len(next(iter(data.values()))) - 1
+    mismatches = compared = 0
+    for token, timestamp, *prices in _stream(data):
+        evaluator.update_bar(token, timestamp, *prices)
+        i = bar[token]
+        bar[token] += 1
+        if i == last:
+            continue
+        for strategy_id in by_token.get(token, ()):
+            for (_, _, value), signal in zip(evaluator.phase_values(strategy_id), expected[strategy_id]):
+                if signal is not None:
+                    compared += 1
+                    mismatches += bool(value != signal[i])
+    return mismatches, compared
+
+
+def timed(strategies, updates, feed):
+    evaluator = _evaluator(strategies)
+    signals = 0
+    t0 = time.perf_counter()
+    for update in updates:
+        signals += len(feed(evaluator)(*update))
+    elapsed = time.perf_counter() - t0
+    return {
+        "updates": evaluator.updates,
+        "updates_per_s": round(evaluator.updates / elapsed),
+        "us_per_update": round(elapsed / evaluator.updates * 1e6, 2),
+        "candles_closed": evaluator.candles,
+        "indicator_updates_per_s": round(evaluator.indicator_updates / elapsed),
+        "comparisons_evaluated_per_update": round(evaluator.evaluations / evaluator.updates, 1),
+        "signals": signals,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bars", type=int, default=20_000, help="1m bars per symbol")
+    parser.add_argument("--strategies", type=int, default=200)
+    parser.add_argument("--conditions", type=int, default=8)
+    parser.add_argument("--ticks-per-bar", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    strategies = corpus(args.strategies, seed=args.seed, n_conditions=args.conditions)
+    data = {token: random_walk(args.bars, args.seed + i) for i, (_, token) in enumerate(UNDERLYINGS)}
+
+    mismatches, compared = check(strategies, data)
+    registered = _evaluator(strategies)
+    feeds = sum(len(c.feeds) for state in registered._symbols.values() for c in state.candles.values())
+    bars = list(_stream(data))
+    results = {
+        "bars_per_symbol": args.bars,
+        "strategies": args.strategies,
+        "shared": {"comparisons": len(registered._compares), "indicator_feeds": feeds},
+        "bars": timed(strategies, bars, lambda evaluator: evaluator.update_bar),
+        "ticks": timed(strategies, _ticks(bars, args.ticks_per_bar), lambda evaluator: evaluator.update),
+        "checked_phase_bars": compared,
+        "mismatches": mismatches,
+    }
+    print(json.dumps(results, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Memory and traversal: raw dicts vs. the slotted strategy model.
+
+    python -m benchmarks.model [--count 100000]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from benchmarks import synthetic
+from json_to_yaml import convert_json_to_text
+from strategy_model import Comparison, load_strategy, render_strategy
+
+
+def dict_symbols(doc):
+    """Comparisons and distinct operand symbols, walking the raw JSON."""
+    count, symbols = 0, set()
+    for strategy_set in doc.get("strategy_sets", []):
+        for phase in strategy_set.get("phases", []):
+            stack = [phase.get("conditions", {})]
+            while stack:
+                node = stack.pop()
+                if node.get("condition_type") == "GROUP":
+                    stack.extend(node.get("conditions", []))
+                elif node.get("condition_type") == "COMPARE":
+                    count += 1
+                    for side in (node.get("left"), node.get("right")):
+                        if isinstance(side, dict):
+                            inst = side.get("inputs", {}).get("instrument") or side.get("instrument") or {}
+                            symbols.add(inst.get("symbol_token"))
+    return count, symbols
+
+
+def model_symbols(strategy):
+    count, symbols = 0, set()
+    for node in strategy.iter_conditions():
+        if type(node) is Comparison:
+            count += 1
+            for side in (node.left, node.right):
+                if side.instrument is not None:
+                    symbols.add(side.instrument.symbol)
+    return count, symbols
+
+
+def measure(build):
+    """Result and bytes still allocated after building it (tracing slows the build itself)."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(item)
+    return time.perf_counter() - t0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--conditions", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Stored strategies arrive as JSON text (cache rows, batch results)
+    stored = [json.dumps(doc) for doc in synthetic.corpus(args.count, args.seed, n_conditions=args.conditions)]
+
+    dicts, dict_bytes = measure(lambda: [json.loads(s) for s in stored])
+    models, model_bytes = measure(lambda: [load_strategy(json.loads(s)) for s in stored])
+    sample = stored[:10000]
+    loads_us = timed(json.loads, sample) / len(sample) * 1e6
+    model_us = timed(lambda s: load_strategy(json.loads(s)), sample) / len(sample) * 1e6
+
+    for doc, model in zip(dicts[:1000], models[:1000]):
+        assert convert_json_to_text(doc) == render_strategy(model)
+        assert dict_symbols(doc) == model_symbols(model)
+
+    results = {
+        "strategies": args.count,
+        "memory_mb": {"dicts": round(dict_bytes / 2**20, 1), "model": round(model_bytes / 2**20, 1)},
+        "memory_saving": round(1 - model_bytes / dict_bytes, 3),
+        "load_us_per_strategy": {"json_loads": round(loads_us, 1), "json_loads_plus_model": round(model_us, 1)},
+        "traverse_s": {"dicts": round(timed(dict_symbols, dicts), 3), "model": round(timed(model_symbols, models), 3)},
+        "render_s": {"dicts": round(timed(convert_json_to_text, dicts), 3), "model": round(timed(render_strategy, models), 3)},
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
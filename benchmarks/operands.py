@@ -0,0 +1,69 @@
+"""
+Per-operand cost: registry dispatch vs. the isinstance/.get probe chain.
+
+    python -m benchmarks.operands [--repeat 20000]
+"""
+import argparse
+import json
+import time
+
+from json_to_yaml import parse_instrument_str, parse_operand
+
+NIFTY = {"exchange": "NSE", "symbol_token": "NIFTY 50", "instrument_type": "EQUITY"}
+OPERANDS = {
+    "number": {"type": "number", "title": "0"},
+    "literal": 42,
+    "indicator": {"function_name": "EMA", "timeframe": "5m", "position_offset": 0, "instrument": NIFTY, "params": {"period": 20}},
+    "keyword": {"keyword": "LTP", "inputs": {"instrument": NIFTY}},
+    "bare_keyword": {"keyword": "Now"},
+    "candle": {"pattern_name": "HAMMER", "timeframe": "15m", "instrument": NIFTY},
+    "set_runtime": {"keyword": "Set Runtime", "params": {"variable_name": "Low", "value": {"function_name": "LOW", "instrument": NIFTY}}},
+    "get_runtime": {"keyword": "Get Runtime Number", "params": {"variable_name": "Low"}},
+}
+
+
+def chain_operand(op):
+    """The probe chain the registry replaced."""
+    if isinstance(op, dict) and op.get("type") == "number":
+        return str(op.get("title", op.get("value", "0")))
+    if not isinstance(op, dict):
+        return str(op)
+    name = op.get("function_name") or op.get("keyword") or op.get("pattern_name")
+    if name:
+        if name == "Set Runtime":
+            params = op.get("params", {})
+            return f"Set Runtime({params.get('variable_name', 'Var')} = {chain_operand(params.get('value', ''))})"
+        if name in ["Get Runtime", "Get Runtime Number"]:
+            return f"Get Runtime ({op.get('params', {}).get('variable_name', '')})"
+        inst = op.get("inputs", {}).get("instrument") or op.get("instrument")
+        if inst:
+            tf = op.get("timeframe")
+            symbol = parse_instrument_str(inst)
+            return f"{name} ({symbol}, {tf})" if tf else f"{name} ({symbol})"
+        return name
+    return str(op)
+
+
+def per_call_ns(fn, op, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(op)
+    return (time.perf_counter() - t0) / repeat * 1e9
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, op in OPERANDS.items():
+        assert parse_operand(op) == chain_operand(op), name
+        chain = per_call_ns(chain_operand, op, args.repeat)
+        registry = per_call_ns(parse_operand, op, args.repeat)
+        results[name] = {"chain_ns": round(chain), "registry_ns": round(registry), "ratio": round(chain / registry, 2)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Condition-tree optimizer: node counts and operand fetches before and after.
+
+    python -m benchmarks.optimizer [--strategies 2000] [--conditions 8] [--noise 0.3]
+
+The synthetic corpus is roughened the way LLM output tends to be: some
+comparisons are wrapped in single-member or same-logic groups, repeated,
+written constant-first (`30 < RSI`) or joined by a `1 >= 1`. Every
+optimized tree is checked against its original on random truth
+assignments of its comparisons; the run exits 1 on any mismatch.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import zlib
+
+from benchmarks.synthetic import corpus
+from condition_optimizer import FLIPPED, SELF_COMPARISON, OperandTable, operand_key, optimize_conditions, optimize_strategy
+
+ONE = {"type": "number", "title": "1"}
+TRIVIAL = {"condition_type": "COMPARE", "left": ONE, "operator": ">=", "right": ONE}
+NUMERIC = {">": float.__gt__, "<": float.__lt__, ">=": float.__ge__, "<=": float.__le__, "==": float.__eq__,
+           "!=": float.__ne__}
+
+
+def roughen(node, rng, noise):
+    if node.get("condition_type") != "GROUP":
+        if rng.random() < noise and isinstance(node["right"], (int, float)) and node["operator"] in FLIPPED:
+            node = {**node, "left": node["right"], "operator": FLIPPED[node["operator"]], "right": node["left"]}
+        if rng.random() < noise:
+            node = {"condition_type": "GROUP", "connection_logic": rng.choice(("AND", "OR")), "conditions": [node]}
+        return node
+    logic = node["connection_logic"]
+    members = [roughen(child, rng, noise) for child in node["conditions"]]
+    if rng.random() < noise:
+        members.append(rng.choice(members))
+    if rng.random() < noise and logic == "AND":
+        members.insert(rng.randrange(len(members) + 1), TRIVIAL)
+    if rng.random() < noise:
+        split = rng.randrange(1, len(members) + 1)
+        members = [{"condition_type": "GROUP", "connection_logic": logic, "conditions": members[:split]}] + members[split:]
+    return {**node, "conditions": members}
+
+
+def _number(op):
+    if isinstance(op, dict):
+        return float(op["title"]) if op.get("type") == "number" else None
+    return float(op)
+
+
+def evaluate(node, seed):
+    """The tree's value when each distinct comparison is true or false at random (per seed)."""
+    if node.get("condition_type") == "GROUP":
+        values = [evaluate(child, seed) for child in node["conditions"]]
+        return all(values) if node.get("connection_logic", "AND") == "AND" else any(values)
+    left, right = _number(node["left"]), _number(node["right"])
+    if left is not None and right is not None:
+        return NUMERIC[node["operator"]](left, right)
+    if operand_key(node["left"]) == operand_key(node["right"]):
+        return SELF_COMPARISON[node["operator"]]
+    # `30 < RSI` and `RSI > 30` share a key once both are in canonical form
+    return zlib.crc32(f"{seed}:{operand_key(optimize_conditions(node))}".encode()) & 1 == 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--strategies", type=int, default=2000)
+    parser.add_argument("--conditions", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--noise", type=float, default=0.3, help="chance of each roughening step")
+    parser.add_argument("--checks", type=int, default=16, help="truth assignments compared per tree")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    strategies = corpus(args.strategies, seed=args.seed, n_conditions=args.conditions, depth=args.depth)
+    for strategy in strategies:
+        for phase in strategy["strategy_sets"][0]["phases"]:
+            if phase.get("conditions", {}).get("condition_type") == "GROUP":
+                phase["conditions"] = roughen(phase["conditions"], rng, args.noise)
+
+    before_table = OperandTable()
+    totals, mismatches = {}, 0
+    t0 = time.perf_counter()
+    optimized = [optimize_strategy(strategy) for strategy in strategies]
+    elapsed = time.perf_counter() - t0
+    for strategy, (result, report) in zip(strategies, optimized):
+        for name, value in report.items():
+            if isinstance(value, dict):
+                bucket = totals.setdefault(name, {})
+                for key, count in value.items():
+                    bucket[key] = bucket.get(key, 0) + count
+            else:
+                totals[name] = totals.get(name, 0) + value
+        for original, phase in zip(strategy["strategy_sets"][0]["phases"], result["strategy_sets"][0]["phases"]):
+            if "conditions" not in original:
+                continue
+            before_table.add_conditions(original["conditions"])
+            for seed in range(args.checks):
+                if evaluate(original["conditions"], seed) != evaluate(phase["conditions"], seed):
+                    mismatches += 1
+                    break
+
+    before, after = totals["before"], totals["after"]
+    results = {
+        "strategies": args.strategies,
+        "nodes": {"before": before, "after": after, "reduction": round(1 - after["nodes"] / before["nodes"], 3)},
+        "rewrites": {name: totals[name] for name in ("flattened", "folded", "deduplicated")},
+        "operand_fetches": {
+            "per_reference": before_table.references,
+            "shared_table": totals["operands"],
+        },
+        "us_per_strategy": round(elapsed / args.strategies * 1e6, 1),
+        "mismatches": mismatches,
+    }
+    print(json.dumps(results, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
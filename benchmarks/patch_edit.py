@@ -0,0 +1,90 @@
+"""
+Follow-up edits as a JSON Patch against full regeneration.
+
+    python -m benchmarks.patch_edit [--strategies 100] [--conditions 8] [--tokens-per-second 250]
+
+Each synthetic strategy is edited with "same as before but make it ATM+1
+and 2 lots": once through llm_pipeline.edit_strategy (StubGroq answers
+with a patch) and once through convert(), whose stub answers with the
+whole edited strategy pretty-printed, as models do. Tokens are the stub's
+usage; LLM latency is modelled as --ttft plus completion tokens at
+--tokens-per-second, since generation time dominates and the stub does
+not generate. Local time is what the pipeline itself spent.
+"""
+import argparse
+import json
+
+import llm_pipeline
+import metrics
+from benchmarks.suite import percentile
+from benchmarks.synthetic import corpus
+from json_patch import apply_patch
+from json_to_yaml import render_phase_texts
+from stub_llm import StubGroq, default_patch
+
+REQUEST = "same as before but make it ATM+1 and 2 lots"
+
+
+def usage(spans):
+    calls = [span for span in spans if span["span"] == "llm_call"]
+    return sum(span["prompt_tokens"] for span in calls), sum(span["completion_tokens"] for span in calls)
+
+
+def summarize(rows, args):
+    completion = sorted(row[1] for row in rows)
+    modelled = sorted(args.ttft + row[1] / args.tokens_per_second for row in rows)
+    local = sorted(row[2] for row in rows)
+    return {
+        "prompt_tokens": round(sum(row[0] for row in rows) / len(rows)),
+        "completion_tokens": round(sum(completion) / len(rows)),
+        "llm_latency_s": {f"p{q}": round(percentile(modelled, q), 3) for q in (50, 99)},
+        "local_ms": {f"p{q}": round(percentile(local, q) * 1000, 2) for q in (50, 99)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--strategies", type=int, default=100)
+    parser.add_argument("--conditions", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--legs", type=int, default=2)
+    parser.add_argument("--tokens-per-second", type=float, default=250.0)
+    parser.add_argument("--ttft", type=float, default=0.2, help="seconds to the first token")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    schema = llm_pipeline.load_schema()
+    strategies = corpus(args.strategies, seed=args.seed, n_conditions=args.conditions, depth=args.depth, legs=args.legs)
+    patch_rows, full_rows = [], []
+    for strategy in strategies:
+        metrics.registry.clear()
+        result = llm_pipeline.edit_strategy(
+            schema, strategy, REQUEST, client=StubGroq(), phase_texts=render_phase_texts(strategy),
+        )
+        llm_s = sum(span["duration_ms"] for span in result["spans"] if span["span"] == "llm_call") / 1000
+        local_s = sum(span["duration_ms"] for span in result["spans"]) / 1000 - llm_s
+        patch_rows.append((*usage(result["spans"]), local_s))
+
+        # The full regeneration a model would emit for the same edit
+        messages = llm_pipeline.build_edit_messages(strategy, REQUEST)
+        edited = apply_patch(strategy, json.loads(default_patch(messages)))
+        client = StubGroq(responder=lambda messages, edited=edited: json.dumps(edited, indent=2))
+        result = llm_pipeline.convert(
+            schema, REQUEST, client=client, use_fast_path=False, use_semantic_cache=False,
+        )
+        llm_s = sum(span["duration_ms"] for span in result["spans"] if span["span"] == "llm_call") / 1000
+        local_s = sum(span["duration_ms"] for span in result["spans"]) / 1000 - llm_s
+        full_rows.append((*usage(result["spans"]), local_s))
+
+    results = {"patch": summarize(patch_rows, args), "regenerate": summarize(full_rows, args)}
+    patch, full = results["patch"], results["regenerate"]
+    results["reduction"] = {
+        "completion_tokens": round(full["completion_tokens"] / patch["completion_tokens"], 1),
+        "prompt_tokens": round(full["prompt_tokens"] / patch["prompt_tokens"], 1),
+        "llm_latency_p50": round(full["llm_latency_s"]["p50"] / patch["llm_latency_s"]["p50"], 1),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Explicit-stack renderer vs. the recursive join-and-resplit one it replaced.
+
+    python -m benchmarks.renderer [--conditions 5000] [--depth 500]
+"""
+import argparse
+import io
+import json
+import sys
+import time
+
+from json_to_yaml import convert_json_to_text, parse_operand, write_json_as_text
+
+
+def recursive_condition(node):
+    """The previous renderer: one Python frame and one joined string per GROUP."""
+    if not isinstance(node, dict):
+        return ""
+    if node.get("condition_type") == "GROUP":
+        parts = [recursive_condition(c) for c in node.get("conditions", [])]
+        if len(parts) > 1:
+            return f"\n      {node.get('connection_logic', 'AND')} ".join(parts)
+        return parts[0] if parts else ""
+    if node.get("condition_type") == "COMPARE":
+        return f"{parse_operand(node.get('left'))} {node.get('operator')} {parse_operand(node.get('right'))}"
+    return parse_operand(node) if "keyword" in node else ""
+
+
+def recursive_render(strategy):
+    lines = []
+    for phase in strategy["strategy_sets"][0]["phases"]:
+        lines.extend(f"    {line}" for line in recursive_condition(phase["conditions"]).split("\n"))
+    return "\n".join(lines)
+
+
+def compare(i):
+    return {
+        "condition_type": "COMPARE",
+        "left": {"keyword": "LTP", "inputs": {"instrument": {"symbol_token": "NIFTY 50"}}},
+        "operator": ">",
+        "right": i,
+    }
+
+
+def strategy(conditions):
+    return {"strategy_sets": [{"set_index": 1, "phases": [{"phase_type": "Entry", "conditions": conditions, "positions": []}]}]}
+
+
+def wide(n):
+    return strategy({"condition_type": "GROUP", "connection_logic": "AND", "conditions": [compare(i) for i in range(n)]})
+
+
+def deep(depth):
+    """Every level is `compare AND (next level)`, alternating AND/OR."""
+    node = compare(depth)
+    for level in range(depth - 1, -1, -1):
+        node = {
+            "condition_type": "GROUP",
+            "connection_logic": "AND" if level % 2 else "OR",
+            "conditions": [compare(level), node],
+        }
+    return strategy(node)
+
+
+def timed(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return round(best * 1000, 3)
+
+
+def to_devnull(doc):
+    with open(__import__("os").devnull, "w") as f:
+        write_json_as_text(doc, f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--conditions", type=int, default=5000)
+    parser.add_argument("--depth", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    cases = {
+        f"wide_{args.conditions}": wide(args.conditions),
+        f"deep_{args.depth // 5}": deep(args.depth // 5),
+        f"deep_{args.depth}": deep(args.depth),
+        f"deep_{args.depth * 10}": deep(args.depth * 10),
+    }
+    results = {}
+    for name, doc in cases.items():
+        row = {
+            "stack_ms": timed(convert_json_to_text, doc, args.repeat),
+            "stack_to_file_ms": timed(to_devnull, doc, args.repeat),
+            "output_kb": round(len(convert_json_to_text(doc)) / 1024, 1),
+        }
+        try:
+            row["recursive_ms"] = timed(recursive_render, doc, args.repeat)
+        except RecursionError:
+            row["recursive_ms"] = f"RecursionError (limit {sys.getrecursionlimit()})"
+        results[name] = row
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
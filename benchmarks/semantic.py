@@ -0,0 +1,89 @@
+"""
+Near-duplicate cache over a stream of prompts from a few templates.
+
+    python -m benchmarks.semantic [--prompts 2000] [--seed 7]
+
+Each template family is seeded by its first prompt (what an LLM call would
+add); later prompts differ in symbol, offsets, widths, times and lots.
+Every hit is checked against fast_path's own conversion of the same
+prompt, so `wrong` must be 0.
+"""
+import argparse
+import json
+import random
+import time
+
+import fast_path
+from llm_pipeline import DEFAULT_SCHEMA_PATH, schemas
+from schema_validator import get_validator
+from semantic_cache import SemanticCache
+
+TEMPLATES = (
+    "{action} {symbol} ATM{offset} {option} after {time}",
+    "{action} {symbol} strangle +-{n} strikes, exit at {time}",
+    "{action} {symbol} ATM straddle at {time} {lots} lots NRML",
+    "buy {symbol} atm{offset} {option} between {time} and 15:{minute} qty {qty} intraday",
+    "{action} the {symbol} {n} strikes OTM {option} next week expiry",
+)
+
+
+def prompt(rng, template):
+    return template.format(
+        action=rng.choice(["Buy", "Sell"]),
+        symbol=rng.choice(["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY", "SENSEX"]),
+        offset=rng.choice(["+1", "+2", "-1", "-3", "+5"]),
+        option=rng.choice(["call", "put"]),
+        time=f"{rng.randint(9, 14)}:{rng.choice(['00', '15', '30', '45'])}",
+        minute=rng.choice(["00", "10", "20"]),
+        n=rng.randint(1, 5),
+        lots=rng.randint(1, 9),
+        qty=rng.choice([25, 50, 75, 100]),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--prompts", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    args = parser.parse_args(argv)
+
+    entry = schemas.get(args.schema)
+    validator = get_validator(entry.schema, entry.version)
+    rng = random.Random(args.seed)
+    cache = SemanticCache()
+    hits = wrong = llm_calls = 0
+    lookup_s = []
+    for _ in range(args.prompts):
+        text = prompt(rng, rng.choice(TEMPLATES))
+        expected = fast_path.parse(text)
+        if expected is None:
+            continue
+        t0 = time.perf_counter()
+        hit = cache.lookup(text, entry.version, validator)
+        lookup_s.append(time.perf_counter() - t0)
+        if hit is None:
+            llm_calls += 1
+            cache.add(text, expected.strategy, entry.version)
+        else:
+            hits += 1
+            wrong += hit.strategy != expected.strategy
+
+    lookup_s.sort()
+    print(json.dumps({
+        "prompts": len(lookup_s),
+        "hits": hits,
+        "wrong": wrong,
+        "llm_calls": llm_calls,
+        "hit_rate": round(hits / len(lookup_s), 3) if lookup_s else 0.0,
+        "lookup_us": {
+            "p50": round(lookup_s[len(lookup_s) // 2] * 1e6, 1),
+            "p99": round(lookup_s[int(len(lookup_s) * 0.99)] * 1e6, 1),
+        },
+        "stats": cache.stats,
+    }, indent=2))
+    return 1 if wrong else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+"""
+Load test of conversion_service.py against stub_server.py.
+
+    python -m benchmarks.service_load --concurrency 8,32,64 --requests 400 --latency lognormal:0.2,0.3
+
+Starts the stub LLM server and the conversion service in-process (or
+targets --url), then for each offered concurrency sends --requests
+conversions from --clients client ids over keep-alive connections;
+a rejected client waits out Retry-After (capped by --max-backoff).
+Reports accepted throughput, p50/p99 latency of answered and of rejected
+requests, and the status mix: past the service's capacity the surplus is
+turned away with 429 in milliseconds instead of queueing without bound.
+In-process the load generator shares the CPU with the service, so on
+a small machine the client itself becomes the bottleneck well before the
+service does; point --url at a service on another host for higher levels.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+
+import httpx
+
+import llm_pipeline
+from benchmarks.suite import percentile
+from conversion_service import ConversionService, ServiceThread, pipeline_convert
+from stub_server import StubConfig, StubServer
+
+PROMPTS = (
+    "Buy NIFTY ATM call when RSI(14) on 5m crosses above 60",
+    "Sell BANKNIFTY straddle if EMA 9 crosses below EMA 21",
+    "Buy FINNIFTY ATM+1 put when supertrend turns red, exit at 15:10",
+    "Buy SENSEX ATM call when MACD crosses above signal on 15m",
+)
+
+
+async def run_level(url, concurrency, requests, clients, max_backoff):
+    statuses, errors = Counter(), Counter()
+    ok_s, rejected_s = [], []
+    next_request = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as http:
+        async def user(u):
+            for i in next_request:
+                body = {
+                    "prompt": f"{PROMPTS[i % len(PROMPTS)]} #{i}",
+                    "options": {"use_fast_path": False, "use_semantic_cache": False},
+                }
+                t0 = time.perf_counter()
+                try:
+                    response = await http.post("/v1/convert", json=body, headers={"X-Client-Id": f"client-{u % clients}"})
+                except httpx.HTTPError as e:
+                    errors[e.__class__.__name__] += 1
+                    continue
+                seconds = time.perf_counter() - t0
+                if response.status_code == 200:
+                    statuses[200] += 1
+                    ok_s.append(seconds)
+                    continue
+                statuses[f"{response.status_code}:{response.json().get('error')}"] += 1
+                rejected_s.append(seconds)
+                # A well-behaved client backs off as told before its next request
+                retry_after = float(response.headers.get("retry-after", 0))
+                await asyncio.sleep(min(retry_after, max_backoff))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(u) for u in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stats = (await http.get("/stats")).json()
+
+    ok_s.sort()
+    rejected_s.sort()
+    return {
+        "concurrency": concurrency,
+        "throughput_per_s": round(len(ok_s) / elapsed, 2),
+        "latency_s": {f"p{q}": round(percentile(ok_s, q), 3) for q in (50, 99)},
+        "rejected_latency_ms": {f"p{q}": round(percentile(rejected_s, q) * 1000, 2) for q in (50, 99)},
+        "status": {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        "errors": dict(errors),
+        "service_avg_s": stats["service_s_avg"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="an already running conversion_service.py (default: start one in-process)")
+    parser.add_argument("--concurrency", default="8,32,64", help="offered concurrency levels, comma-separated")
+    parser.add_argument("--requests", type=int, default=400, help="conversions per level")
+    parser.add_argument("--clients", type=int, default=4, help="distinct X-Client-Id values")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--per-client", type=int, default=16)
+    parser.add_argument("--latency", default="lognormal:0.2,0.3", help="stub LLM latency distribution")
+    parser.add_argument("--max-backoff", type=float, default=1.0, help="cap on the Retry-After a client honours")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    stub = service = None
+    url = args.url
+    if url is None:
+        stub = StubServer(StubConfig(latency=args.latency, error_429=args.error_429, malformed=args.malformed))
+        client = llm_pipeline.create_client(api_key="stub", base_url=stub.start(), max_retries=0)
+        service = ServiceThread(ConversionService(
+            pipeline_convert(llm_pipeline.schemas.get(llm_pipeline.DEFAULT_SCHEMA_PATH), client),
+            workers=args.workers, queue_size=args.queue_size, per_client=args.per_client,
+        ))
+        url = service.start()
+    try:
+        results = [
+            asyncio.run(run_level(url, int(level), args.requests, args.clients, args.max_backoff))
+            for level in args.concurrency.split(",")
+        ]
+    finally:
+        if service:
+            service.stop()
+        if stub:
+            stub.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Load test of the conversion pipeline against stub_server.py.
+
+    python -m benchmarks.stub_load --requests 200 --concurrency 16 --latency lognormal:0.3,0.5 --error-429 0.05
+
+Drives llm_pipeline.convert through the real groq client (so SDK retries
+and connection pooling are included) and reports tail latency, failures
+and retry amplification: HTTP requests the server saw per conversion.
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.suite import percentile
+from llm_pipeline import DEFAULT_SCHEMA_PATH, convert, create_client, load_schema
+from stub_server import StubConfig, StubServer
+
+PROMPTS = (
+    "Buy NIFTY ATM call when RSI(14) on 5m crosses above 60",
+    "Sell BANKNIFTY straddle if EMA 9 crosses below EMA 21",
+    "Buy FINNIFTY ATM+1 put when supertrend turns red, exit at 15:10",
+    "Buy SENSEX ATM call when MACD crosses above signal on 15m",
+)
+
+
+def run(url, schema, requests, concurrency, max_retries, sdk_retries):
+    client = create_client(api_key="stub", base_url=url, max_retries=sdk_retries)
+    latencies, errors, attempts = [], Counter(), Counter()
+
+    def one(i):
+        t0 = time.perf_counter()
+        try:
+            result = convert(schema, PROMPTS[i % len(PROMPTS)], client=client,
+                             max_retries=max_retries, use_fast_path=False)
+            attempts[result["attempts"]] += 1
+        except Exception as e:
+            errors[e.__class__.__name__] += 1
+        latencies.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+    client.close()
+    return latencies, errors, attempts, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the pipeline against the local stub server.")
+    parser.add_argument("--url", help="an already running stub_server.py (default: start one in-process)")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-retries", type=int, default=5, help="pipeline re-asks on unparseable JSON")
+    parser.add_argument("--sdk-retries", type=int, default=2, help="groq SDK retries on 429/5xx")
+    parser.add_argument("--latency", default="lognormal:0.2,0.5")
+    parser.add_argument("--error-429", type=float, default=0.0)
+    parser.add_argument("--error-500", type=float, default=0.0)
+    parser.add_argument("--malformed", type=float, default=0.0)
+    parser.add_argument("--rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--cassette")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    schema = load_schema(args.schema)
+    server = None
+    url = args.url
+    if url is None:
+        server = StubServer(StubConfig(
+            latency=args.latency, error_429=args.error_429, error_500=args.error_500,
+            malformed=args.malformed, rate=args.rate, max_concurrency=args.max_concurrency,
+            cassette=args.cassette, seed=args.seed,
+        ))
+        url = server.start()
+    before = httpx.get(f"{url}/stats").json()
+    try:
+        latencies, errors, attempts, elapsed = run(
+            url, schema, args.requests, args.concurrency, args.max_retries, args.sdk_retries
+        )
+        after = httpx.get(f"{url}/stats").json()
+    finally:
+        if server:
+            server.stop()
+
+    http_requests = after.get("requests", 0) - before.get("requests", 0)
+    ordered = sorted(latencies)
+    print(json.dumps({
+        "conversions": args.requests,
+        "succeeded": sum(attempts.values()),
+        "failed": dict(errors),
+        "throughput_per_s": round(args.requests / elapsed, 2),
+        "latency_s": {
+            "p50": round(percentile(ordered, 50), 3),
+            "p90": round(percentile(ordered, 90), 3),
+            "p99": round(percentile(ordered, 99), 3),
+            "max": round(ordered[-1], 3),
+        },
+        "http_requests": http_requests,
+        "retry_amplification": round(http_requests / args.requests, 3),
+        "pipeline_attempts": dict(sorted(attempts.items())),
+        "server": {
+            k: v if k == "max_in_flight" else v - before.get(k, 0)
+            for k, v in after.items() if k != "in_flight"
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
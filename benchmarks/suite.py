@@ -0,0 +1,182 @@
+"""
+Stage-by-stage pipeline benchmark with a stubbed LLM.
+
+    python -m benchmarks.suite [--output results.json] [--baseline old.json]
+
+Stages: schema_load (registry lookup), schema_parse (json.load of the
+file, what every rerun used to pay), prompt_assembly, llm_call (StubGroq),
+json_loads and render (convert_json_to_text), the last three over
+generated strategies of growing size and depth. With --baseline, a throughput drop or p99 increase beyond
+the thresholds is reported and the exit status is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from benchmarks import synthetic
+from json_to_yaml import convert_json_to_text
+from llm_cache import file_sha256
+from llm_pipeline import DEFAULT_SCHEMA_PATH, build_messages, llm, load_schema
+from stub_llm import StubGroq
+
+# (comparisons, nesting depth) per generated strategy
+SHAPES = ((1, 0), (8, 2), (64, 4), (512, 16), (2048, 128))
+QUICK_SHAPES = ((1, 0), (64, 4), (512, 16))
+PROMPTS = (
+    "Buy NIFTY ATM call when RSI(14) on 5m crosses above 60",
+    "Sell BANKNIFTY straddle if EMA 9 crosses below EMA 21 and VWAP > LTP",
+    "Buy FINNIFTY ATM+1 put at 9:30 when supertrend turns red, exit at 15:10",
+)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_stage(fn, min_iterations, min_seconds, max_iterations):
+    """
+    Calls fn() until both minimums are met; returns per-call seconds.
+    The cyclic GC is paused (as timeit does) so collections triggered by
+    earlier stages do not land in this stage's tail latency.
+    """
+    samples = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(samples) < max_iterations:
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+            if len(samples) >= min_iterations and time.perf_counter() - started >= min_seconds:
+                break
+    finally:
+        gc.enable()
+    return samples
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    total = sum(samples)
+    return {
+        "iterations": len(samples),
+        "throughput_per_s": round(len(samples) / total, 2) if total else 0.0,
+        "mean_us": round(total / len(samples) * 1e6, 2),
+        "p50_us": round(percentile(ordered, 50) * 1e6, 2),
+        "p99_us": round(percentile(ordered, 99) * 1e6, 2),
+        "max_us": round(ordered[-1] * 1e6, 2),
+    }
+
+
+def _parse_file(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def build_cases(schema_path, shapes, stub_latency, seed):
+    """(name, callable) pairs; shape-dependent stages get one case per shape."""
+    schema = load_schema(schema_path)
+    version = file_sha256(schema_path)
+    rng = random.Random(seed)
+    prompts = iter(PROMPTS * 10**6)
+
+    cases = [
+        ("schema_load", lambda: load_schema(schema_path)),
+        ("schema_parse", lambda: _parse_file(schema_path)),
+        ("prompt_assembly", lambda: build_messages(schema, next(prompts), schema_version=version)),
+    ]
+    for n_conditions, depth in shapes:
+        doc = synthetic.strategy(rng, n_conditions=n_conditions, depth=depth)
+        text = json.dumps(doc)
+        client = StubGroq(latency=stub_latency, responder=lambda messages, text=text: text, seed=seed)
+        label = f"c{n_conditions}_d{depth}"
+        cases.extend([
+            (f"llm_call/{label}", lambda client=client: llm(schema, next(prompts), client=client, schema_version=version)),
+            (f"json_loads/{label}", lambda text=text: json.loads(text)),
+            (f"render/{label}", lambda doc=doc: convert_json_to_text(doc)),
+        ])
+    return cases
+
+
+def compare(results, baseline, max_throughput_drop, max_p99_increase):
+    """Regression messages for stages present in both runs."""
+    regressions = []
+    for name, current in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before:
+            continue
+        if before["throughput_per_s"] and current["throughput_per_s"] < before["throughput_per_s"] * (1 - max_throughput_drop):
+            regressions.append(
+                f"{name}: throughput {current['throughput_per_s']}/s vs baseline {before['throughput_per_s']}/s"
+            )
+        if before["p99_us"] and current["p99_us"] > before["p99_us"] * (1 + max_p99_increase):
+            regressions.append(f"{name}: p99 {current['p99_us']}us vs baseline {before['p99_us']}us")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stage-by-stage pipeline benchmark with a stubbed LLM.")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--max-throughput-drop", type=float, default=0.20, help="fraction, e.g. 0.2 = 20%%")
+    parser.add_argument("--max-p99-increase", type=float, default=0.30, help="fraction, e.g. 0.3 = 30%%")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds per stubbed LLM call")
+    parser.add_argument("--min-iterations", type=int, default=30)
+    parser.add_argument("--min-seconds", type=float, default=0.5)
+    parser.add_argument("--max-iterations", type=int, default=100000)
+    parser.add_argument("--quick", action="store_true", help="fewer shapes and shorter runs (smoke check)")
+    parser.add_argument("--only", help="run stages whose name contains this substring")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    shapes = QUICK_SHAPES if args.quick else SHAPES
+    min_seconds = args.min_seconds / 5 if args.quick else args.min_seconds
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "stub_latency_s": args.stub_latency,
+        "stages": {},
+    }
+    for name, fn in build_cases(args.schema, shapes, args.stub_latency, args.seed):
+        if args.only and args.only not in name:
+            continue
+        fn() # warm caches (schema compilation, imports) outside the measurement
+        results["stages"][name] = stats = summarize(
+            run_stage(fn, args.min_iterations, min_seconds, args.max_iterations)
+        )
+        print(f"{name:<28} {stats['throughput_per_s']:>12.1f}/s  p50 {stats['p50_us']:>10.1f}us  p99 {stats['p99_us']:>10.1f}us")
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.max_throughput_drop, args.max_p99_increase)
+        results["baseline"] = os.path.abspath(args.baseline)
+        results["regressions"] = regressions
+        if regressions:
+            status = 1
+            print(f"\nREGRESSION against {args.baseline}:", file=sys.stderr)
+            for line in regressions:
+                print(f"  {line}", file=sys.stderr)
+        else:
+            print(f"\nNo regressions against {args.baseline}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
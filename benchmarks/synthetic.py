@@ -0,0 +1,104 @@
+"""Seeded generator of schema-valid v3 strategies for benchmarks."""
+import random
+
+UNDERLYINGS = (("NIFTY", "NIFTY 50"), ("BANKNIFTY", "NIFTY BANK"), ("FINNIFTY", "NIFTY FIN SERVICE"), ("SENSEX", "SENSEX"))
+INDICATORS = ("RSI", "EMA", "SMA", "ATR", "CCI", "ADX", "VWMA", "SUPERTREND")
+SERIES = ("CLOSE", "HIGH", "LOW", "OPEN")
+TIMEFRAMES = ("1m", "3m", "5m", "15m", "1h")
+OPERATORS = (">", "<", ">=", "<=", "==", "Crosses Above", "Crosses Below")
+
+
+def _spot(rng, underlying):
+    symbol, token = underlying
+    return {"exchange": "BSE" if symbol == "SENSEX" else "NSE", "symbol_token": token, "instrument_type": "EQUITY"}
+
+
+def _operand(rng, underlying):
+    roll = rng.random()
+    if roll < 0.45:
+        return {
+            "function_name": rng.choice(INDICATORS),
+            "timeframe": rng.choice(TIMEFRAMES),
+            "position_offset": rng.choice((0, -1)),
+            "instrument": _spot(rng, underlying),
+            "params": {"period": rng.choice((5, 9, 14, 20, 50))},
+        }
+    if roll < 0.7:
+        return {
+            "function_name": rng.choice(SERIES),
+            "timeframe": rng.choice(TIMEFRAMES),
+            "position_offset": rng.choice((0, -1, -2)),
+            "instrument": _spot(rng, underlying),
+        }
+    return {"keyword": "LTP", "inputs": {"instrument": _spot(rng, underlying)}}
+
+
+def comparison(rng, underlying):
+    right = _operand(rng, underlying) if rng.random() < 0.4 else rng.randint(0, 100)
+    return {"condition_type": "COMPARE", "left": _operand(rng, underlying), "operator": rng.choice(OPERATORS), "right": right}
+
+
+def condition_tree(rng, underlying, n_conditions, depth):
+    """A tree with `n_conditions` comparisons and (up to) `depth` nested GROUP levels."""
+    if n_conditions <= 1 or depth <= 0:
+        leaves = [comparison(rng, underlying) for _ in range(max(1, n_conditions))]
+        if len(leaves) == 1:
+            return leaves[0]
+        return {"condition_type": "GROUP", "connection_logic": rng.choice(("AND", "OR")), "conditions": leaves}
+    # One comparison per level, the rest nested one level down
+    root = node = {"condition_type": "GROUP", "connection_logic": "AND", "conditions": []}
+    remaining = n_conditions
+    per_level = max(1, n_conditions // (depth + 1))
+    for level in range(depth):
+        take = min(per_level, remaining - 1)
+        node["conditions"].extend(comparison(rng, underlying) for _ in range(take))
+        remaining -= take
+        if remaining <= 1 or level == depth - 1:
+            break
+        child = {"condition_type": "GROUP", "connection_logic": "OR" if level % 2 == 0 else "AND", "conditions": []}
+        node["conditions"].append(child)
+        node = child
+    node["conditions"].extend(comparison(rng, underlying) for _ in range(remaining))
+    return root
+
+
+def position(rng, underlying, action=None):
+    symbol = underlying[0]
+    return {
+        "transaction_type": action or rng.choice(("BUY", "SELL")),
+        "product_type": rng.choice(("MIS", "NRML")),
+        "instrument": {
+            "exchange": "BSE" if symbol == "SENSEX" else "NFO",
+            "symbol_token": symbol,
+            "instrument_type": rng.choice(("CALL", "PUT")),
+            "expiry_config": {"type": rng.choice(("Current Week", "Next Week", "Current Month")), "offset": 0},
+            "strike_config": {"selection_method": "ATM", "offset": rng.randint(-3, 3)},
+        },
+        "quantity_setup": {"type": "Lots", "value": rng.randint(1, 4)},
+    }
+
+
+def strategy(rng, n_conditions=4, depth=1, legs=2):
+    underlying = rng.choice(UNDERLYINGS)
+    return {
+        "strategy_sets": [{
+            "set_index": 1,
+            "phases": [
+                {
+                    "phase_type": "Entry",
+                    "conditions": condition_tree(rng, underlying, n_conditions, depth),
+                    "positions": [position(rng, underlying) for _ in range(legs)],
+                },
+                {
+                    "phase_type": "Exit",
+                    "conditions": condition_tree(rng, underlying, max(1, n_conditions // 2), 0),
+                    "positions": [],
+                },
+            ],
+        }]
+    }
+
+
+def corpus(count, seed=0, **shape):
+    rng = random.Random(seed)
+    return [strategy(rng, **shape) for _ in range(count)]
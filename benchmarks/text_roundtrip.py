@@ -0,0 +1,111 @@
+"""
+Round-trip checks and throughput of text_to_json on synthetic strategies.
+
+    python -m benchmarks.text_roundtrip [--strategies 500] [--conditions 6] [--depth 3]
+
+For every strategy J with rendered text T = render(J):
+  - parse(T, base=J) == J               (nothing the text hides is lost)
+  - render(parse(T)) == T               (the text alone is parsed faithfully)
+  - parse(T) is schema-valid            (defaults fill what the text hides)
+  - parse(render(J'), base=J) == J'     for J' = J with one visible field edited
+Exits with status 1 when any check fails. Throughput is parse time per
+strategy and per rendered line, next to the render time for scale.
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+
+from benchmarks.suite import percentile
+from benchmarks.synthetic import OPERATORS, TIMEFRAMES, corpus
+from json_to_yaml import convert_json_to_text
+from keyword_catalog import get_catalog
+from llm_pipeline import DEFAULT_SCHEMA_PATH, schemas
+from schema_validator import get_validator
+from text_to_json import condition_leaves, parse_strategy_text
+
+
+def edit(rng, strategy):
+    """A copy of `strategy` with one field changed that the text shows, and what was changed."""
+    strategy = copy.deepcopy(strategy)
+    phases = strategy["strategy_sets"][0]["phases"]
+    positions = [p for phase in phases for p in phase.get("positions", [])]
+    leaves = [leaf for phase in phases for leaf in condition_leaves(phase["conditions"])]
+    kind = rng.choice(("quantity", "strike", "action", "operator", "number", "timeframe"))
+    if kind in ("quantity", "strike", "action") and positions:
+        position = rng.choice(positions)
+        if kind == "quantity":
+            position["quantity_setup"]["value"] += 1
+        elif kind == "strike":
+            position["instrument"]["strike_config"]["offset"] += rng.choice((-1, 1))
+        else:
+            position["transaction_type"] = "SELL" if position["transaction_type"] == "BUY" else "BUY"
+        return strategy, kind
+    leaf = rng.choice(leaves)
+    if kind == "number" and isinstance(leaf["right"], int):
+        leaf["right"] += 5
+    elif kind == "timeframe" and "timeframe" in leaf["left"]:
+        leaf["left"]["timeframe"] = rng.choice([tf for tf in TIMEFRAMES if tf != leaf["left"]["timeframe"]])
+    else:
+        kind = "operator"
+        leaf["operator"] = rng.choice([op for op in OPERATORS if op != leaf["operator"]])
+    return strategy, kind
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--strategies", type=int, default=500)
+    parser.add_argument("--conditions", type=int, default=6)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--legs", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    args = parser.parse_args(argv)
+
+    entry = schemas.get(args.schema)
+    catalog = get_catalog(entry.schema, entry.version)
+    validator = get_validator(entry.schema, entry.version)
+    rng = random.Random(args.seed)
+    strategies = corpus(args.strategies, seed=args.seed, n_conditions=args.conditions, depth=args.depth, legs=args.legs)
+
+    failures = {"with_base": [], "text_only": [], "invalid": [], "edited": []}
+    render_s, parse_s, lines = [], [], 0
+    for i, strategy in enumerate(strategies):
+        t0 = time.perf_counter()
+        text = convert_json_to_text(strategy)
+        render_s.append(time.perf_counter() - t0)
+        lines += text.count("\n") + 1
+
+        t0 = time.perf_counter()
+        parsed = parse_strategy_text(text, catalog=catalog)
+        parse_s.append(time.perf_counter() - t0)
+
+        if parse_strategy_text(text, base=strategy, catalog=catalog) != strategy:
+            failures["with_base"].append(i)
+        if convert_json_to_text(parsed) != text:
+            failures["text_only"].append(i)
+        if not validator.is_valid(parsed):
+            failures["invalid"].append(i)
+        edited, kind = edit(rng, strategy)
+        if parse_strategy_text(convert_json_to_text(edited), base=strategy, catalog=catalog) != edited:
+            failures["edited"].append(f"{i}:{kind}")
+
+    ordered_parse = sorted(parse_s)
+    ordered_render = sorted(render_s)
+    print(json.dumps({
+        "strategies": len(strategies),
+        "lines": lines,
+        "failures": {check: cases[:10] for check, cases in failures.items()},
+        "parse_us": {f"p{q}": round(percentile(ordered_parse, q) * 1e6, 1) for q in (50, 99)},
+        "parse_us_per_line": round(sum(parse_s) / lines * 1e6, 2),
+        "parse_strategies_per_s": round(len(parse_s) / sum(parse_s)),
+        "render_us": {f"p{q}": round(percentile(ordered_render, q) * 1e6, 1) for q in (50, 99)},
+    }, indent=2))
+    if any(failures.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compiled vs. interpreted schema validation.
+
+    python -m benchmarks.validator [--conditions 50] [--repeat 200]
+"""
+import argparse
+import json
+import time
+
+import fast_path
+from llm_pipeline import DEFAULT_SCHEMA_PATH, load_schema
+from schema_validator import CompiledValidator, interpret
+
+try:
+    import jsonschema
+except ImportError:
+    jsonschema = None
+
+SAMPLE_PROMPTS = (
+    "Buy NIFTY ATM straddle at 9:20",
+    "Sell BANKNIFTY strangle +-2 strikes, exit at 15:15",
+    "buy banknifty atm-1 pe between 9:20 and 10:00 qty 30 intraday",
+)
+
+
+def indicator(name, period):
+    return {
+        "function_name": name,
+        "timeframe": "5m",
+        "position_offset": 0,
+        "instrument": {"exchange": "NSE", "symbol_token": "NIFTY 50", "instrument_type": "EQUITY"},
+        "params": {"period": period},
+    }
+
+
+def wide_strategy(n_conditions):
+    """One Entry phase whose GROUP holds `n_conditions` indicator comparisons."""
+    strategy = fast_path.parse(SAMPLE_PROMPTS[0]).strategy
+    names = ("RSI", "EMA", "SMA", "ATR")
+    strategy["strategy_sets"][0]["phases"][0]["conditions"] = {
+        "condition_type": "GROUP",
+        "connection_logic": "AND",
+        "conditions": [
+            {
+                "condition_type": "COMPARE",
+                "left": indicator(names[i % len(names)], 5 + i % 20),
+                "operator": ">",
+                "right": i,
+            }
+            for i in range(n_conditions)
+        ],
+    }
+    return strategy
+
+
+def timed(fn, docs, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for doc in docs:
+            fn(doc)
+    return (time.perf_counter() - t0) / (repeat * len(docs)) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    parser.add_argument("--conditions", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    schema = load_schema(args.schema)
+    t0 = time.perf_counter()
+    compiled = CompiledValidator(schema)
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    corpora = {
+        "templates": [fast_path.parse(p).strategy for p in SAMPLE_PROMPTS],
+        f"wide_{args.conditions}": [wide_strategy(args.conditions)],
+    }
+    validators = {
+        "compiled": compiled.validate,
+        "interpreted": lambda doc: interpret(schema, doc),
+    }
+    if jsonschema is not None:
+        validators["jsonschema"] = jsonschema.Draft7Validator(schema).is_valid
+
+    results = {"compile_ms": round(compile_ms, 2), "generated_lines": len(compiled.source.splitlines())}
+    for corpus, docs in corpora.items():
+        for doc in docs:
+            assert compiled.validate(doc) == [] and interpret(schema, doc) == [], corpus
+        row = {name: round(timed(fn, docs, args.repeat), 1) for name, fn in validators.items()}
+        row["speedup_vs_interpreted"] = round(row["interpreted"] / row["compiled"], 1)
+        results[corpus] = row
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
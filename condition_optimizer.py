@@ -0,0 +1,277 @@
+import json
+
+from json_to_yaml import DIALECTS, detect_schema_version
+
+# Keywords whose result depends on where they run (runtime variables, leg actions):
+# a group holding one keeps its order, and is never folded away around it
+ORDERED_KEYWORDS = frozenset({
+    "Set Runtime", "Get Runtime", "Get Runtime Number", "Init Var",
+    "Leg Exit", "Leg SL trail", "Leg TSL", "Universal Exit TSL",
+})
+
+# `a op b` == `b FLIPPED[op] a`
+FLIPPED = {
+    ">": "<", "<": ">", ">=": "<=", "<=": ">=", "==": "==", "!=": "!=",
+    "Crosses Above": "Crosses Below", "Crosses Below": "Crosses Above",
+}
+# Outcome of comparing an operand with itself
+SELF_COMPARISON = {
+    ">": False, "<": False, ">=": True, "<=": True, "==": True, "!=": False,
+    "Crosses Above": False, "Crosses Below": False,
+}
+_NUMERIC = {
+    ">": float.__gt__, "<": float.__lt__, ">=": float.__ge__, "<=": float.__le__,
+    "==": float.__eq__, "!=": float.__ne__,
+    # Constants never cross
+    "Crosses Above": lambda a, b: False, "Crosses Below": lambda a, b: False,
+}
+
+
+_ORDERED_MARKERS = tuple(f'"keyword":{json.dumps(keyword)}' for keyword in ORDERED_KEYWORDS)
+_encode = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=str).encode
+
+
+def operand_key(op):
+    """Canonical text of an operand or node: equal keys mean the same value."""
+    return _encode(op)
+
+
+def _number(op):
+    if type(op) in (int, float):
+        return float(op)
+    if isinstance(op, dict) and op.get("type") == "number":
+        try:
+            return float(op.get("title", op.get("value")))
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _ordered(key):
+    """Whether a node, by its operand_key, reads or writes runtime state."""
+    return any(marker in key for marker in _ORDERED_MARKERS)
+
+
+class _Entry:
+    """An optimized node: `constant` is True/False when it always evaluates so, `members` the children of a group."""
+    __slots__ = ("node", "key", "constant", "ordered", "logic", "members")
+
+    def __init__(self, node, key, constant=None, ordered=False, logic=None, members=None):
+        self.node = node
+        self.key = key
+        self.constant = constant
+        self.ordered = ordered
+        self.logic = logic
+        self.members = members
+
+
+def _leaf(node):
+    if node.get("condition_type") != "COMPARE":
+        key = operand_key(node)
+        return _Entry(node, key, ordered=_ordered(key))
+    left, operator, right = node.get("left"), node.get("operator"), node.get("right")
+    if operator in FLIPPED and _number(left) is not None and _number(right) is None and isinstance(right, dict):
+        # Constants go on the right, so `30 < RSI` and `RSI > 30` dedupe
+        node = {**node, "left": right, "operator": FLIPPED[operator], "right": left}
+        left, operator, right = right, FLIPPED[operator], left
+    key = operand_key(node)
+    ordered = _ordered(key)
+    constant = None
+    a, b = _number(left), _number(right)
+    if a is not None and b is not None and operator in _NUMERIC:
+        constant = _NUMERIC[operator](a, b)
+    elif not ordered and operator in SELF_COMPARISON and left == right:
+        constant = SELF_COMPARISON[operator]
+    return _Entry(node, key, constant, ordered)
+
+
+def _group(node, logic, children, stats):
+    if logic not in ("AND", "OR"):
+        members = [child for child in children if child is not None]
+        node = {**node, "conditions": [child.node for child in members]}
+        key = f"{logic}({','.join(child.key for child in members)})"
+        return _Entry(node, key, ordered=any(child.ordered for child in members))
+
+    members = []
+    for child in children:
+        if child is None:
+            continue
+        if child.logic == logic:
+            stats["flattened"] += 1
+            members.extend(child.members)
+        else:
+            members.append(child)
+
+    # AND: True is the identity and False absorbs; OR the other way round
+    identity = logic == "AND"
+    ordered = any(member.ordered for member in members)
+    absorbing = next((m for m in members if m.constant is (not identity)), None)
+    if absorbing is not None and not ordered:
+        stats["folded"] += len(members) - 1
+        return absorbing
+    kept = [m for m in members if m.constant is not identity]
+    if not kept:
+        # Every member is the identity: the group is that constant
+        stats["folded"] += len(members) - 1
+        return members[0] if members else None
+    stats["folded"] += len(members) - len(kept)
+
+    seen, unique = set(), []
+    for member in kept:
+        if not member.ordered:
+            if member.key in seen:
+                stats["deduplicated"] += 1
+                continue
+            seen.add(member.key)
+        unique.append(member)
+    if not ordered:
+        # Comparisons before groups, each in key order
+        unique.sort(key=lambda m: (m.logic is not None, m.key))
+    if len(unique) == 1:
+        return unique[0]
+
+    node = {**node, "connection_logic": logic, "conditions": [member.node for member in unique]}
+    key = f"{logic}({','.join(member.key for member in unique)})"
+    return _Entry(node, key, None, ordered, logic, unique)
+
+
+def optimize_conditions(node, stats=None):
+    """
+    Returns an equivalent condition tree with nested GROUPs of the same
+    connection_logic flattened, single-member groups replaced by their
+    member, comparisons whose outcome is fixed (`1 >= 1`, `x > x`) folded
+    into their group, duplicate members dropped and the members of each
+    group sorted canonically, constants moved to the right-hand side.
+    Groups holding runtime-variable or leg-action keywords keep their
+    order. A tree that is constant as a whole keeps one such comparison.
+    The input is not modified; unchanged leaves are shared with it.
+    `stats` (a dict) counts flattened, folded and deduplicated members.
+    """
+    if stats is None:
+        stats = {}
+    for name in ("flattened", "folded", "deduplicated"):
+        stats.setdefault(name, 0)
+    # Post-order over an explicit stack: a GROUP is finished once its children are
+    results = []
+    stack = [(node, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, dict):
+            results.append(None)
+        elif node.get("condition_type") != "GROUP":
+            results.append(_leaf(node))
+        elif not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.get("conditions", [])))
+        else:
+            count = len(node.get("conditions", []))
+            children = results[len(results) - count:] if count else []
+            del results[len(results) - count:]
+            results.append(_group(node, node.get("connection_logic", "AND"), children, stats))
+    root = results[0]
+    return None if root is None else root.node
+
+
+def count_nodes(node):
+    """GROUP, COMPARE and standalone keyword nodes in a condition tree."""
+    counts = {"groups": 0, "comparisons": 0, "keywords": 0}
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if node.get("condition_type") == "GROUP":
+            counts["groups"] += 1
+            stack.extend(node.get("conditions", []))
+        elif node.get("condition_type") == "COMPARE":
+            counts["comparisons"] += 1
+        else:
+            counts["keywords"] += 1
+    counts["nodes"] = counts["groups"] + counts["comparisons"] + counts["keywords"]
+    return counts
+
+
+class OperandTable:
+    """
+    The distinct non-literal operands of one or more condition trees, so an
+    evaluator fetches each once: `add` returns the operand's slot, shared
+    by every comparison that reads the same value.
+    """
+    __slots__ = ("slots", "operands", "uses")
+
+    def __init__(self):
+        self.slots = {}
+        self.operands = []
+        self.uses = []
+
+    def __len__(self):
+        return len(self.operands)
+
+    def add(self, op):
+        key = operand_key(op)
+        slot = self.slots.get(key)
+        if slot is None:
+            slot = self.slots[key] = len(self.operands)
+            self.operands.append(op)
+            self.uses.append(0)
+        self.uses[slot] += 1
+        return slot
+
+    def add_conditions(self, node):
+        """Adds every dict operand of a tree's comparisons and standalone keywords."""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, dict):
+                continue
+            if node.get("condition_type") == "GROUP":
+                stack.extend(node.get("conditions", []))
+            elif node.get("condition_type") == "COMPARE":
+                for side in (node.get("left"), node.get("right")):
+                    if isinstance(side, dict) and _number(side) is None:
+                        self.add(side)
+            else:
+                self.add(node)
+        return self
+
+    @property
+    def references(self):
+        return sum(self.uses)
+
+
+def optimize_strategy(json_data, version=None):
+    """
+    Optimizes the conditions of every phase (see optimize_conditions) in a
+    copy of the strategy; positions and unchanged condition nodes are
+    shared with `json_data`, which is not modified. Returns (copy, report); the report holds node
+    counts before and after, the optimize_conditions counters, and the
+    operand references against the distinct operands they fetch.
+    """
+    version = version or detect_schema_version(json_data)
+    conditions_key = DIALECTS[version].conditions_key
+    optimized = {
+        **json_data,
+        "strategy_sets": [
+            {**strategy_set, "phases": [dict(phase) for phase in strategy_set.get("phases", [])]}
+            for strategy_set in json_data.get("strategy_sets", [])
+        ],
+    }
+    before = {"groups": 0, "comparisons": 0, "keywords": 0, "nodes": 0}
+    after = dict(before)
+    stats = {}
+    table = OperandTable()
+    for strategy_set in optimized.get("strategy_sets", []):
+        for phase in strategy_set.get("phases", []):
+            conditions = phase.get(conditions_key)
+            if not conditions:
+                continue
+            for name, count in count_nodes(conditions).items():
+                before[name] += count
+            conditions = optimize_conditions(conditions, stats)
+            if conditions is not None:
+                phase[conditions_key] = conditions
+            for name, count in count_nodes(conditions).items():
+                after[name] += count
+            table.add_conditions(conditions)
+    report = {"before": before, "after": after, **stats, "operand_refs": table.references, "operands": len(table)}
+    return optimized, report
@@ -0,0 +1,442 @@
+"""
+Headless conversion service: NL prompt -> strategy JSON and text over HTTP.
+
+    python conversion_service.py --port 8090 --workers 8 --queue-size 64 --per-client 8
+    curl -s localhost:8090/v1/convert -H 'X-Client-Id: oms-1' -d '{"prompt": "Buy NIFTY ATM call"}'
+
+POST /v1/convert runs llm_pipeline.convert (LLM call, repair, validation,
+convert_json_to_text) on a pool of worker threads fed by a bounded queue.
+A full queue, or a client (X-Client-Id header, else its address) with
+--per-client requests already queued or running, is answered 429 with a
+Retry-After estimate instead of waiting. GET /healthz is liveness,
+GET /readyz readiness (503 while saturated or draining), GET /stats and
+GET /metrics report load. SIGTERM/SIGINT stop admitting work, let queued
+and running conversions finish (up to --drain-timeout) and then exit.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+import llm_pipeline
+import metrics
+from batch_convert import status_code
+from llm_pipeline import DEFAULT_SCHEMA_PATH, MAX_RETRIES, LLMConfigError
+
+WORKERS = int(os.getenv("SERVICE_WORKERS", 8))
+QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", 64))
+PER_CLIENT_LIMIT = int(os.getenv("SERVICE_PER_CLIENT", 8))
+QUEUE_TIMEOUT = float(os.getenv("SERVICE_QUEUE_TIMEOUT", 30)) # seconds a job may wait before it is dropped
+DRAIN_TIMEOUT = float(os.getenv("SERVICE_DRAIN_TIMEOUT", 30))
+KEEPALIVE_TIMEOUT = 15.0
+# Pending connections the OS holds; past it SYNs are dropped and clients stall for seconds on retransmits
+LISTEN_BACKLOG = 1024
+MAX_BODY = 64 * 1024
+# Request options passed through to llm_pipeline.convert, with their types
+OPTIONS = {
+    "use_fast_path": bool, "use_semantic_cache": bool, "hedge": bool, "priority": bool, "max_retries": int,
+    "optimize_conditions": bool,
+}
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+    422: "Unprocessable Entity", 429: "Too Many Requests", 500: "Internal Server Error", 502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job:
+    __slots__ = ("client_id", "request", "future", "enqueued")
+
+    def __init__(self, client_id, request, future, enqueued):
+        self.client_id = client_id
+        self.request = request
+        self.future = future
+        self.enqueued = enqueued
+
+
+def error_response(exc):
+    """(status, body, headers) for an exception raised by the pipeline."""
+    if isinstance(exc, json.JSONDecodeError):
+        return 422, {"error": "unparseable_output", "message": str(exc)}, {}
+    if isinstance(exc, LLMConfigError):
+        return 503, {"error": "llm_not_configured", "message": str(exc)}, {}
+    status = status_code(exc)
+    if status == 429:
+        return 503, {"error": "upstream_rate_limited", "message": str(exc)}, {"Retry-After": "1"}
+    if status is not None:
+        return 502, {"error": "upstream_error", "status": status, "message": str(exc)}, {}
+    return 500, {"error": "internal_error", "type": exc.__class__.__name__, "message": str(exc)}, {}
+
+
+def parse_request(body):
+    """The convert request from a JSON body: {"prompt": str, "options": {...}, "trace": bool}."""
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise _HTTPError(400, "body is not JSON") from None
+    prompt = payload.get("prompt") if isinstance(payload, dict) else None
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise _HTTPError(400, "\"prompt\" must be a non-empty string")
+    options = payload.get("options") or {}
+    if not isinstance(options, dict):
+        raise _HTTPError(400, "\"options\" must be an object")
+    for name, value in options.items():
+        kind = OPTIONS.get(name)
+        if kind is None:
+            raise _HTTPError(400, f"unknown option {name!r}; known: {', '.join(OPTIONS)}")
+        if type(value) is not kind:
+            raise _HTTPError(400, f"option {name!r} must be {kind.__name__}")
+    if not 1 <= options.get("max_retries", 1) <= MAX_RETRIES:
+        raise _HTTPError(400, f"max_retries must be between 1 and {MAX_RETRIES}")
+    return {"prompt": prompt, "options": options, "trace": bool(payload.get("trace"))}
+
+
+def pipeline_convert(schema_entry, client):
+    """Blocking convert function for the service: one request dict in, one response body out."""
+
+    def convert(request):
+        result = llm_pipeline.convert(
+            schema_entry.schema, request["prompt"], client=client, schema_version=schema_entry.version,
+            **request["options"],
+        )
+        if not request["trace"]:
+            result.pop("spans", None)
+        return result
+
+    return convert
+
+
+async def _read_request(reader):
+    """(method, path, headers, body), or None when the client closed the connection."""
+    try:
+        line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise _HTTPError(400, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise _HTTPError(400, "bad Content-Length") from None
+    if length > MAX_BODY:
+        raise _HTTPError(413, f"body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+async def _write_response(writer, status, payload, headers=None, keep_alive=True):
+    if isinstance(payload, str):
+        body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+    head = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        *(f"{name}: {value}" for name, value in (headers or {}).items()),
+    ]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+class ConversionService:
+    """
+    Bounded queue in front of `workers` threads running `convert_fn`
+    (blocking: request dict -> response body). Admission is decided on the
+    event loop, so rejecting a request costs no thread and no LLM call.
+    """
+
+    def __init__(self, convert_fn, workers=WORKERS, queue_size=QUEUE_SIZE, per_client=PER_CLIENT_LIMIT,
+                 queue_timeout=QUEUE_TIMEOUT, registry=metrics.registry):
+        self.convert_fn = convert_fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.per_client = per_client
+        self.queue_timeout = queue_timeout
+        self.registry = registry
+        self.queue = None # created on the service's event loop by start()
+        self.clients = Counter() # client id -> requests queued or running
+        self.running = 0
+        self.draining = False
+        self.ready = False
+        self.stats = Counter()
+        self.service_s = None # moving average of a conversion's run time, for Retry-After
+        self._connections = set()
+        self._busy = set() # connections between reading a request and writing its response
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Starts the workers and the listener; returns the bound (host, port)."""
+        self.queue = asyncio.Queue(self.queue_size)
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="convert")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._connection, host, port, backlog=LISTEN_BACKLOG)
+        self.ready = True
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def shutdown(self, timeout=DRAIN_TIMEOUT):
+        """Stops admitting work, waits for queued and running jobs, then closes everything."""
+        self.draining = True
+        self._server.close()
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for task in self._tasks:
+            task.cancel()
+        while not self.queue.empty():
+            job = self.queue.get_nowait()
+            if not job.future.done():
+                job.future.set_result((503, {"error": "shutting_down"}, {}))
+        # Responses already computed are written before idle keep-alive connections are closed
+        deadline = time.monotonic() + timeout
+        while self._busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        for writer in list(self._connections):
+            writer.close()
+        self._executor.shutdown(wait=False)
+        self.ready = False
+
+    def retry_after(self):
+        """Seconds until a queue slot is likely free: the queue ahead drained by all workers."""
+        per_job = self.service_s or 1.0
+        return max(1, math.ceil(per_job * (self.queue.qsize() + 1) / self.workers))
+
+    def admit(self, client_id, request):
+        """A queued Job, or (status, body, headers) when the request is turned away."""
+        if self.draining:
+            return 503, {"error": "shutting_down"}, {"Retry-After": "5"}
+        if self.clients[client_id] >= self.per_client:
+            self.stats["rejected_client_limit"] += 1
+            return 429, {"error": "client_limit", "limit": self.per_client}, {"Retry-After": str(self.retry_after())}
+        if self.queue.full():
+            self.stats["rejected_queue_full"] += 1
+            return 429, {"error": "queue_full", "queue_size": self.queue_size}, {"Retry-After": str(self.retry_after())}
+        loop = asyncio.get_running_loop()
+        job = Job(client_id, request, loop.create_future(), loop.time())
+        self.queue.put_nowait(job)
+        self.clients[client_id] += 1
+        self.stats["accepted"] += 1
+        return job
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                waited = loop.time() - job.enqueued
+                self.registry.observe("service_queue_seconds", waited, help="Time a conversion waited for a worker")
+                if job.future.done(): # the client went away
+                    continue
+                if waited > self.queue_timeout:
+                    self.stats["queue_timeouts"] += 1
+                    job.future.set_result((503, {"error": "queue_timeout", "waited_s": round(waited, 3)}, {}))
+                    continue
+                self.running += 1
+                t0 = time.perf_counter()
+                try:
+                    body = await loop.run_in_executor(self._executor, self.convert_fn, job.request)
+                    response = 200, body, {}
+                except Exception as e:
+                    response = error_response(e)
+                finally:
+                    self.running -= 1
+                    seconds = time.perf_counter() - t0
+                    self.service_s = seconds if self.service_s is None else 0.9 * self.service_s + 0.1 * seconds
+                if not job.future.done():
+                    job.future.set_result(response)
+            finally:
+                self.queue.task_done()
+
+    async def _convert(self, client_id, body):
+        try:
+            request = parse_request(body)
+        except _HTTPError as e:
+            return e.status, {"error": str(e)}, {}
+        job = self.admit(client_id, request)
+        if not isinstance(job, Job):
+            return job
+        try:
+            return await job.future
+        finally:
+            self.clients[client_id] -= 1
+            if not self.clients[client_id]:
+                del self.clients[client_id]
+
+    async def _route(self, method, path, headers, body, peer):
+        if path == "/v1/convert":
+            if method != "POST":
+                return 405, {"error": "use POST"}, {"Allow": "POST"}
+            return await self._convert(headers.get("x-client-id") or peer, body)
+        if method != "GET":
+            return 405, {"error": "use GET"}, {"Allow": "GET"}
+        if path == "/healthz":
+            return 200, {"status": "ok"}, {}
+        if path == "/readyz":
+            if self.draining or not self.ready:
+                return 503, {"status": "draining" if self.draining else "starting"}, {}
+            if self.queue.full():
+                return 503, {"status": "saturated", "queued": self.queue.qsize()}, {}
+            return 200, {"status": "ready", "queued": self.queue.qsize(), "running": self.running}, {}
+        if path == "/stats":
+            return 200, self.report(), {}
+        if path == "/metrics":
+            return 200, self.registry.render_prometheus(), {}
+        return 404, {"error": f"no route {path}"}, {}
+
+    async def _connection(self, reader, writer):
+        self._connections.add(writer)
+        peer = (writer.get_extra_info("peername") or ("unknown",))[0]
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                except _HTTPError as e:
+                    await _write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                self._busy.add(writer)
+                t0 = time.perf_counter()
+                status, payload, extra = await self._route(method, path, headers, body, peer)
+                if path == "/v1/convert":
+                    self.stats[f"status_{status}"] += 1
+                    self.registry.inc("service_requests_total", help="Convert requests by HTTP status", status=str(status))
+                    self.registry.observe(
+                        "service_seconds", time.perf_counter() - t0, help="Convert request time in the service",
+                        status=str(status),
+                    )
+                keep_alive = headers.get("connection", "").lower() != "close" and not self.draining
+                try:
+                    await _write_response(writer, status, payload, extra, keep_alive)
+                finally:
+                    self._busy.discard(writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass # client hung up, or a header line over the stream limit
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    def report(self):
+        return {
+            "ready": self.ready and not self.draining,
+            "draining": self.draining,
+            "workers": self.workers,
+            "running": self.running,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "queue_size": self.queue_size,
+            "per_client_limit": self.per_client,
+            "clients": dict(self.clients),
+            "service_s_avg": round(self.service_s, 4) if self.service_s is not None else None,
+            **self.stats,
+        }
+
+
+class ServiceThread:
+    """Runs a service on its own event loop in a background thread: `with ServiceThread(service) as url: ...`."""
+
+    def __init__(self, service, host="127.0.0.1", port=0):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.url = None
+        self._started = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        host, port = self.loop.run_until_complete(self.service.start(self.host, self.port))
+        self.url = f"http://{host}:{port}"
+        self._started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._started.wait()
+        return self.url
+
+    def stop(self, timeout=DRAIN_TIMEOUT):
+        asyncio.run_coroutine_threadsafe(self.service.shutdown(timeout), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def serve(service, host, port, drain_timeout):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    host, port = await service.start(host, port)
+    print(f"Conversion service on http://{host}:{port} ({service.workers} workers, queue {service.queue_size})")
+    await stop.wait()
+    print("Draining...")
+    await service.shutdown(drain_timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service converting strategy prompts to JSON and text.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA_PATH)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="conversions running at once")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="conversions waiting before 429")
+    parser.add_argument("--per-client", type=int, default=PER_CLIENT_LIMIT, help="queued + running per client")
+    parser.add_argument("--queue-timeout", type=float, default=QUEUE_TIMEOUT)
+    parser.add_argument("--drain-timeout", type=float, default=DRAIN_TIMEOUT)
+    parser.add_argument("--stub", action="store_true", help="use the offline stub client instead of Groq")
+    parser.add_argument("--stub-latency", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.stub:
+        from stub_llm import StubGroq
+        client = StubGroq(latency=args.stub_latency)
+    else:
+        client = llm_pipeline.get_client()
+    service = ConversionService(
+        pipeline_convert(llm_pipeline.schemas.get(args.schema), client), workers=args.workers,
+        queue_size=args.queue_size, per_client=args.per_client, queue_timeout=args.queue_timeout,
+    )
+    asyncio.run(serve(service, args.host, args.port, args.drain_timeout))
+
+
+if __name__ == "__main__":
+    main()
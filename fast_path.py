@@ -0,0 +1,334 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+# Tokens that carry no meaning for the templates below
+STOPWORDS = {
+    "a", "an", "the", "and", "of", "on", "in", "for", "with", "at", "to", "strike", "strikes",
+    "option", "options", "expiry", "leg", "legs", "position", "positions", "enter", "entry",
+    "trade", "please", "create", "strategy", "place", "take", "all", "both", "index", "time",
+}
+# Risk and exit terms the templates cannot express: a prompt naming one always goes to the LLM,
+# even when every other token is explained ("..., exit at 15:15, SL" must not lose its stop-loss)
+VETO_TERMS = {
+    "sl", "stoploss", "stop", "loss", "target", "tgt", "tp", "profit", "trail", "trailing", "tsl", "trigger",
+    "mtm", "reentry", "re", "hedge", "hedged", "if", "when", "unless", "until", "once", "crosses", "above", "below",
+}
+
+UNDERLYINGS = {
+    "NIFTY": ("NSE", "NIFTY 50"),
+    "BANKNIFTY": ("NSE", "NIFTY BANK"),
+    "FINNIFTY": ("NSE", "NIFTY FIN SERVICE"),
+    "MIDCPNIFTY": ("NSE", "NIFTY MID SELECT"),
+    "SENSEX": ("BSE", "SENSEX"),
+}
+PRODUCTS = {"mis": "MIS", "intraday": "MIS", "nrml": "NRML", "positional": "NRML", "overnight": "NRML", "cnc": "CNC"}
+EXPIRIES = {
+    ("current", "week"): "Current Week", ("this", "week"): "Current Week", ("next", "week"): "Next Week",
+    ("current", "month"): "Current Month", ("this", "month"): "Current Month", ("next", "month"): "Next Month",
+}
+
+_TIME = r"(\d{1,2})[:.](\d{2})"
+PATTERNS = (
+    ("exit_time", re.compile(rf"\b(?:exit|square\s*off|close)(?:\s+all)?(?:\s+positions?)?\s+(?:at|by|after)\s+{_TIME}")),
+    ("window", re.compile(rf"\bbetween\s+{_TIME}\s*(?:and|to|-)\s*{_TIME}")),
+    ("entry_time", re.compile(rf"\b(at|after|from|post)\s+{_TIME}")),
+    ("action", re.compile(r"\b(buy|sell|long|short)\b")),
+    ("symbol", re.compile(r"\b(bank\s*nifty|fin\s*nifty|midcp\s*nifty|nifty|sensex)\b")),
+    ("structure", re.compile(r"\b(straddle|strangle)s?\b")),
+    ("width", re.compile(r"(?:±|\+\s*/\s*-|\+\s*-|-\s*/?\s*\+)\s*(\d+)")),
+    ("otm_steps", re.compile(r"\b(\d+)\s+strikes?\s+(otm|itm)\b")),
+    ("strike", re.compile(r"\batm(?:\s*([+-])\s*(\d+))?(?![\w+-])")),
+    ("option_type", re.compile(r"\b(call|put|ce|pe)s?\b")),
+    ("lots", re.compile(r"\b(\d+)\s*lots?\b")),
+    ("quantity", re.compile(r"\b(?:qty|quantity)\s*(?:of\s*)?(\d+)\b")),
+    ("product", re.compile(r"\b(mis|nrml|cnc|intraday|positional|overnight)\b")),
+    ("expiry", re.compile(r"\b(current|this|next)\s+(week|month)(?:ly)?\b")),
+    ("expiry_alias", re.compile(r"\b(weekly|monthly)\b")),
+)
+_WORD_RE = re.compile(r"[a-z0-9]+|[^\sa-z0-9]")
+
+
+class FastPathResult:
+    __slots__ = ("strategy", "template", "confidence", "elapsed_us")
+
+    def __init__(self, strategy, template, confidence, elapsed_us):
+        self.strategy = strategy
+        self.template = template
+        self.confidence = confidence
+        self.elapsed_us = elapsed_us
+
+
+class FastPathStats:
+    """Hits and parse latency per template, plus fallbacks to the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = defaultdict(int)
+        self.total_us = defaultdict(float)
+        self.fallbacks = 0
+        self.fallback_us = 0.0
+
+    def record(self, template, elapsed_us):
+        with self._lock:
+            if template is None:
+                self.fallbacks += 1
+                self.fallback_us += elapsed_us
+            else:
+                self.hits[template] += 1
+                self.total_us[template] += elapsed_us
+
+    def report(self):
+        total = sum(self.hits.values()) + self.fallbacks
+        return {
+            "requests": total,
+            "hit_rate": sum(self.hits.values()) / total if total else 0.0,
+            "fallbacks": self.fallbacks,
+            "templates": {
+                name: {"hits": n, "mean_us": round(self.total_us[name] / n, 1)}
+                for name, n in sorted(self.hits.items())
+            },
+        }
+
+
+stats = FastPathStats()
+
+
+def time_str(hour, minute):
+    """"HH:MM" market time for a prompt's hour and minute; None when out of range."""
+    hour, minute = int(hour), int(minute)
+    if hour > 23 or minute > 59:
+        return None
+    # Bare afternoon hours ("at 3:15") are meant as market hours
+    if hour < 8:
+        hour += 12
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _time_compare(operator, value):
+    return {"condition_type": "COMPARE", "left": {"keyword": "Now"}, "operator": operator, "right": value}
+
+
+def _instrument(symbol, option_type, offset, expiry):
+    return {
+        "exchange": "BSE" if symbol == "SENSEX" else "NFO",
+        "symbol_token": symbol,
+        "instrument_type": option_type,
+        "expiry_config": {"type": expiry, "offset": 1 if expiry.startswith("Next") else 0},
+        "strike_config": {"selection_method": "ATM", "offset": offset},
+    }
+
+
+def _position(action, symbol, option_type, offset, expiry, product, quantity):
+    return {
+        "transaction_type": action,
+        "product_type": product,
+        "instrument": _instrument(symbol, option_type, offset, expiry),
+        "quantity_setup": quantity,
+    }
+
+
+def _extract(text):
+    """Runs every pattern once; returns matches per pattern and the consumed mask."""
+    consumed = [False] * len(text)
+    found = {}
+    for name, pattern in PATTERNS:
+        matches = []
+        for m in pattern.finditer(text):
+            if any(consumed[m.start():m.end()]):
+                continue
+            matches.append(m)
+            consumed[m.start():m.end()] = [True] * (m.end() - m.start())
+        if matches:
+            found[name] = matches
+    return found, consumed
+
+
+def _unexplained(text, consumed):
+    """Meaningful tokens no pattern explains, and the share of meaningful tokens that are explained."""
+    total = 0
+    unexplained = []
+    for m in _WORD_RE.finditer(text):
+        token = m.group()
+        if token in STOPWORDS or not token.strip() or token in ",.;:!":
+            continue
+        total += 1
+        if not all(consumed[m.start():m.end()]):
+            unexplained.append(token)
+    return unexplained, (total - len(unexplained)) / total if total else 0.0
+
+
+def _single(found, name):
+    matches = found.get(name, [])
+    if len(matches) > 1:
+        raise ValueError(f"ambiguous {name}")
+    return matches[0] if matches else None
+
+
+def _build(found):
+    action_m = _single(found, "action")
+    symbol_m = _single(found, "symbol")
+    if not action_m or not symbol_m:
+        return None, None
+
+    action = "BUY" if action_m.group(1) in ("buy", "long") else "SELL"
+    symbol = re.sub(r"\s+", "", symbol_m.group(1)).upper()
+    exchange, underlying = UNDERLYINGS[symbol]
+
+    offset = 0
+    strike_m = _single(found, "strike")
+    if strike_m and strike_m.group(2):
+        offset = int(strike_m.group(2)) * (1 if strike_m.group(1) == "+" else -1)
+
+    expiry = "Current Week"
+    expiry_m = _single(found, "expiry")
+    alias_m = _single(found, "expiry_alias")
+    if expiry_m:
+        expiry = EXPIRIES[(expiry_m.group(1), expiry_m.group(2))]
+    elif alias_m:
+        expiry = "Current Week" if alias_m.group(1) == "weekly" else "Current Month"
+
+    product_m = _single(found, "product")
+    product = PRODUCTS[product_m.group(1)] if product_m else "MIS"
+
+    lots_m = _single(found, "lots")
+    qty_m = _single(found, "quantity")
+    if lots_m and qty_m:
+        return None, None
+    if qty_m:
+        quantity = {"type": "Fixed Quantity", "value": int(qty_m.group(1))}
+    else:
+        quantity = {"type": "Lots", "value": int(lots_m.group(1)) if lots_m else 1}
+
+    structure_m = _single(found, "structure")
+    option_m = _single(found, "option_type")
+    width_m = _single(found, "width")
+    steps_m = _single(found, "otm_steps")
+
+    if structure_m and structure_m.group(1) == "straddle":
+        if option_m or width_m or steps_m:
+            return None, None
+        legs = [("CALL", offset), ("PUT", offset)]
+        template = "straddle"
+    elif structure_m:
+        width = width_m or steps_m
+        if not width or option_m or (steps_m and steps_m.group(2) != "otm"):
+            return None, None
+        n = int(width.group(1))
+        # Strangle convention: CALL positive offset, PUT negative offset
+        legs = [("CALL", n), ("PUT", -n)]
+        template = "strangle"
+    elif option_m:
+        if width_m:
+            return None, None
+        option_type = "CALL" if option_m.group(1) in ("call", "ce") else "PUT"
+        if steps_m:
+            n = int(steps_m.group(1))
+            otm = steps_m.group(2) == "otm"
+            # OTM is above spot for calls and below for puts
+            offset = n if otm == (option_type == "CALL") else -n
+        legs = [(option_type, offset)]
+        template = "single_leg"
+    else:
+        return None, None
+
+    conditions = {
+        "condition_type": "COMPARE",
+        "left": {
+            "keyword": "LTP",
+            "inputs": {"instrument": {"exchange": exchange, "symbol_token": underlying, "instrument_type": "EQUITY"}},
+        },
+        "operator": ">",
+        "right": 0,
+    }
+    window_m = _single(found, "window")
+    entry_m = _single(found, "entry_time")
+    if window_m and entry_m:
+        return None, None
+    if window_m:
+        start, end = time_str(*window_m.group(1, 2)), time_str(*window_m.group(3, 4))
+        if not start or not end:
+            return None, None
+        conditions = {
+            "condition_type": "GROUP",
+            "connection_logic": "AND",
+            "conditions": [_time_compare(">=", start), _time_compare("<=", end)],
+        }
+        template += "+window"
+    elif entry_m:
+        at = time_str(*entry_m.group(2, 3))
+        if not at:
+            return None, None
+        conditions = _time_compare(">=" if entry_m.group(1) == "at" else ">", at)
+        template += "+time"
+
+    phases = [{
+        "phase_type": "Entry",
+        "conditions": conditions,
+        "positions": [
+            _position(action, symbol, option_type, leg_offset, expiry, product, quantity)
+            for option_type, leg_offset in legs
+        ],
+    }]
+
+    exit_m = _single(found, "exit_time")
+    if exit_m:
+        at = time_str(*exit_m.group(1, 2))
+        if not at:
+            return None, None
+        phases.append({"phase_type": "Exit", "conditions": _time_compare(">=", at), "positions": []})
+        template += "+exit"
+
+    return {"strategy_sets": [{"set_index": 1, "phases": phases}]}, template
+
+
+def parse(prompt, stats=stats, validator=None):
+    """
+    Builds v3 strategy JSON for formulaic prompts (straddles, strangles,
+    single ATM±n legs with time windows, lots and product type).
+    Returns a FastPathResult, or None when the LLM should handle the prompt:
+    whenever it names a VETO_TERMS word or any meaningful token is left
+    unexplained by the patterns, since the template would drop its meaning.
+    With a `validator` (the caller's schema), a strategy it reports any
+    issue for is also left to the LLM, so other schema versions are safe.
+    """
+    t0 = time.perf_counter()
+    text = " ".join((prompt or "").lower().split())
+    result = None
+    try:
+        found, consumed = _extract(text)
+        unexplained, confidence = _unexplained(text, consumed)
+        vetoed = any(m.group() in VETO_TERMS for m in _WORD_RE.finditer(text))
+        if not unexplained and not vetoed:
+            strategy, template = _build(found)
+            if strategy is not None and not (validator is not None and validator.validate(strategy)):
+                result = (strategy, template, confidence)
+    except ValueError:
+        result = None
+
+    elapsed_us = (time.perf_counter() - t0) * 1e6
+    if result is None:
+        stats.record(None, elapsed_us)
+        return None
+    stats.record(result[1], elapsed_us)
+    return FastPathResult(result[0], result[1], result[2], elapsed_us)
+
+
+if __name__ == "__main__":
+    import json
+
+    samples = [
+        "Buy NIFTY ATM straddle at 9:20",
+        "Sell BANKNIFTY strangle +-2 strikes, exit at 15:15",
+        "Sell strangle ±2 strikes on nifty 2 lots NRML",
+        "Buy Nifty ATM+2 call after 9:30",
+        "buy banknifty atm-1 pe between 9:20 and 10:00 qty 30 intraday",
+        "Buy NIFTY 2 strikes OTM put next week expiry",
+        "Buy Nifty ATM call when RSI(14) crosses above 60",
+        "Sell BANKNIFTY straddle at 9:20, exit at 15:15, SL",
+    ]
+    for prompt in samples:
+        res = parse(prompt)
+        print(f"{prompt!r}: {res.template if res else 'LLM'}")
+    print(json.dumps(stats.report(), indent=2))
@@ -0,0 +1,307 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+# LLM attempts in flight across every request in the process
+HEDGE_CONCURRENCY = int(os.getenv("HEDGE_CONCURRENCY", 8))
+# Attempts a single request may race
+HEDGE_MAX_ATTEMPTS = int(os.getenv("HEDGE_MAX_ATTEMPTS", 2))
+# A hedge starts once the first attempt is slower than this quantile of past attempts
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", 0.9))
+# Hedge delay (seconds) until MIN_SAMPLES attempts have been timed
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", 5.0))
+MIN_SAMPLES = 20
+
+
+class ConcurrencyBudget:
+    """Counting semaphore that remembers its peak use and the hedges it refused."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.denied = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, blocking=True):
+        with self._cond:
+            while self.in_flight >= self.limit:
+                if not blocking:
+                    self.denied += 1
+                    return False
+                self._cond.wait()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            return True
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+
+budget = ConcurrencyBudget(HEDGE_CONCURRENCY)
+
+
+class HedgeError(RuntimeError):
+    """Raised when every attempt finished without a value and without raising."""
+
+
+class Cancellation(threading.Event):
+    """
+    Cancel event of one hedged request. `on_set(callback)` runs the callback
+    (e.g. closing an attempt's stream) when the event is set, or at once if
+    it already is, so an attempt blocked on a read is not waited for.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._callbacks = []
+        self._callbacks_lock = threading.Lock()
+
+    def on_set(self, callback):
+        with self._callbacks_lock:
+            if not self.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def set(self):
+        with self._callbacks_lock:
+            super().set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass # the attempt sees the failure, or has already finished
+
+
+class _Slot:
+    """An attempt's hold on the budget, given back once: when it returns or when it is cancelled."""
+    __slots__ = ("budget", "held", "_lock")
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.held = True
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if not self.held:
+                return
+            self.held = False
+        self.budget.release()
+
+
+class Attempt:
+    __slots__ = ("index", "value", "ok", "error", "seconds", "tokens")
+
+    def __init__(self, index, value, ok, error, seconds, tokens):
+        self.index = index
+        self.value = value
+        self.ok = ok
+        self.error = error
+        self.seconds = seconds
+        self.tokens = tokens
+
+
+class HedgeResult:
+    """`value` of the winning attempt (ok=True), else of the first attempt that returned one."""
+    __slots__ = ("value", "ok", "winner", "launched", "seconds")
+
+    def __init__(self, value, ok, winner, launched, seconds):
+        self.value = value
+        self.ok = ok
+        self.winner = winner
+        self.launched = launched
+        self.seconds = seconds
+
+
+def _quantiles(histogram):
+    return {f"p{round(q * 100)}": round(histogram.quantile(q), 3) for q in (0.5, 0.95, 0.99)}
+
+
+class Hedger:
+    """
+    Races up to `max_attempts` copies of one LLM attempt. The first starts at
+    once; another starts when the running ones have been slower than the
+    `quantile` of past attempt times, when every attempt so far failed, or
+    (for priority requests) immediately. The first attempt returning ok wins
+    and the others see their cancel event set. Every attempt holds a slot of
+    the shared `budget` until it returns or is cancelled: the first waits for
+    one, hedges are skipped when none is free.
+    """
+
+    def __init__(self, budget=budget, max_attempts=HEDGE_MAX_ATTEMPTS, quantile=HEDGE_QUANTILE,
+                 default_delay=HEDGE_DEFAULT_DELAY, min_samples=MIN_SAMPLES):
+        self.budget = budget
+        self.max_attempts = max_attempts
+        self.quantile = quantile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        # Cancelled attempts give their slot back at once but may still be unwinding a read
+        self._executor = ThreadPoolExecutor(max_workers=2 * budget.limit, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self.attempt_latency = metrics.Histogram(metrics.LATENCY_BUCKETS) # finished, uncancelled attempts
+        self.latency = metrics.Histogram(metrics.LATENCY_BUCKETS) # per request, first success
+        self.primary_latency = metrics.Histogram(metrics.LATENCY_BUCKETS) # first attempt alone
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+        self.cancelled = 0
+        self.tokens = 0
+        self.winner_tokens = 0
+
+    def delay(self):
+        """Seconds to wait for the running attempts before starting a hedge."""
+        with self._lock:
+            if self.attempt_latency.count < self.min_samples:
+                return self.default_delay
+            return self.attempt_latency.quantile(self.quantile)
+
+    def run(self, attempt, priority=False, trace=None):
+        """
+        `attempt(index, cancel, trace)` returns (value, ok) and should stop
+        early (returning (None, False)) once `cancel`, a Cancellation, is
+        set; blocking work such as an open stream should be registered with
+        `cancel.on_set` so it is closed then. Raises the last error if no
+        attempt returned a value, HedgeError if none raised either.
+        """
+        trace = trace or metrics.Trace("hedge")
+        cancel = Cancellation()
+        done = queue.Queue()
+        started = time.perf_counter()
+        launched = running = denied = 0
+        slots = []
+
+        def launch(blocking):
+            nonlocal launched, running, denied
+            if not self.budget.acquire(blocking):
+                denied += 1
+                return False
+            slots.append(_Slot(self.budget))
+            self._executor.submit(self._attempt, attempt, launched, cancel, slots[-1], trace, started, done)
+            launched += 1
+            running += 1
+            return True
+
+        launch(True)
+        while priority and launched < self.max_attempts and launch(False):
+            pass
+        delay = self.delay()
+        next_hedge = started + delay
+        finished = []
+        winner = None
+        while running:
+            timeout = None
+            if launched < self.max_attempts:
+                timeout = max(0.0, next_hedge - time.perf_counter())
+            try:
+                result = done.get(timeout=timeout)
+            except queue.Empty:
+                # Budget exhausted: try again one delay later
+                launch(False)
+                next_hedge += delay
+                continue
+            running -= 1
+            finished.append(result)
+            if result.ok:
+                winner = result
+                break
+            if not running and launched < self.max_attempts:
+                # Nothing left to wait for: the next attempt need not wait out the delay
+                launch(True)
+        cancel.set()
+        for slot in slots:
+            slot.release() # attempts still running no longer count against the budget
+
+        seconds = time.perf_counter() - started
+        trace.event("hedge", launched=launched, winner=winner.index if winner else None, denied=denied)
+        registry = trace.registry
+        with self._lock:
+            self.requests += 1
+            self.hedged += launched > 1
+            self.denied += denied
+            self.cancelled += running
+            if winner is not None:
+                self.latency.observe(seconds)
+                self.hedge_wins += winner.index > 0
+                self.winner_tokens += winner.tokens
+        registry.observe("hedge_attempts", launched, metrics.COUNT_BUCKETS, help="Parallel LLM attempts per request")
+        if denied:
+            registry.inc("hedge_denied_total", denied, help="Hedges skipped for lack of concurrency budget")
+        if winner is not None:
+            registry.inc("hedge_wins_total", help="Requests by winning attempt", winner="hedge" if winner.index else "first")
+            registry.inc("hedge_tokens_total", winner.tokens, help="Tokens of hedged requests", kind="winner")
+
+        if winner is not None:
+            return HedgeResult(winner.value, True, winner.index, launched, seconds)
+        for result in finished:
+            if result.value is not None:
+                return HedgeResult(result.value, False, None, launched, seconds)
+        for result in reversed(finished):
+            if result.error is not None:
+                raise result.error
+        raise HedgeError(f"all {launched} attempts finished without a result")
+
+    def _attempt(self, attempt, index, cancel, slot, trace, started, done):
+        fork = trace.fork()
+        t0 = time.perf_counter()
+        value, ok, error = None, False, None
+        try:
+            value, ok = attempt(index, cancel, fork)
+        except Exception as e:
+            error = e
+        finally:
+            slot.release()
+        seconds = time.perf_counter() - t0
+        tokens = sum(
+            span.attrs.get("prompt_tokens", 0) + span.attrs.get("completion_tokens", 0)
+            for span in fork.spans if span.name == "llm_call"
+        )
+        trace.join(fork, attempt=index)
+        was_cancelled = cancel.is_set()
+        with self._lock:
+            self.tokens += tokens
+            if not was_cancelled:
+                self.attempt_latency.observe(seconds)
+            if index == 0:
+                # A cancelled first attempt was at least this slow
+                self.primary_latency.observe(time.perf_counter() - started)
+        trace.registry.inc("hedge_tokens_total", tokens, help="Tokens of hedged requests", kind="all")
+        done.put(Attempt(index, value, ok, error, seconds, tokens))
+
+    def report(self):
+        """
+        Request latency with hedging next to the first attempt's own
+        latency, and the tokens spent on attempts that did not win. A
+        cancelled first attempt is counted at the time it stopped, so its
+        quantiles are a lower bound; benchmarks/hedging.py measures the gain
+        against hedging switched off.
+        """
+        with self._lock:
+            latency = _quantiles(self.latency)
+            primary = _quantiles(self.primary_latency)
+            extra = self.tokens - self.winner_tokens
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "denied": self.denied,
+                "cancelled": self.cancelled,
+                "budget": {"limit": self.budget.limit, "in_flight": self.budget.in_flight, "peak": self.budget.peak},
+                "delay_s": round(self.attempt_latency.quantile(self.quantile), 3)
+                if self.attempt_latency.count >= self.min_samples else self.default_delay,
+                "latency_s": latency,
+                "first_attempt_latency_s": primary,
+                "tokens": self.tokens,
+                "extra_tokens": extra,
+                "extra_token_ratio": round(extra / self.winner_tokens, 3) if self.winner_tokens else 0.0,
+            }
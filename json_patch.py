@@ -0,0 +1,147 @@
+import copy
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class JSONPatchError(ValueError):
+    """Raised for a malformed patch or an operation that does not apply; `index` is the operation's position."""
+
+    def __init__(self, message, index=None):
+        super().__init__(f"operation {index}: {message}" if index is not None else message)
+        self.index = index
+
+
+def parse_pointer(pointer):
+    """JSON Pointer (RFC 6901) to its unescaped reference tokens; "" is the whole document."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise JSONPatchError(f"invalid JSON pointer {pointer!r}")
+    if not pointer:
+        return []
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _array_index(container, token, insert=False):
+    if token == "-" and insert:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise JSONPatchError(f"{token!r} is not an array index")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not insert):
+        raise JSONPatchError(f"array index {index} out of range")
+    return index
+
+
+def _resolve(document, tokens):
+    node = document
+    for token in tokens:
+        if isinstance(node, dict):
+            if token not in node:
+                raise JSONPatchError(f"no member {token!r}")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_array_index(node, token)]
+        else:
+            raise JSONPatchError(f"cannot descend into {type(node).__name__} at {token!r}")
+    return node
+
+
+def _add(document, tokens, value):
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, tokens[-1], insert=True), value)
+    else:
+        raise JSONPatchError(f"cannot add to {type(parent).__name__}")
+    return document
+
+
+def _remove(document, tokens):
+    if not tokens:
+        raise JSONPatchError("cannot remove the whole document")
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise JSONPatchError(f"no member {tokens[-1]!r}")
+        return parent.pop(tokens[-1])
+    if isinstance(parent, list):
+        return parent.pop(_array_index(parent, tokens[-1]))
+    raise JSONPatchError(f"cannot remove from {type(parent).__name__}")
+
+
+def apply_patch(document, patch):
+    """
+    Applies an RFC 6902 patch to a copy of `document` and returns the copy;
+    `document` is left alone. The patch applies atomically: any failing
+    operation (a `test` included) raises JSONPatchError.
+    """
+    if not isinstance(patch, list):
+        raise JSONPatchError("a patch is a JSON array of operations")
+    document = copy.deepcopy(document)
+    for index, operation in enumerate(patch):
+        try:
+            if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+                raise JSONPatchError(f"expected an object with \"op\" one of {', '.join(OPERATIONS)}")
+            op = operation["op"]
+            tokens = parse_pointer(operation.get("path"))
+            if op in ("add", "replace", "test") and "value" not in operation:
+                raise JSONPatchError(f"{op} needs a \"value\"")
+            if op == "add":
+                document = _add(document, tokens, copy.deepcopy(operation["value"]))
+            elif op == "remove":
+                _remove(document, tokens)
+            elif op == "replace":
+                if tokens:
+                    _resolve(document, tokens) # the target must exist
+                    _remove(document, tokens)
+                document = _add(document, tokens, copy.deepcopy(operation["value"]))
+            elif op == "test":
+                if _resolve(document, tokens) != operation["value"]:
+                    raise JSONPatchError(f"test failed at {operation['path']!r}")
+            else:
+                source = parse_pointer(operation.get("from"))
+                if op == "move":
+                    if tokens[:len(source)] == source and len(tokens) > len(source):
+                        raise JSONPatchError("cannot move a value into one of its own children")
+                    value = _remove(document, source)
+                else:
+                    value = copy.deepcopy(_resolve(document, source))
+                document = _add(document, tokens, value)
+        except JSONPatchError as e:
+            if e.index is not None:
+                raise
+            raise JSONPatchError(str(e), index) from None
+    return document
+
+
+def affected_phases(patch):
+    """
+    (set position, phase position) pairs whose rendering a patch can change,
+    or None when it adds, removes or replaces whole sets or phases, after
+    which positions no longer line up and everything is rendered again.
+    Changes elsewhere in a set (e.g. its set_index) touch only the header.
+    """
+    phases = set()
+    for operation in patch:
+        op = operation.get("op")
+        if op == "test":
+            continue
+        pointers = [operation.get("path")]
+        if op in ("move", "copy"):
+            pointers.append(operation.get("from"))
+        for pointer in pointers:
+            if op == "copy" and pointer == operation.get("from"):
+                continue # a copy's source is only read
+            tokens = parse_pointer(pointer)
+            if len(tokens) < 2 or tokens[0] != "strategy_sets":
+                return None
+            if len(tokens) >= 3 and tokens[2] != "phases":
+                continue
+            if len(tokens) < 4 or (len(tokens) == 4 and op != "replace"):
+                return None
+            if not (tokens[1].isdigit() and tokens[3].isdigit()):
+                return None
+            phases.add((int(tokens[1]), int(tokens[3])))
+    return phases
@@ -0,0 +1,199 @@
+import json
+import re
+import threading
+from collections import Counter
+
+import json5
+
+STAGES = ("direct", "strip_fences", "json5", "balance")
+
+_FENCE_RE = re.compile(r"```[a-zA-Z0-9]*[ \t]*\r?\n?|```")
+_CLOSERS = {"{": "}", "[": "]"}
+# Give up on bracket balancing after this many truncation candidates
+MAX_BALANCE_ATTEMPTS = 64
+
+
+class JSONRepairError(json.JSONDecodeError):
+    """Raised when no local repair stage could recover the output."""
+
+    def __init__(self, error, doc):
+        super().__init__(error.msg, error.doc, error.pos)
+        self.fragment = error.doc[max(0, error.pos - 80):error.pos + 80]
+        self.original = doc
+
+
+class RepairStats:
+    """Per-stage counters; every recovery past `direct` is an LLM call saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.attempts = Counter()
+        self.successes = Counter()
+        self.failures = 0
+
+    def record(self, stage, ok):
+        with self._lock:
+            self.attempts[stage] += 1
+            if ok:
+                self.successes[stage] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    @property
+    def llm_calls_saved(self):
+        return sum(n for stage, n in self.successes.items() if stage != "direct")
+
+    def as_dict(self):
+        return {
+            "attempts": dict(self.attempts),
+            "successes": dict(self.successes),
+            "failures": self.failures,
+            "llm_calls_saved": self.llm_calls_saved,
+        }
+
+
+stats = RepairStats()
+
+
+def strip_fences(text, keep_tail=False, opener="{"):
+    """
+    Removes markdown fences and any prose around the outermost object (or
+    array, with opener "["). keep_tail keeps everything after the opening
+    bracket (for truncated output).
+    """
+    text = _FENCE_RE.sub("", text).strip()
+    start = text.find(opener)
+    if start == -1:
+        return text
+    end = len(text) - 1 if keep_tail else text.rfind(_CLOSERS[opener])
+    return text[start:end + 1] if end > start else text[start:]
+
+
+def _balance_candidates(text):
+    """
+    Yields prefixes of a truncated document with the missing closers appended,
+    latest cut point first. Values cut mid-string are dropped, not guessed,
+    and cuts that leave an empty trailing container are tried last.
+    """
+    stack = []
+    expect_key = []
+    boundaries = []
+    in_string = False
+    escape = False
+    string_is_key = False
+
+    for i, c in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+                if not string_is_key:
+                    boundaries.append((i + 1, "".join(stack), False))
+            continue
+
+        if c == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "}" and expect_key[-1]
+            if string_is_key:
+                expect_key[-1] = False
+        elif c in "{[":
+            stack.append(_CLOSERS[c])
+            expect_key.append(c == "{")
+            boundaries.append((i + 1, "".join(stack), True))
+        elif c in "}]":
+            if not stack or stack[-1] != c:
+                break
+            stack.pop()
+            expect_key.pop()
+            boundaries.append((i + 1, "".join(stack), False))
+        elif c == ",":
+            boundaries.append((i, "".join(stack), False))
+            if stack and stack[-1] == "}":
+                expect_key[-1] = True
+
+    boundaries = boundaries[-MAX_BALANCE_ATTEMPTS:]
+    ordered = [b for b in reversed(boundaries) if not b[2]] + [b for b in reversed(boundaries) if b[2]]
+    for cut, closers, _ in ordered:
+        yield text[:cut].rstrip().rstrip(",") + "".join(reversed(closers))
+
+
+def _balance(text):
+    last_error = None
+    for candidate in _balance_candidates(text):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError as e:
+            last_error = e
+    raise last_error or json.JSONDecodeError("Nothing to balance", text, 0)
+
+
+def repair_json(text, stats=stats, container=dict):
+    """
+    Parses LLM output, trying progressively more lenient local stages:
+    plain json, fence/prose stripping, json5 (comments, trailing commas,
+    single quotes) and bracket balancing for truncated tails.
+    `container` is the expected top-level type: with list, fences are
+    stripped to the outer array and no balancing is tried, since closing a
+    truncated array would silently drop its remaining items.
+    Returns (data, stage); raises JSONRepairError if every stage fails.
+    """
+    opener = "[" if container is list else "{"
+    try:
+        data = json.loads(text)
+        stats.record("direct", True)
+        return data, "direct"
+    except json.JSONDecodeError as e:
+        stats.record("direct", False)
+        first_error = e
+
+    stripped = strip_fences(text, opener=opener)
+    if stripped != text:
+        try:
+            data = json.loads(stripped)
+            stats.record("strip_fences", True)
+            return data, "strip_fences"
+        except json.JSONDecodeError:
+            stats.record("strip_fences", False)
+
+    try:
+        data = json5.loads(stripped)
+        if isinstance(data, container):
+            stats.record("json5", True)
+            return data, "json5"
+        stats.record("json5", False)
+    except ValueError:
+        stats.record("json5", False)
+
+    if container is dict:
+        try:
+            data = _balance(strip_fences(text, keep_tail=True))
+            stats.record("balance", True)
+            return data, "balance"
+        except json.JSONDecodeError:
+            stats.record("balance", False)
+
+    stats.record_failure()
+    raise JSONRepairError(first_error, text)
+
+
+def reask_message(error):
+    """Targeted correction request carrying the parse error and the broken fragment."""
+    return (
+        "Your previous output was not valid JSON.\n"
+        f"Parse error: {error.msg} (line {error.lineno}, column {error.colno}).\n"
+        f"Broken fragment:\n{getattr(error, 'fragment', '')}\n"
+        "Return the complete corrected JSON only, nothing else."
+    )
+
+
+def truncation_message():
+    """Re-ask for output that stopped at the token limit before the document was complete."""
+    return (
+        "Your previous output was cut off before the JSON was complete.\n"
+        "Return the complete JSON only, as compact as you can (no whitespace between tokens), nothing else."
+    )
@@ -6,74 +6,193 @@ def parse_instrument_str(inst):
         return "Unknown"
     return inst.get("symbol_token", "")
 
-def parse_operand(op):
-    """
-    Parses operands to look like UI text: 
-    e.g. 'LTP (NIFTY)' or '0' instead of dictionaries.
-    """
-    # 1. Handle Static Numbers (e.g. {'type': 'number', 'title': '0'})
-    if isinstance(op, dict) and op.get("type") == "number":
-        return str(op.get("title", op.get("value", "0")))
+# --- Operand formatters ---
+# Each schema version has a table from operand name (function_name / keyword /
+# pattern_name) to formatter(name, op), plus a fallback for unregistered names.
+# Dispatch is one dict lookup, however many keywords the schema defines.
+OPERAND_FORMATTERS = {"v2": {}, "v3": {}}
 
-    if not isinstance(op, dict):
-        return str(op)
+def register_formatter(*names, version="v3"):
+    """Registers `fn(name, op) -> str` for the given operand names."""
+    def decorator(fn):
+        for name in names:
+            OPERAND_FORMATTERS[version][name] = fn
+        return fn
+    return decorator
 
-    # 2. Handle Indicators / Keywords
-    name = op.get("function_name") or op.get("keyword") or op.get("pattern_name")
+def _format_v3(name, op):
+    # Handle standard inputs/instrument
+    inputs = op.get("inputs")
+    inst = (inputs and inputs.get("instrument")) or op.get("instrument")
     
-    if name:
-        # Special handling for Set/Get Runtime to look cleaner
-        if name == "Set Runtime":
-            # Use params if available
-            params = op.get("params", {})
-            var = params.get("variable_name", "Var")
-            val = parse_operand(params.get("value", ""))
-            return f"Set Runtime({var} = {val})"
-        
-        if name in ["Get Runtime", "Get Runtime Number"]:
-            params = op.get("params", {})
-            return f"Get Runtime ({params.get('variable_name', '')})"
+    # If there is an instrument, format as Keyword (Symbol)
+    if inst:
+        symbol = parse_instrument_str(inst)
+        # Handle timeframe if present (e.g., Low(15m))
+        tf = op.get("timeframe")
+        if tf:
+            return f"{name} ({symbol}, {tf})"
+        return f"{name} ({symbol})"
 
-        # Handle standard inputs/instrument
-        inputs = op.get("inputs", {})
-        inst = inputs.get("instrument") or op.get("instrument")
-        
-        # If there is an instrument, format as Keyword (Symbol)
-        if inst:
-            symbol = parse_instrument_str(inst)
-            # Handle timeframe if present (e.g., Low(15m))
-            tf = op.get("timeframe")
-            if tf:
-                return f"{name} ({symbol}, {tf})"
-            return f"{name} ({symbol})"
-            
+    # Instrument-less operands show their inputs and timeframe, e.g. RSI(14, 5m);
+    # zero-argument keywords (e.g. Now) are shown by name
+    args = [str(v) for k, v in (inputs or {}).items() if k != "instrument"]
+    if op.get("timeframe"):
+        args.append(op["timeframe"])
+    return f"{name}({', '.join(args)})" if args else name
+
+def _format_v3_unnamed(op):
+    # Static Numbers (e.g. {'type': 'number', 'title': '0'})
+    if op.get("type") == "number":
+        return str(op.get("title", op.get("value", "0")))
+    return str(op)
+
+@register_formatter("Set Runtime")
+def _format_set_runtime(name, op):
+    # Special handling for Set/Get Runtime to look cleaner
+    params = op.get("params", {})
+    var = params.get("variable_name", "Var")
+    val = parse_operand(params.get("value", ""))
+    return f"Set Runtime({var} = {val})"
+
+@register_formatter("Get Runtime", "Get Runtime Number")
+def _format_get_runtime(name, op):
+    params = op.get("params", {})
+    return f"Get Runtime ({params.get('variable_name', '')})"
+
+def _format_v2(name, op):
+    # v2 text follows the keys present, not the dispatch name: a function_name key wins even when empty
+    if "function_name" in op:
+        name = op["function_name"]
+        tf = op.get("timeframe", "")
+        inputs = [str(v) for k, v in op.get("inputs", {}).items()]
+        params = ", ".join([tf] + inputs) if tf or inputs else ""
+        return f"{name}({params})" if params else name
+
+    if "instrument" in op:
+        return f"{op.get('keyword', 'Value')} ({op['instrument'].get('symbol_token', 'Unknown')})"
     return str(op)
 
+def _format_v2_unnamed(op):
+    # Same fallbacks as a named operand, e.g. "Value (sym)" for a bare instrument
+    return _format_v2(None, op)
+
+def _compile_dispatch(table, default, unnamed):
+    # Table and fallbacks are bound as locals: a call costs the name probe plus one dict lookup
+    def dispatch(op, _get=table.get, _dict=dict, _str=str):
+        if type(op) is not _dict:
+            return _str(op)
+        name = op.get("function_name") or op.get("keyword") or op.get("pattern_name")
+        if not name:
+            return unnamed(op)
+        return _get(name, default)(name, op)
+    return dispatch
+
+_DISPATCH = {
+    "v2": _compile_dispatch(OPERAND_FORMATTERS["v2"], _format_v2, _format_v2_unnamed),
+    "v3": _compile_dispatch(OPERAND_FORMATTERS["v3"], _format_v3, _format_v3_unnamed),
+}
+
+def format_operand(op, version="v3"):
+    """
+    Renders an operand as UI text: e.g. 'LTP (NIFTY)' or '0' instead of dictionaries.
+    """
+    return _DISPATCH[version](op)
+
+# Parses operands to look like UI text (v3)
+parse_operand = _DISPATCH["v3"]
+
+CONDITION_INDENT = "    "
+GROUP_INDENT = "      "
+
+def _separator_v3(logic, depth, line_prefix):
+    return f"\n{line_prefix}{GROUP_INDENT}{'  ' * depth}{logic} "
+
+def _separator_v2(logic, depth, line_prefix):
+    # v2 puts the connection logic on a line of its own
+    indent = CONDITION_INDENT + "  " * depth
+    return f"\n{indent}{logic}\n{indent}"
+
+class Dialect:
+    """Layout differences between the v2 (entry_conditions) and v3 output formats."""
+
+    def __init__(self, version, conditions_key, set_index_offset, default_set_index, rule_width,
+                 default_phase_type, group_separator, standalone_keywords, format_position,
+                 always_show_conditions, phase_trailer):
+        self.version = version
+        self.conditions_key = conditions_key
+        self.set_index_offset = set_index_offset
+        self.default_set_index = default_set_index
+        self.rule_width = rule_width
+        self.default_phase_type = default_phase_type
+        self.group_separator = group_separator
+        self.standalone_keywords = standalone_keywords
+        self.format_position = format_position
+        self.always_show_conditions = always_show_conditions
+        self.phase_trailer = phase_trailer
+
+def write_condition_tree(root, write, group_separator, read, line_prefix=CONDITION_INDENT):
+    """
+    Writes a condition tree without recursion: an explicit stack holds the
+    nodes and separators still to emit, so nesting depth is bounded only by
+    memory. Continuation lines of a GROUP start with its connection logic,
+    indented two more spaces per nesting level. `read(node)` returns
+    (logic, children) for a group, the text of a leaf, or None to skip the
+    node, so the JSON and the loaded strategy model share this layout.
+    """
+    stack = [(root, 0)]
+    push, pop = stack.append, stack.pop
+    _tuple = tuple
+    while stack:
+        node, depth = pop()
+        if depth is None: # a separator between group members
+            write(node)
+            continue
+        text = read(node)
+        if text is None:
+            continue
+        if type(text) is _tuple:
+            logic, children = text
+            if len(children) == 1:
+                push((children[0], depth))
+            elif children:
+                separator = (group_separator(logic, depth, line_prefix), None)
+                depth += 1
+                for i in range(len(children) - 1, 0, -1):
+                    push((children[i], depth))
+                    push(separator)
+                push((children[0], depth))
+            continue
+        if "\n" in text:
+            text = text.replace("\n", "\n" + line_prefix)
+        write(text)
+
+def write_condition(condition_node, write, line_prefix=CONDITION_INDENT, dialect=None):
+    """Writes a JSON condition tree (see write_condition_tree)."""
+    dialect = dialect or DIALECTS["v3"]
+    write_condition_tree(condition_node, write, dialect.group_separator, _READERS[dialect.version], line_prefix)
+
+def _condition_reader(fmt, standalone_keywords):
+    def read(node, _isinstance=isinstance, _dict=dict):
+        if not _isinstance(node, _dict):
+            return None
+        get = node.get
+        c_type = get("condition_type")
+        if c_type == "COMPARE":
+            return f"{fmt(get('left'))} {get('operator')} {fmt(get('right'))}"
+        if c_type == "GROUP":
+            return get("connection_logic", "AND"), get("conditions", [])
+        # Handle standalone keywords (like Set Runtime sitting in conditions)
+        if standalone_keywords and "keyword" in node:
+            return fmt(node)
+        return None
+    return read
+
 def parse_condition(condition_node):
-    """Recursive function to handle Groups and Comparisons."""
-    if not isinstance(condition_node, dict):
-        return ""
-
-    c_type = condition_node.get("condition_type")
-
-    if c_type == "GROUP":
-        logic = condition_node.get('connection_logic', 'AND')
-        sub_conditions = [parse_condition(c) for c in condition_node.get("conditions", [])]
-        if len(sub_conditions) > 1:
-            return f"\n      {logic} ".join(sub_conditions)
-        return sub_conditions[0] if sub_conditions else ""
-
-    elif c_type == "COMPARE":
-        left = parse_operand(condition_node.get("left"))
-        op = condition_node.get("operator")
-        right = parse_operand(condition_node.get("right"))
-        return f"{left} {op} {right}"
-    
-    # Handle standalone keywords (like Set Runtime sitting in conditions)
-    elif "keyword" in condition_node:
-        return parse_operand(condition_node)
-    
-    return ""
+    """Condition tree as text; continuation lines are not prefixed."""
+    parts = []
+    write_condition(condition_node, parts.append, line_prefix="")
+    return "".join(parts)
 
 def parse_position(pos):
     """
@@ -117,55 +236,261 @@ def parse_position(pos):
     
     return f"{t_type} [ {', '.join(details_list)} ]"
 
-def convert_json_to_text(json_data):
-    output = []
+def parse_position_v2(pos):
+    t_type = pos.get("transaction_type", "")
+    prod = pos.get("product_type", "")
+    qty = pos.get("quantity_setup", {}).get("value", 0)
+    
+    inst = pos.get("instrument", {})
+    ex = inst.get("exchange", "")
+    sym = inst.get("symbol_token", "")
+    i_type = inst.get("instrument_type", "")
+    
+    expiry = inst.get("expiry_config", {}).get("type", "-")
+    
+    # --- OFFSET LOGIC ---
+    strike_config = inst.get("strike_config", {})
+    strike = strike_config.get("selection_method", "-")
+    offset = strike_config.get("offset", 0)
+    
+    if offset > 0:
+        strike = f"{strike}+{offset}"
+    elif offset < 0:
+        strike = f"{strike}{offset}" 
+    
+    details = [ex, sym, i_type]
+    if i_type in ["OPTION", "CALL", "PUT"]:
+        details.extend([expiry, strike])
+    details.extend([prod, str(qty)])
+    
+    return f"{t_type} [ {', '.join(details)} ]"
+
+DIALECTS = {
+    "v2": Dialect(
+        "v2", "entry_conditions", set_index_offset=1, default_set_index=0, rule_width=25,
+        default_phase_type="Unknown Phase", group_separator=_separator_v2, standalone_keywords=False,
+        format_position=parse_position_v2, always_show_conditions=False, phase_trailer="\n",
+    ),
+    "v3": Dialect(
+        "v3", "conditions", set_index_offset=0, default_set_index=1, rule_width=35,
+        default_phase_type="Entry", group_separator=_separator_v3, standalone_keywords=True,
+        format_position=parse_position, always_show_conditions=True, phase_trailer="",
+    ),
+}
+
+# Condition node readers for write_condition_tree, one per dialect
+_READERS = {version: _condition_reader(_DISPATCH[version], d.standalone_keywords) for version, d in DIALECTS.items()}
+
+def detect_schema_version(json_data):
+    """v2 phases carry `entry_conditions`; anything else renders as v3."""
+    for strategy_set in json_data.get("strategy_sets", []):
+        for phase in strategy_set.get("phases", []):
+            if "entry_conditions" in phase:
+                return "v2"
+            if "conditions" in phase:
+                return "v3"
+    return "v3"
+
+def set_header_lines(set_idx, dialect=None):
+    dialect = dialect or DIALECTS["v3"]
+    return [f"Set #{set_idx + dialect.set_index_offset}", "-" * dialect.rule_width]
+
+class LineWriter:
+    """Joins lines with newlines while writing straight to a text stream."""
+    __slots__ = ("write", "started")
+
+    def __init__(self, write):
+        self.write = write
+        self.started = False
+
+    def new_line(self, text=""):
+        if self.started:
+            self.write("\n")
+        self.started = True
+        self.write(text)
+
+def write_phase(phase, lines, dialect=None):
+    dialect = dialect or DIALECTS["v3"]
+    p_type = phase.get("phase_type", dialect.default_phase_type)
+    
+    # Phase Header
+    lines.new_line(f"Phase: {p_type}")
+    
+    # Conditions Section
+    conditions = phase.get(dialect.conditions_key, {})
+    if conditions:
+        lines.new_line("  Conditions:")
+        lines.new_line(CONDITION_INDENT)
+        write_condition(conditions, lines.write, dialect=dialect)
+    elif dialect.always_show_conditions:
+        lines.new_line("  Conditions:")
+        lines.new_line("    (None)")
+    
+    # Positions Section
+    positions = phase.get("positions", [])
+    if positions:
+        lines.new_line("\n  Positions:")
+        for pos in positions:
+            lines.new_line(f"    {dialect.format_position(pos)}")
     
+    lines.new_line(dialect.phase_trailer) # Empty line between phases
+
+def phase_lines(phase, version="v3"):
+    """Rendered lines for a single phase (used directly when streaming)."""
+    return convert_phase_to_text(phase, version).split("\n")
+
+def convert_phase_to_text(phase, version="v3"):
+    parts = []
+    write_phase(phase, LineWriter(parts.append), DIALECTS[version])
+    return "".join(parts)
+
+def write_json_as_text(json_data, out, version=None):
+    """Renders a strategy into any file-like object with a `write` method."""
+    _write_strategy(json_data, LineWriter(out.write), version)
+
+def _write_strategy(json_data, lines, version):
+    dialect = DIALECTS[version or detect_schema_version(json_data)]
     for strategy_set in json_data.get("strategy_sets", []):
-        set_idx = strategy_set.get("set_index", 1)
-        output.append(f"Set #{set_idx}")
-        output.append("-" * 35)
+        for line in set_header_lines(strategy_set.get("set_index", dialect.default_set_index), dialect):
+            lines.new_line(line)
         
         for phase in strategy_set.get("phases", []):
-            p_type = phase.get("phase_type", "Entry")
-            
-            # Phase Header
-            output.append(f"Phase: {p_type}")
-            
-            # Conditions Section
-            conditions = phase.get("conditions", {})
-            output.append("  Conditions:")
-            if conditions:
-                readable_logic = parse_condition(conditions)
-                # Split logic by newlines to ensure indentation
-                for line in readable_logic.split('\n'):
-                    output.append(f"    {line}")
+            write_phase(phase, lines, dialect)
+
+def convert_json_to_text(json_data, version=None):
+    """Renders v2 or v3 strategy JSON; the version is detected when not given."""
+    # Appending to a list and joining once beats many small StringIO writes
+    parts = []
+    _write_strategy(json_data, LineWriter(parts.append), version)
+    return "".join(parts)
+
+def render_phase_texts(json_data, version=None, previous=None, dirty=None):
+    """
+    Text of every phase as [[phase text, ...] per set]. With `previous` (an
+    earlier result for the same sets and phases), only the (set position,
+    phase position) pairs in `dirty` are rendered again.
+    """
+    dialect = DIALECTS[version or detect_schema_version(json_data)]
+    texts = []
+    for i, strategy_set in enumerate(json_data.get("strategy_sets", [])):
+        set_texts = []
+        for j, phase in enumerate(strategy_set.get("phases", [])):
+            if previous is not None and dirty is not None and (i, j) not in dirty:
+                set_texts.append(previous[i][j])
             else:
-                output.append("    (None)")
-            
-            # Positions Section
-            positions = phase.get("positions", [])
-            if positions:
-                output.append("\n  Positions:")
-                for pos in positions:
-                    output.append(f"    {parse_position(pos)}")
-            
-            output.append("") # Empty line between phases
-            
-    return "\n".join(output)
+                set_texts.append(convert_phase_to_text(phase, dialect.version))
+        texts.append(set_texts)
+    return texts
 
+def join_phase_texts(json_data, phase_texts, version=None):
+    """The convert_json_to_text output assembled from render_phase_texts."""
+    dialect = DIALECTS[version or detect_schema_version(json_data)]
+    lines = []
+    for strategy_set, set_texts in zip(json_data.get("strategy_sets", []), phase_texts):
+        lines.extend(set_header_lines(strategy_set.get("set_index", dialect.default_set_index), dialect))
+        lines.extend(set_texts)
+    return "\n".join(lines)
 
-input_json = {
-  "strategy_sets": [
-    {
-      "set_index": 1,
-      "phases": [
+if __name__ == "__main__":
+    input_json = {
+      "strategy_sets": [
         {
-          "phase_type": "Entry",
-          "conditions": {
-            "condition_type": "GROUP",
-            "connection_logic": "AND",
-            "conditions": [
-              {
+          "set_index": 1,
+          "phases": [
+            {
+              "phase_type": "Entry",
+              "conditions": {
+                "condition_type": "GROUP",
+                "connection_logic": "AND",
+                "conditions": [
+                  {
+                    "condition_type": "COMPARE",
+                    "left": {
+                      "keyword": "LTP",
+                      "inputs": {
+                        "instrument": {
+                          "exchange": "NSE",
+                          "symbol_token": "NIFTY 50",
+                          "instrument_type": "EQUITY"
+                        }
+                      }
+                    },
+                    "operator": ">",
+                    "right": {
+                      "type": "number",
+                      "title": "0"
+                    }
+                  },
+                  {
+                    "description": "Captures the Low of the previous 15m candle at the moment of entry to use as Stop Loss.",
+                    "keyword": "Set Runtime",
+                    "params": {
+                      "variable_name": "EntryCandleLow",
+                      "value": {
+                        "function_name": "LOW",
+                        "timeframe": "15m",
+                        "position_offset": -1,
+                        "instrument": {
+                          "exchange": "NSE",
+                          "symbol_token": "NIFTY 50",
+                          "instrument_type": "EQUITY"
+                        }
+                      }
+                    }
+                  }
+                ]
+              },
+              "positions": [
+                {
+                  "description": "Leg 1: Buy ATM Nifty Call",
+                  "transaction_type": "BUY",
+                  "product_type": "NRML",
+                  "instrument": {
+                    "exchange": "NFO",
+                    "symbol_token": "NIFTY",
+                    "instrument_type": "CALL",
+                    "expiry_config": {
+                      "type": "Current Week",
+                      "offset": 0
+                    },
+                    "strike_config": {
+                      "selection_method": "ATM",
+                      "offset": 0
+                    }
+                  },
+                  "quantity_setup": {
+                    "type": "Lots",
+                    "value": 1
+                  }
+                },
+                {
+                  "description": "Leg 2: Sell OTM Nifty Call (200 points higher = approx 4 strikes)",
+                  "transaction_type": "SELL",
+                  "product_type": "NRML",
+                  "instrument": {
+                    "exchange": "NFO",
+                    "symbol_token": "NIFTY",
+                    "instrument_type": "CALL",
+                    "expiry_config": {
+                      "type": "Current Week",
+                      "offset": 0
+                    },
+                    "strike_config": {
+                      "selection_method": "ATM",
+                      "offset": 4
+                    }
+                  },
+                  "quantity_setup": {
+                    "type": "Lots",
+                    "value": 1
+                  }
+                }
+              ]
+            },
+            {
+              "phase_type": "Exit",
+              "conditions": {
+                "description": "Exit if current Nifty Price closes below the stored Entry Candle Low.",
                 "condition_type": "COMPARE",
                 "left": {
                   "keyword": "LTP",
@@ -177,106 +502,19 @@ input_json = {
                     }
                   }
                 },
-                "operator": ">",
+                "operator": "<",
                 "right": {
-                  "type": "number",
-                  "title": "0"
-                }
-              },
-              {
-                "description": "Captures the Low of the previous 15m candle at the moment of entry to use as Stop Loss.",
-                "keyword": "Set Runtime",
-                "params": {
-                  "variable_name": "EntryCandleLow",
-                  "value": {
-                    "function_name": "LOW",
-                    "timeframe": "15m",
-                    "position_offset": -1,
-                    "instrument": {
-                      "exchange": "NSE",
-                      "symbol_token": "NIFTY 50",
-                      "instrument_type": "EQUITY"
-                    }
+                  "keyword": "Get Runtime",
+                  "params": {
+                    "variable_name": "EntryCandleLow"
                   }
                 }
-              }
-            ]
-          },
-          "positions": [
-            {
-              "description": "Leg 1: Buy ATM Nifty Call",
-              "transaction_type": "BUY",
-              "product_type": "NRML",
-              "instrument": {
-                "exchange": "NFO",
-                "symbol_token": "NIFTY",
-                "instrument_type": "CALL",
-                "expiry_config": {
-                  "type": "Current Week",
-                  "offset": 0
-                },
-                "strike_config": {
-                  "selection_method": "ATM",
-                  "offset": 0
-                }
-              },
-              "quantity_setup": {
-                "type": "Lots",
-                "value": 1
-              }
-            },
-            {
-              "description": "Leg 2: Sell OTM Nifty Call (200 points higher = approx 4 strikes)",
-              "transaction_type": "SELL",
-              "product_type": "NRML",
-              "instrument": {
-                "exchange": "NFO",
-                "symbol_token": "NIFTY",
-                "instrument_type": "CALL",
-                "expiry_config": {
-                  "type": "Current Week",
-                  "offset": 0
-                },
-                "strike_config": {
-                  "selection_method": "ATM",
-                  "offset": 4
-                }
               },
-              "quantity_setup": {
-                "type": "Lots",
-                "value": 1
-              }
+              "positions": []
             }
           ]
-        },
-        {
-          "phase_type": "Exit",
-          "conditions": {
-            "description": "Exit if current Nifty Price closes below the stored Entry Candle Low.",
-            "condition_type": "COMPARE",
-            "left": {
-              "keyword": "LTP",
-              "inputs": {
-                "instrument": {
-                  "exchange": "NSE",
-                  "symbol_token": "NIFTY 50",
-                  "instrument_type": "EQUITY"
-                }
-              }
-            },
-            "operator": "<",
-            "right": {
-              "keyword": "Get Runtime",
-              "params": {
-                "variable_name": "EntryCandleLow"
-              }
-            }
-          },
-          "positions": []
         }
       ]
     }
-  ]
-}
 
-print(convert_json_to_text(input_json))
\ No newline at end of file
+    print(convert_json_to_text(input_json))
\ No newline at end of file
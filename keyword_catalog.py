@@ -0,0 +1,290 @@
+import json
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+
+from schema_compiler import SCHEMA_DIR, schema_version
+from schema_validator import escape_pointer
+
+# Tradetron's own keyword list: different spellings and a category for each name
+REFERENCE_SCHEMA = os.path.join(SCHEMA_DIR, "strategy_creation_schema.json")
+
+# (definition name, property) holding a keyword name in an operand
+KEYWORD_FIELDS = (
+    ("indicator_series_function", "function_name"),
+    ("candle_pattern_function", "pattern_name"),
+    ("real_time_utility_keyword", "keyword"),
+    ("special_function_keyword", "keyword"),
+)
+
+_KEY_DROP_RE = re.compile(r"[^a-z0-9+\-%]")
+LOOKUP_CACHE_SIZE = 10000
+
+
+def normalize(name):
+    """Case, spaces and punctuation other than + - % do not tell keywords apart."""
+    return _KEY_DROP_RE.sub("", name.lower())
+
+
+def max_distance(key):
+    """Edits tolerated for a normalized name: none for 3 characters or fewer."""
+    n = len(key)
+    return 0 if n <= 3 else 1 if n <= 7 else 2
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance (adjacent swaps cost 1), or limit + 1 once it exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    # A typo leaves most of the name alone: only the differing middle needs the table
+    shortest = min(len(a), len(b))
+    start = 0
+    while start < shortest and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < shortest - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start:len(a) - end]
+    b = b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b) if len(a) + len(b) <= limit else limit + 1
+
+    out = limit + 1
+    previous2 = None
+    previous = [j if j <= limit else out for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        ca = a[i - 1]
+        current = [out] * (len(b) + 1)
+        current[0] = i if i <= limit else out
+        # Cells further than `limit` from the diagonal cannot be within `limit`
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cb = b[j - 1]
+            value = previous[j - 1] + (ca != cb)
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+        if min(current) > limit:
+            return out
+        previous2, previous = previous, current
+    return min(previous[-1], out)
+
+
+class Keyword:
+    """A name the schema accepts in `field`; `category` is its group in the reference list, if any."""
+    __slots__ = ("name", "field", "definition", "category")
+
+    def __init__(self, name, field, definition, category):
+        self.name = name
+        self.field = field
+        self.definition = definition
+        self.category = category
+
+
+class KeywordMatch:
+    __slots__ = ("keyword", "method", "distance")
+
+    def __init__(self, keyword, method, distance):
+        self.keyword = keyword
+        self.method = method # exact, alias or fuzzy
+        self.distance = distance
+
+
+class _FieldIndex:
+    def __init__(self):
+        self.names = set()
+        self.exact = {} # normalized name -> Keyword
+        self.aliases = {} # normalized reference spelling -> Keyword
+        self.distinct = set() # reference names that are other keywords, never rewritten
+        self.keywords = [] # (normalized name, Keyword or None for a distinct name)
+        self.trigrams = {} # trigram -> indexes into keywords
+
+    def _index(self, key, keyword):
+        for gram in _trigrams(key):
+            self.trigrams.setdefault(gram, []).append(len(self.keywords))
+        self.keywords.append((key, keyword))
+
+    def add(self, keyword):
+        key = normalize(keyword.name)
+        self.names.add(keyword.name)
+        if key not in self.exact:
+            self.exact[key] = keyword
+            self._index(key, keyword)
+
+    def add_distinct(self, key):
+        # Indexed too, so a typo closer to it than to a schema keyword is not rewritten
+        if key not in self.distinct:
+            self.distinct.add(key)
+            self._index(key, None)
+
+    def fuzzy(self, key):
+        """The single closest keyword within max_distance(key), or None (also when tied)."""
+        limit = max_distance(key)
+        if not limit:
+            return None
+        grams = _trigrams(key)
+        shared = Counter(chain.from_iterable(self.trigrams.get(gram, ()) for gram in grams))
+        # One edit changes at most 4 of the query's trigrams (an adjacent swap), so fewer shared rules it out
+        needed = len(grams) - 4 * limit
+        best = None
+        best_distance = limit + 1
+        tied = False
+        # Most shared trigrams first: an early close match tightens the limit for the rest
+        for i, count in shared.most_common():
+            if count < needed:
+                break
+            candidate, keyword = self.keywords[i]
+            distance = edit_distance(key, candidate, min(limit, best_distance))
+            if distance < best_distance:
+                best, best_distance, tied = keyword, distance, False
+            elif distance == best_distance <= limit and keyword is not best:
+                tied = True
+        if best is None or tied:
+            return None
+        return KeywordMatch(best, "fuzzy", best_distance)
+
+
+class KeywordCatalog:
+    """
+    Keyword names per operand field of `schema`, looked up exactly, by a
+    spelling from `reference` (strategy_creation_schema.json layout), or by
+    edit distance over a trigram index. canonicalize() rewrites near-miss
+    names in a parsed strategy so one typo does not cost an LLM re-ask.
+    """
+
+    def __init__(self, schema, reference=None):
+        definitions = schema.get("definitions", {})
+        self.fields = {}
+        for def_name, prop in KEYWORD_FIELDS:
+            enum = definitions.get(def_name, {}).get("properties", {}).get(prop, {}).get("enum") or ()
+            index = self.fields.setdefault(prop, _FieldIndex())
+            for name in enum:
+                index.add(Keyword(name, prop, def_name, None))
+        if reference:
+            self._add_reference(reference)
+        self._lock = threading.Lock()
+        self._cache = {}
+        self.stats = Counter()
+
+    def _add_reference(self, reference):
+        for category, names in reference.get("strategy", {}).get("conditions", {}).items():
+            for name in names:
+                key = normalize(name)
+                for index in self.fields.values():
+                    keyword = index.exact.get(key)
+                    if keyword is None:
+                        match = index.fuzzy(key)
+                        if match is None or match.distance > 1:
+                            # e.g. "Avg Price" is a keyword of its own, not a misspelt "Ask Price"
+                            index.add_distinct(key)
+                            continue
+                        keyword = index.aliases.setdefault(key, match.keyword)
+                    if keyword.category is None:
+                        keyword.category = category
+
+    def lookup(self, name, field):
+        """KeywordMatch for `name` in `field` (function_name, pattern_name or keyword), or None."""
+        cache_key = (field, name)
+        match = self._cache.get(cache_key, False)
+        if match is not False:
+            return match
+        index = self.fields.get(field)
+        match = None
+        if index is not None:
+            key = normalize(name)
+            keyword = index.exact.get(key)
+            if keyword is not None:
+                match = KeywordMatch(keyword, "exact", 0)
+            elif key in index.aliases:
+                match = KeywordMatch(index.aliases[key], "alias", 0)
+            elif key not in index.distinct:
+                match = index.fuzzy(key)
+        with self._lock:
+            if len(self._cache) >= LOOKUP_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[cache_key] = match
+        return match
+
+    def canonicalize(self, document):
+        """
+        Rewrites keyword names in place. Returns [(pointer, old, new,
+        category)] for every name changed; names with no unambiguous match
+        are left for the validator to report.
+        """
+        changes = []
+        self._walk(document, "", changes)
+        if changes:
+            with self._lock:
+                self.stats["documents"] += 1
+                self.stats["rewrites"] += len(changes)
+        return changes
+
+    def _walk(self, node, pointer, changes):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                child = f"{pointer}/{escape_pointer(key)}"
+                if isinstance(value, str):
+                    index = self.fields.get(key)
+                    if index is not None and value not in index.names:
+                        match = self.lookup(value, key)
+                        if match is not None:
+                            node[key] = match.keyword.name
+                            changes.append((child, value, match.keyword.name, match.keyword.category))
+                elif isinstance(value, (dict, list)):
+                    self._walk(value, child, changes)
+        elif isinstance(node, list):
+            for i, item in enumerate(node):
+                if isinstance(item, (dict, list)):
+                    self._walk(item, f"{pointer}/{i}", changes)
+
+
+@lru_cache(maxsize=1)
+def load_reference(path=REFERENCE_SCHEMA):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None # fuzzy matching still works without the reference spellings
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(schema, version=None):
+    """KeywordCatalog for a schema version, built once."""
+    version = version or schema_version(schema)
+    catalog = _catalogs.get(version)
+    if catalog is None:
+        with _catalogs_lock:
+            catalog = _catalogs.get(version)
+            if catalog is None:
+                catalog = _catalogs[version] = KeywordCatalog(schema, load_reference())
+    return catalog
+
+
+if __name__ == "__main__":
+    with open(os.path.join(SCHEMA_DIR, "test_schemav3.json"), "r", encoding="utf-8") as f:
+        catalog = get_catalog(json.load(f))
+    for arg in sys.argv[1:] or ["Max OI Strike", "Bollinger Band Width", "StochK", "Donchian Ch Upper", "Supertrnd"]:
+        field, _, name = arg.rpartition("=")
+        for field in [field] if field else list(catalog.fields):
+            match = catalog.lookup(name, field)
+            if match is not None:
+                print(f"{name!r} -> {match.keyword.name!r} ({field}, {match.method}, distance {match.distance}, "
+                      f"category {match.keyword.category})")
+                break
+        else:
+            print(f"{name!r}: no match")
@@ -0,0 +1,1013 @@
+import math
+import operator
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+from backtest import (
+    PRICE_COLUMNS, SESSION_OPEN, TIMEFRAMES, WEEK_ANCHOR, BacktestError, _is_literal, _param, _period, literal,
+    operand_offset, operand_params, operand_symbol,
+)
+from condition_optimizer import OperandTable, operand_key, optimize_conditions
+from json_to_yaml import DIALECTS, detect_schema_version
+
+NAN = math.nan
+# Intraday and daily candles also close with the session, so the last one of the day is not held overnight;
+# a weekly candle closes with the first update of the next week
+SESSION_CLOSE = 15 * 3600 + 30 * 60
+RUNTIME_GETTERS = ("Get Runtime", "Get Runtime Number")
+CROSSES = ("Crosses Above", "Crosses Below")
+CLOCK_KEYWORDS = ("Now", "Hour", "Minute", "Week Day")
+# Settling passes per update: a Set Runtime seen by another phase costs one more
+MAX_ROUNDS = 4
+
+
+class LiveError(BacktestError):
+    """Raised for strategies the live evaluator cannot run."""
+
+
+def _div(a, b):
+    if b == 0:
+        return NAN if a == 0 or a != a else math.copysign(math.inf, a)
+    return a / b
+
+
+# --- Incremental indicators ---
+# Each keeps a fixed amount of state (at most one ring of `period` values) and
+# takes one candle (open, high, low, close, volume) per update, returning the
+# same value as its vectorized counterpart in backtest.py for that candle.
+
+class ExpSmooth:
+    """backtest.exp_smooth one value at a time: seeded with the mean of the first `seed` values, NaNs before skipped."""
+    __slots__ = ("alpha", "decay", "seed", "count", "total", "value")
+
+    def __init__(self, alpha, seed):
+        self.alpha = alpha
+        self.decay = 1.0 - alpha
+        self.seed = seed
+        self.count = 0
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, x):
+        if self.count < self.seed:
+            if x != x and self.count == 0:
+                return NAN
+            self.count += 1
+            self.total += x
+            if self.count == self.seed:
+                self.value = self.total / self.seed
+            return self.value
+        if self.decay <= 0:
+            self.value = x
+        else:
+            self.value = self.decay * self.value + self.alpha * x
+        return self.value
+
+
+def ema_smoother(n):
+    return ExpSmooth(2.0 / (n + 1), n)
+
+
+def wilder_smoother(n):
+    return ExpSmooth(1.0 / n, n)
+
+
+class RollingSum:
+    """Sum of the last n values from a ring buffer; re-summed exactly each time the ring wraps, so it cannot drift."""
+    __slots__ = ("n", "ring", "pos", "count", "total")
+
+    def __init__(self, n):
+        self.n = n
+        self.ring = [0.0] * n
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+
+    def update(self, x):
+        ring = self.ring
+        if self.count < self.n:
+            if x != x and self.count == 0:
+                return NAN
+            ring[self.count] = x
+            self.count += 1
+            self.total += x
+            return self.total if self.count == self.n else NAN
+        pos = self.pos
+        self.total += x - ring[pos]
+        ring[pos] = x
+        pos += 1
+        if pos == self.n:
+            pos = 0
+            self.total = math.fsum(ring)
+        self.pos = pos
+        return self.total
+
+
+class RollingExtreme:
+    """Highest (or lowest) of the last n values: a monotonic deque of at most n (index, value) pairs."""
+    __slots__ = ("n", "highest", "window", "index")
+
+    def __init__(self, n, highest=True):
+        self.n = n
+        self.highest = highest
+        self.window = deque()
+        self.index = 0
+
+    def update(self, x):
+        window, index = self.window, self.index
+        if self.highest:
+            while window and window[-1][1] <= x:
+                window.pop()
+        else:
+            while window and window[-1][1] >= x:
+                window.pop()
+        window.append((index, x))
+        if window[0][0] <= index - self.n:
+            window.popleft()
+        self.index = index + 1
+        return window[0][1] if self.index >= self.n else NAN
+
+
+def _source(params):
+    """The candle field an indicator reads (backtest._source): close unless params name another."""
+    source = str(params.get("source", params.get("series", "close"))).lower()
+    if source == "hl2":
+        return lambda candle: (candle[1] + candle[2]) / 2
+    if source == "hlc3":
+        return lambda candle: (candle[1] + candle[2] + candle[3]) / 3
+    if source in PRICE_COLUMNS:
+        return operator.itemgetter(PRICE_COLUMNS.index(source))
+    raise LiveError(f"unknown source series {source!r}")
+
+
+def _true_range(h, l, previous):
+    return max(h - l, abs(h - previous), abs(l - previous))
+
+
+class _Indicator:
+    __slots__ = ("source",)
+
+    def __init__(self, params, name):
+        self.source = _source(params)
+
+
+class Series(_Indicator):
+    __slots__ = ()
+
+    def __init__(self, params, name):
+        if name in ("OPEN", "HIGH", "LOW", "CLOSE"):
+            params = {"source": name}
+        super().__init__(params, name)
+
+    def update(self, candle):
+        return self.source(candle)
+
+
+class Volume(_Indicator):
+    __slots__ = ()
+
+    def update(self, candle):
+        return candle[4]
+
+
+class TypicalPrice(_Indicator):
+    __slots__ = ()
+
+    def update(self, candle):
+        return (candle[1] + candle[2] + candle[3]) / 3
+
+
+class SMA(_Indicator):
+    __slots__ = ("n", "sum")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.n = _period(params)
+        self.sum = RollingSum(self.n)
+
+    def update(self, candle):
+        return self.sum.update(self.source(candle)) / self.n
+
+
+class Sum(SMA):
+    __slots__ = ()
+
+    def update(self, candle):
+        return self.sum.update(self.source(candle))
+
+
+class EMA(_Indicator):
+    __slots__ = ("smoothers",)
+    DEPTH = 1
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        n = _period(params)
+        self.smoothers = [ema_smoother(n) for _ in range(self.DEPTH)]
+
+    def update(self, candle):
+        return self.smoothers[0].update(self.source(candle))
+
+
+class DEMA(EMA):
+    __slots__ = ()
+    DEPTH = 2
+
+    def update(self, candle):
+        once = self.smoothers[0].update(self.source(candle))
+        return 2 * once - self.smoothers[1].update(once)
+
+
+class TEMA(EMA):
+    __slots__ = ()
+    DEPTH = 3
+
+    def update(self, candle):
+        once = self.smoothers[0].update(self.source(candle))
+        twice = self.smoothers[1].update(once)
+        return 3 * once - 3 * twice + self.smoothers[2].update(twice)
+
+
+class WMA(_Indicator):
+    """Weights 1..n, oldest first; each candle updates the weighted sum from the plain one in O(1)."""
+    __slots__ = ("n", "ring", "pos", "count", "total", "weighted")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.n = _period(params)
+        self.ring = [0.0] * self.n
+        self.pos = self.count = 0
+        self.total = self.weighted = 0.0
+
+    def _resync(self):
+        # ring[0] is the oldest value whenever pos is 0
+        self.total = math.fsum(self.ring)
+        self.weighted = math.fsum((k + 1) * x for k, x in enumerate(self.ring))
+
+    def update(self, candle):
+        x, n = self.source(candle), self.n
+        if self.count < n:
+            self.ring[self.count] = x
+            self.count += 1
+            if self.count < n:
+                return NAN
+            self._resync()
+        else:
+            self.weighted += n * x - self.total
+            self.total += x - self.ring[self.pos]
+            self.ring[self.pos] = x
+            self.pos = (self.pos + 1) % n
+            if self.pos == 0:
+                self._resync()
+        return self.weighted / (n * (n + 1) / 2)
+
+
+class VWMA(_Indicator):
+    __slots__ = ("weighted", "volume")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        n = _period(params)
+        self.weighted, self.volume = RollingSum(n), RollingSum(n)
+
+    def update(self, candle):
+        return _div(self.weighted.update(self.source(candle) * candle[4]), self.volume.update(candle[4]))
+
+
+class Stdev(_Indicator):
+    """Rolling standard deviation from sums of values shifted by the first one (as backtest.rolling_std)."""
+    __slots__ = ("n", "shift", "sum", "squares")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.n = _period(params, self.default_period(name))
+        self.shift = None
+        self.sum, self.squares = RollingSum(self.n), RollingSum(self.n)
+
+    @staticmethod
+    def default_period(name):
+        return 14
+
+    def deviation(self, x):
+        if self.shift is None:
+            self.shift = x
+        x -= self.shift
+        mean = self.sum.update(x) / self.n
+        variance = self.squares.update(x * x) / self.n - mean * mean
+        return math.sqrt(max(variance, 0.0)) if variance == variance else NAN
+
+    def update(self, candle):
+        return self.deviation(self.source(candle))
+
+
+class LowerBollinger(Stdev):
+    __slots__ = ("mean", "width")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.mean = RollingSum(self.n)
+        self.width = _param(params, 2.0, "std_dev", "stddev", "deviation", "multiplier")
+
+    @staticmethod
+    def default_period(name):
+        return 20
+
+    def update(self, candle):
+        x = self.source(candle)
+        return self.mean.update(x) / self.n - self.width * self.deviation(x)
+
+
+class ROC(_Indicator):
+    __slots__ = ("n", "ring", "count")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.n = _period(params, 10)
+        self.ring = deque(maxlen=self.n + 1)
+
+    def update(self, candle):
+        self.ring.append(self.source(candle))
+        if len(self.ring) <= self.n:
+            return NAN
+        return 100 * (_div(self.ring[-1], self.ring[0]) - 1)
+
+
+class Donchian(_Indicator):
+    __slots__ = ("name", "upper", "lower")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        n = _period(params, 20)
+        self.name = name
+        self.upper, self.lower = RollingExtreme(n, highest=True), RollingExtreme(n, highest=False)
+
+    def update(self, candle):
+        upper, lower = self.upper.update(candle[1]), self.lower.update(candle[2])
+        if self.name == "Donchain Ch Upper":
+            return upper
+        if self.name == "Donchain Ch Lower":
+            return lower
+        return (upper + lower) / 2
+
+
+class RSI(_Indicator):
+    __slots__ = ("previous", "gain", "loss")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        n = _period(params)
+        self.previous = None
+        self.gain, self.loss = wilder_smoother(n), wilder_smoother(n)
+
+    def update(self, candle):
+        x = self.source(candle)
+        previous, self.previous = self.previous, x
+        if previous is None:
+            return NAN
+        delta = x - previous
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-delta if delta < 0 else 0.0)
+        if loss == 0:
+            return 100.0
+        return 100 - 100 / (1 + gain / loss) if loss == loss else NAN
+
+
+class TR(_Indicator):
+    __slots__ = ("previous",)
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.previous = None
+
+    def true_range(self, candle):
+        previous = candle[3] if self.previous is None else self.previous
+        self.previous = candle[3]
+        return _true_range(candle[1], candle[2], previous)
+
+    def update(self, candle):
+        return self.true_range(candle)
+
+
+class ATR(TR):
+    __slots__ = ("smoother",)
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.smoother = wilder_smoother(_period(params))
+
+    def update(self, candle):
+        return self.smoother.update(self.true_range(candle))
+
+
+class ADX(_Indicator):
+    __slots__ = ("name", "previous", "tr", "plus", "minus", "adx")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        n = _period(params)
+        self.name = name
+        self.previous = None
+        self.tr, self.plus, self.minus, self.adx = (wilder_smoother(n) for _ in range(4))
+
+    def update(self, candle):
+        _, h, l, c, _ = candle
+        previous, self.previous = self.previous, candle
+        if previous is None:
+            return NAN
+        up, down = h - previous[1], previous[2] - l
+        tr = self.tr.update(_true_range(h, l, previous[3]))
+        di_plus = 100 * _div(self.plus.update(up if up > down and up > 0 else 0.0), tr)
+        di_minus = 100 * _div(self.minus.update(down if down > up and down > 0 else 0.0), tr)
+        if self.name == "DI+":
+            return di_plus
+        if self.name == "DI-":
+            return di_minus
+        return self.adx.update(100 * _div(abs(di_plus - di_minus), di_plus + di_minus))
+
+
+class CCI(_Indicator):
+    """The mean deviation needs the whole window: O(period) per candle, the one indicator that is not O(1)."""
+    __slots__ = ("n", "ring", "sum")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.n = _period(params, 20)
+        self.ring = deque(maxlen=self.n)
+        self.sum = RollingSum(self.n)
+
+    def update(self, candle):
+        tp = (candle[1] + candle[2] + candle[3]) / 3
+        self.ring.append(tp)
+        mean = self.sum.update(tp) / self.n
+        if len(self.ring) < self.n:
+            return NAN
+        deviation = sum(abs(x - mean) for x in self.ring) / self.n
+        return _div(tp - mean, 0.015 * deviation)
+
+
+class MACD(_Indicator):
+    __slots__ = ("name", "fast", "slow", "signal")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.name = name
+        self.fast = ema_smoother(_param(params, 12, "fast", "fast_period"))
+        self.slow = ema_smoother(_param(params, 26, "slow", "slow_period"))
+        self.signal = ema_smoother(_param(params, 9, "signal", "signal_period"))
+
+    def update(self, candle):
+        x = self.source(candle)
+        line = self.fast.update(x) - self.slow.update(x)
+        if self.name == "MACD":
+            return line
+        signal = self.signal.update(line)
+        return signal if self.name == "Macdsignal" else line - signal
+
+
+class SUPERTREND(TR):
+    __slots__ = ("atr", "multiplier", "upper", "lower", "up", "close")
+
+    def __init__(self, params, name):
+        super().__init__(params, name)
+        self.atr = wilder_smoother(_period(params, 10))
+        self.multiplier = _param(params, 3.0, "multiplier", "factor")
+        self.up = self.close = None
+
+    def update(self, candle):
+        _, h, l, c, _ = candle
+        atr = self.atr.update(self.true_range(candle))
+        if atr != atr:
+            return NAN
+        mid = (h + l) / 2
+        upper, lower = mid + self.multiplier * atr, mid - self.multiplier * atr
+        previous, self.close = self.close, c
+        if self.up is None:
+            self.upper, self.lower, self.up = upper, lower, c >= mid
+        else:
+            if upper < self.upper or previous > self.upper:
+                self.upper = upper
+            if lower > self.lower or previous < self.lower:
+                self.lower = lower
+            if self.up:
+                if c < self.lower:
+                    self.up = False
+            elif c > self.upper:
+                self.up = True
+        return self.lower if self.up else self.upper
+
+
+INDICATORS = {
+    **dict.fromkeys(("OPEN", "HIGH", "LOW", "CLOSE"), Series),
+    "Volume series": Volume, "Typical Price": TypicalPrice,
+    "SMA": SMA, "Mean": SMA, "Sum": Sum, "EMA": EMA, "DEMA": DEMA, "TEMA": TEMA, "WMA": WMA, "VWMA": VWMA,
+    "Stdev": Stdev, "Lower Bolinger": LowerBollinger, "ROC": ROC,
+    **dict.fromkeys(("Donchain Ch Upper", "Donchain Ch Lower", "Donchain Ch Middle"), Donchian),
+    "RSI": RSI, "TR": TR, "ATR": ATR, **dict.fromkeys(("ADX", "DI+", "DI-"), ADX), "CCI": CCI,
+    **dict.fromkeys(("MACD", "Macdsignal", "Macdhist"), MACD), "SUPERTREND": SUPERTREND,
+}
+
+
+# --- Dependency graph ---
+
+class Value:
+    """
+    An operand's current value. `dependents` are the leaves to re-evaluate
+    whenever it changes; a comparison with a constant is instead kept in
+    `thresholds`, sorted by that constant, and re-evaluated only when the
+    value moves across (or onto) it.
+    """
+    __slots__ = ("value", "dependents", "thresholds", "bounded")
+
+    def __init__(self, value=NAN):
+        self.value = value
+        self.dependents = []
+        self.thresholds = []
+        self.bounded = []
+
+    def watch(self, leaf, threshold=None):
+        if threshold is None or threshold != threshold:
+            self.dependents.append(leaf)
+            return
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.bounded.insert(i, leaf)
+
+
+class _Feed:
+    """One indicator on one symbol's candles; `outputs` are the operands reading it, by history position (-1 latest)."""
+    __slots__ = ("indicator", "history", "outputs")
+
+    def __init__(self, indicator):
+        self.indicator = indicator
+        self.history = deque(maxlen=1)
+        self.outputs = []
+
+    def output(self, offset):
+        for position, value in self.outputs:
+            if position == offset - 1:
+                return value
+        value = Value()
+        self.outputs.append((offset - 1, value))
+        if 1 - offset > self.history.maxlen:
+            self.history = deque(self.history, maxlen=1 - offset)
+        return value
+
+
+class _Candles:
+    """Builds one symbol's candles of `seconds` from its updates; with seconds None every update is a candle."""
+    __slots__ = ("seconds", "anchor", "bucket", "end", "candle", "feeds")
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.anchor = None if seconds is None else (
+            WEEK_ANCHOR if seconds >= TIMEFRAMES["1w"] else 0 if seconds >= 86400 else SESSION_OPEN
+        )
+        self.bucket = None
+        self.end = None
+        self.candle = None
+        self.feeds = {}
+
+    def _bucket_end(self, timestamp, bucket):
+        end = bucket * self.seconds + self.anchor + self.seconds
+        if self.seconds <= 86400:
+            end = min(end, timestamp - timestamp % 86400 + SESSION_CLOSE)
+        return end
+
+    def update(self, timestamp, end, candle, closed):
+        """Appends to `closed` the candle completed by this update, if any (two when a gap closes one early)."""
+        if self.seconds is None:
+            closed.append((self, candle))
+            return
+        bucket = (timestamp - self.anchor) // self.seconds
+        current = self.candle
+        if current is not None and bucket != self.bucket:
+            # The previous candle never reached its end (a gap in the data): it is complete now
+            closed.append((self, tuple(current)))
+            current = None
+        if current is None:
+            self.candle = current = list(candle)
+            self.bucket = bucket
+            self.end = self._bucket_end(timestamp, bucket)
+        else:
+            current[1] = max(current[1], candle[1])
+            current[2] = min(current[2], candle[2])
+            current[3] = candle[3]
+            current[4] += candle[4]
+        if end >= self.end:
+            closed.append((self, tuple(current)))
+            self.candle = None
+
+
+class _Symbol:
+    __slots__ = ("candles", "ltp", "volume")
+
+    def __init__(self):
+        self.candles = {}
+        self.ltp = None
+        self.volume = None
+
+
+class _Compare:
+    __slots__ = ("left", "right", "compare", "value", "dirty", "phases")
+
+    def __init__(self, left, operator_name, right):
+        self.left = left
+        self.right = right
+        self.compare = COMPARATORS[operator_name]
+        self.value = False
+        self.dirty = False
+        self.phases = []
+
+    def evaluate(self):
+        """New value; whether it changed."""
+        value = self.compare(self.left.value, self.right.value)
+        if value is self.value:
+            return False
+        self.value = value
+        return True
+
+
+class _Crosses(_Compare):
+    """Crosses Above/Below against the operands' values at its previous evaluation (the last time either changed)."""
+    __slots__ = ("previous",)
+
+    def __init__(self, left, operator_name, right):
+        super().__init__(left, operator_name, right)
+        self.previous = (NAN, NAN)
+
+    def evaluate(self):
+        a, b = self.left.value, self.right.value
+        value = self.compare(a, b, *self.previous)
+        self.previous = (a, b)
+        if value is self.value:
+            return False
+        self.value = value
+        return True
+
+
+class _SetRuntime:
+    """A standalone Set Runtime: true, and sets its variable whenever its phase evaluation reaches it."""
+    __slots__ = ("source", "variable", "value", "dirty", "phases")
+
+    def __init__(self, source, variable):
+        self.source = source
+        self.variable = variable
+        self.value = True
+        self.dirty = False
+        self.phases = []
+
+    def evaluate(self):
+        return True # its source changed: the phase runs it again
+
+
+class _Phase:
+    __slots__ = ("strategy", "set_index", "phase_type", "root", "value", "dirty")
+
+    def __init__(self, strategy, set_index, phase_type, root):
+        self.strategy = strategy
+        self.set_index = set_index
+        self.phase_type = phase_type
+        self.root = root
+        self.value = False
+        self.dirty = False
+
+
+def _crosses_above(a, b, previous_a, previous_b):
+    return a > b and previous_a <= previous_b
+
+
+def _crosses_below(a, b, previous_a, previous_b):
+    return a < b and previous_a >= previous_b
+
+
+COMPARATORS = {
+    ">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+    "Crosses Above": _crosses_above, "Crosses Below": _crosses_below,
+}
+
+
+class LiveEvaluator:
+    """
+    Evaluates the Entry/Exit conditions of many v3 strategies against a
+    stream of bars or ticks. Each update builds the candles of every
+    timeframe in use for its symbol; a completed candle advances each
+    indicator on it once, in O(1) and fixed memory, for all strategies
+    and offsets that read it. Identical operands and comparisons are
+    shared between strategies. Only comparisons whose operands changed
+    are evaluated again (against a constant: only when the value moved
+    across it), and only phases with a changed comparison are
+    re-evaluated. Values follow backtest.Backtester: a bar is evaluated at
+    its close, a higher timeframe reads its last completed candle, and a
+    Crosses is true for the one update at which the crossing happens; only
+    weekly candles complete later here, with the next week's first update.
+    Set Runtime / Get Runtime variables belong to each strategy.
+    """
+
+    def __init__(self):
+        self._symbols = {}
+        self._compares = {}
+        self._clock = {}
+        self._clock_end = None
+        self._strategies = {}
+        self._dirty_leaves = []
+        self._dirty_phases = []
+        self._fired = []
+        self.updates = 0
+        self.candles = 0
+        self.indicator_updates = 0
+        self.evaluations = 0
+
+    # -- Registration --
+
+    def _symbol(self, symbol):
+        state = self._symbols.get(symbol)
+        if state is None:
+            state = self._symbols[symbol] = _Symbol()
+        return state
+
+    def _operand(self, op, default_symbol, variables):
+        if _is_literal(op):
+            return Value(literal(op))
+        if op.get("function_name"):
+            name = op["function_name"]
+            cls = INDICATORS.get(name)
+            if cls is None:
+                raise LiveError(f"indicator {name!r} is not supported by the live evaluator")
+            symbol = operand_symbol(op, default_symbol)
+            timeframe = op.get("timeframe")
+            seconds = TIMEFRAMES.get(timeframe)
+            if seconds is None and timeframe not in (None, "All"):
+                raise LiveError(f"unknown timeframe {timeframe!r}")
+            params = operand_params(op)
+            candles = self._symbol(symbol).candles.get(seconds)
+            if candles is None:
+                candles = self._symbol(symbol).candles[seconds] = _Candles(seconds)
+            key = (name, operand_key(params))
+            feed = candles.feeds.get(key)
+            if feed is None:
+                feed = candles.feeds[key] = _Feed(cls(params, name))
+            return feed.output(operand_offset(op))
+        keyword = op.get("keyword")
+        if keyword in ("LTP", "Volume"):
+            state = self._symbol(operand_symbol(op, default_symbol))
+            field = "ltp" if keyword == "LTP" else "volume"
+            if getattr(state, field) is None:
+                setattr(state, field, Value())
+            return getattr(state, field)
+        if keyword in CLOCK_KEYWORDS:
+            value = self._clock.get(keyword)
+            if value is None:
+                value = self._clock[keyword] = Value()
+            return value
+        if keyword in RUNTIME_GETTERS:
+            return self._variable(op, variables)
+        raise LiveError(f"operand {keyword or op.get('pattern_name') or operand_key(op)!r} is not supported live")
+
+    @staticmethod
+    def _variable(op, variables):
+        params = op.get("params") or {}
+        name = params.get("variable_name")
+        if not isinstance(name, str) or not name:
+            raise LiveError(f"{op.get('keyword')} needs params.variable_name")
+        value = variables.get(name)
+        if value is None:
+            value = variables[name] = Value()
+        return value
+
+    def _leaf(self, node, default_symbol, variables):
+        if node.get("condition_type") == "COMPARE":
+            operator_name = node.get("operator")
+            if operator_name not in COMPARATORS:
+                raise LiveError(f"unknown operator {operator_name!r}")
+            key = operand_key(node)
+            # Comparisons reading runtime variables are the strategy's own; the rest are shared
+            shared = not any(
+                isinstance(side, dict) and side.get("keyword") in RUNTIME_GETTERS
+                for side in (node.get("left"), node.get("right"))
+            )
+            leaf = self._compares.get(key) if shared else None
+            if leaf is None:
+                left = self._operand(node.get("left"), default_symbol, variables)
+                right = self._operand(node.get("right"), default_symbol, variables)
+                leaf = (_Crosses if operator_name in CROSSES else _Compare)(left, operator_name, right)
+                left_constant, right_constant = (_is_literal(node.get(side)) for side in ("left", "right"))
+                if right_constant and not left_constant:
+                    left.watch(leaf, right.value)
+                elif left_constant and not right_constant:
+                    right.watch(leaf, left.value)
+                elif not left_constant:
+                    left.watch(leaf)
+                    right.watch(leaf)
+                if shared:
+                    self._compares[key] = leaf
+                self._mark(leaf)
+            return leaf
+        if node.get("keyword") == "Set Runtime":
+            params = node.get("params") or {}
+            source = params.get("value")
+            if source is None:
+                raise LiveError("Set Runtime needs params.value")
+            leaf = _SetRuntime(self._operand(source, default_symbol, variables), self._variable(node, variables))
+            leaf.source.watch(leaf)
+            return leaf
+        name = node.get("keyword") or node.get("pattern_name") or node.get("condition_type")
+        raise LiveError(f"{name!r} cannot be evaluated live")
+
+    def _compile(self, node, phase, default_symbol, variables):
+        """The optimized tree as nested (logic, members) tuples over leaves."""
+        results = []
+        stack = [(node, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, dict):
+                raise LiveError(f"not a condition: {node!r}")
+            if node.get("condition_type") != "GROUP":
+                leaf = self._leaf(node, default_symbol, variables)
+                leaf.phases.append(phase)
+                results.append(leaf)
+            elif not expanded:
+                if node.get("connection_logic", "AND") not in ("AND", "OR"):
+                    raise LiveError(f"unknown connection_logic {node.get('connection_logic')!r}")
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.get("conditions", [])))
+            else:
+                count = len(node.get("conditions", []))
+                members = tuple(results[len(results) - count:]) if count else ()
+                del results[len(results) - count:]
+                results.append((node.get("connection_logic", "AND"), members))
+        return results[0]
+
+    def add_strategy(self, json_data, strategy_id=None):
+        """
+        Registers a v3 strategy and returns its id (`strategy_id`, or the
+        next integer). Operands without an instrument read the first
+        instrument named in the strategy's conditions.
+        """
+        if detect_schema_version(json_data) != "v3":
+            raise LiveError("only v3 strategies can be evaluated live")
+        strategy_id = len(self._strategies) if strategy_id is None else strategy_id
+        if strategy_id in self._strategies:
+            raise LiveError(f"strategy {strategy_id!r} is already registered")
+        dialect = DIALECTS["v3"]
+        phases = [
+            (strategy_set.get("set_index", dialect.default_set_index), phase)
+            for strategy_set in json_data.get("strategy_sets", [])
+            for phase in strategy_set.get("phases", [])
+        ]
+        table = OperandTable()
+        for _, phase in phases:
+            table.add_conditions(phase.get(dialect.conditions_key))
+        symbols = (operand_symbol(op) for op in table.operands)
+        default_symbol = next((symbol for symbol in symbols if symbol is not None), None)
+
+        variables = {}
+        compiled = []
+        for set_index, phase in phases:
+            conditions = phase.get(dialect.conditions_key)
+            entry = _Phase(strategy_id, set_index, phase.get("phase_type", dialect.default_phase_type), None)
+            if conditions:
+                entry.root = self._compile(optimize_conditions(conditions), entry, default_symbol, variables)
+                self._mark_phase(entry)
+            compiled.append(entry)
+        self._strategies[strategy_id] = compiled
+        self._settle([])
+        return strategy_id
+
+    def phase_values(self, strategy_id):
+        """(set_index, phase_type, value) of each phase; a phase without conditions is None."""
+        return [
+            (phase.set_index, phase.phase_type, phase.value if phase.root is not None else None)
+            for phase in self._strategies[strategy_id]
+        ]
+
+    # -- Updates --
+
+    def update_bar(self, symbol, timestamp, open, high, low, close, volume=0.0, interval=60):
+        """A bar stamped with its open (epoch seconds, exchange time), evaluated at its close."""
+        return self._update(symbol, timestamp, timestamp + interval, (open, high, low, close, volume))
+
+    def update(self, symbol, timestamp, price, volume=0.0):
+        """A tick."""
+        return self._update(symbol, timestamp, timestamp, (price, price, price, price, volume))
+
+    def _update(self, symbol, timestamp, end, candle):
+        """Phases that turned true with this update, as (strategy_id, set_index, phase_type)."""
+        state = self._symbols.get(symbol)
+        if state is None:
+            return []
+        self.updates += 1
+        # A crossing lasts one update
+        fired, self._fired = self._fired, []
+        for leaf in fired:
+            leaf.value = False
+            for phase in leaf.phases:
+                self._mark_phase(phase)
+
+        closed = []
+        for candles in state.candles.values():
+            candles.update(timestamp, end, candle, closed)
+        for candles, bar in closed:
+            self.candles += 1
+            self.indicator_updates += len(candles.feeds)
+            for feed in candles.feeds.values():
+                history = feed.history
+                history.append(feed.indicator.update(bar))
+                depth = len(history)
+                for position, value in feed.outputs:
+                    new = history[position] if depth >= -position else NAN
+                    old = value.value
+                    if new != old and (new == new or old == old):
+                        self._set(value, new)
+        if state.ltp is not None:
+            self._set(state.ltp, candle[3])
+        if state.volume is not None:
+            self._set(state.volume, candle[4])
+        if self._clock and end != self._clock_end:
+            self._clock_end = end
+            minute = end // 60
+            clock = self._clock
+            for keyword, value in clock.items():
+                if keyword == "Now":
+                    self._set(value, float(minute % 1440))
+                elif keyword == "Hour":
+                    self._set(value, float(minute // 60 % 24))
+                elif keyword == "Minute":
+                    self._set(value, float(minute % 60))
+                else:
+                    self._set(value, float((end // 86400 + 3) % 7))
+        signals = []
+        self._settle(signals)
+        return signals
+
+    def _set(self, value, new):
+        old = value.value
+        if new == old or (new != new and old != old):
+            return
+        value.value = new
+        dirty = self._dirty_leaves
+        for leaf in value.dependents:
+            if not leaf.dirty:
+                leaf.dirty = True
+                dirty.append(leaf)
+        if value.thresholds:
+            if new != new or old != old:
+                crossed = value.bounded
+            else:
+                # Every comparison (and crossing) with a constant outside [low, high] keeps its outcome
+                low, high = (old, new) if old < new else (new, old)
+                crossed = value.bounded[bisect_left(value.thresholds, low):bisect_right(value.thresholds, high)]
+            for leaf in crossed:
+                if not leaf.dirty:
+                    leaf.dirty = True
+                    dirty.append(leaf)
+
+    def _mark(self, leaf):
+        if not leaf.dirty:
+            leaf.dirty = True
+            self._dirty_leaves.append(leaf)
+
+    def _mark_phase(self, phase):
+        if not phase.dirty:
+            phase.dirty = True
+            self._dirty_phases.append(phase)
+
+    def _settle(self, signals):
+        for _ in range(MAX_ROUNDS):
+            if not (self._dirty_leaves or self._dirty_phases):
+                break
+            leaves, self._dirty_leaves = self._dirty_leaves, []
+            self.evaluations += len(leaves)
+            dirty_phases = self._dirty_phases
+            for leaf in leaves:
+                leaf.dirty = False
+                if leaf.evaluate():
+                    if leaf.value is True and type(leaf) is _Crosses:
+                        self._fired.append(leaf)
+                    for phase in leaf.phases:
+                        if not phase.dirty:
+                            phase.dirty = True
+                            dirty_phases.append(phase)
+            phases, self._dirty_phases = dirty_phases, []
+            for phase in phases:
+                phase.dirty = False
+                value = self._evaluate(phase.root)
+                if value and not phase.value:
+                    signals.append((phase.strategy, phase.set_index, phase.phase_type))
+                phase.value = value
+
+    def _evaluate(self, node):
+        """A phase's tree over its leaves' current values, AND/OR short-circuiting; Set Runtime runs when reached."""
+        if type(node) is tuple:
+            logic, members = node
+            if logic == "AND":
+                for member in members:
+                    if not self._evaluate(member):
+                        return False
+                return True
+            for member in members:
+                if self._evaluate(member):
+                    return True
+            return False
+        if type(node) is _SetRuntime:
+            self._set(node.variable, node.source.value)
+        return node.value
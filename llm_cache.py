@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_DB_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+DEFAULT_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))
+DEFAULT_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", 256))
+DEFAULT_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", 10000))
+
+_file_hashes = {}
+
+
+def normalize_prompt(prompt):
+    """Collapses whitespace and case so trivially different prompts share a key."""
+    return " ".join((prompt or "").split()).casefold()
+
+
+def file_sha256(path):
+    """Content hash of a file, re-read only when its mtime or size changes."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _file_hashes[path] = (stamp, digest)
+    return digest
+
+
+def env_flag(name):
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class LLMCache:
+    """
+    Two-tier cache for raw LLM completions:
+    an in-process LRU in front of an on-disk SQLite table.
+    Entries expire after `ttl` seconds; both tiers are bounded in size.
+    """
+
+    def __init__(
+        self,
+        db_path=DEFAULT_DB_PATH,
+        ttl=DEFAULT_TTL_SECONDS,
+        max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries=DEFAULT_DISK_ENTRIES,
+        enabled=None,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.enabled = (not env_flag("LLM_CACHE_DISABLED")) if enabled is None else enabled
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+        self._db = None
+        if self.db_path:
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache(created_at)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(prompt, schema_hash, model, params):
+        """Key = normalized prompt + schema content hash + model + sampling params."""
+        payload = json.dumps(
+            {
+                "prompt": normalize_prompt(prompt),
+                "schema": schema_hash,
+                "model": model,
+                "params": params,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at, now):
+        return self.ttl is not None and self.ttl > 0 and now - created_at > self.ttl
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self.stats["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._expired(created_at, now):
+                        self._remember(key, value, created_at)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.stats["expired"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self.stats["writes"] += 1
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        if self.ttl:
+            cur = self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            self.stats["expired"] += max(cur.rowcount, 0)
+
+        count = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY created_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            self.stats["evictions"] += overflow
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def hit_rate(self):
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
@@ -0,0 +1,730 @@
+import json
+import os
+import threading
+import time
+import weakref
+from functools import lru_cache
+
+import httpx
+from groq import Groq
+
+import condition_optimizer
+import fast_path
+import metrics
+from hedging import Hedger
+from json_patch import JSONPatchError, affected_phases, apply_patch
+from json_repair import reask_message, repair_json, truncation_message
+from json_to_yaml import convert_json_to_text, join_phase_texts, render_phase_texts
+from keyword_catalog import get_catalog
+from model_router import ModelRouter
+from schema_compiler import compile_schema, count_tokens, estimate_tokens, get_keyword_index, schema_version as hash_schema
+from schema_registry import SchemaRegistry
+from semantic_cache import SemanticCache
+from schema_validator import correction_message, get_validator, issue_lines
+
+DEFAULT_SCHEMA_PATH = "schemas/test_schemav3.json"
+MODEL = "openai/gpt-oss-120b" # Ensure this model is available in your Groq tier
+SAMPLING_PARAMS = {
+    "temperature": 0.2,
+    "max_completion_tokens": 4096,
+    "top_p": 1,
+}
+MAX_RETRIES = 5
+# Follow-up edits answer with a JSON Patch of a few operations, not a whole strategy
+EDIT_MAX_COMPLETION_TOKENS = int(os.getenv("EDIT_MAX_COMPLETION_TOKENS", 512))
+EDIT_MAX_RETRIES = 2
+# Re-asks spent on schema violations before rendering the best attempt anyway
+MAX_VALIDATION_RETRIES = 1
+
+# Shared HTTP client settings (seconds / connection counts)
+HTTP_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", 60))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", 10))
+MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", 20))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", 10))
+KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", 30))
+# Retries the groq SDK itself makes on 429/5xx before an error reaches us
+SDK_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", 2))
+# GROQ_BASE_URL (read by the groq client) points everything at e.g. stub_server.py
+
+SYSTEM_RULES = """
+CRITICAL RULES:
+1. DEFAULT CONDITION: If the user DOES NOT specify an explicit entry condition (e.g., they just say "Buy Call"), you MUST generate this default condition:
+   LTP(Underlying Instrument) > 0.
+   Do NOT generate "1 >= 1" or empty groups.
+
+2. OFFSET PARSING:
+   - If user says "ATM+2" or "2 strikes OTM", set 'selection_method': 'ATM' and 'offset': 2.
+   - If user says "ATM-1", set 'selection_method': 'ATM' and 'offset': -1.
+   - If user says "ITM", set 'selection_method': 'ITM' (or offset as appropriate).
+
+3. STRANGLE / OTM LOGIC (VERY IMPORTANT):
+   - If the user asks for a "Strangle" or mentions "+/- X strikes" (e.g. "+-2"):
+     - The CALL option MUST have a POSITIVE offset (e.g., offset: 2).
+     - The PUT option MUST have a NEGATIVE offset (e.g., offset: -2).
+   - Never use the same positive offset for both legs in a Strangle.
+"""
+
+
+EDIT_RULES = """
+You edit an existing trading strategy given as JSON. Reply ONLY with an RFC 6902 JSON Patch: a JSON array of
+operations such as {"op": "replace", "path": "/strategy_sets/0/phases/0/positions/0/quantity_setup/value", "value": 2}
+("op" is one of add, remove, replace, move, copy; "path" and "from" are JSON Pointers into the CURRENT STRATEGY).
+Change only what the request asks for; every field not mentioned stays as it is. Reuse the field names and value
+formats the strategy already uses.
+"""
+
+
+class LLMConfigError(RuntimeError):
+    """Raised when the LLM client cannot be configured (e.g. missing API key)."""
+
+
+class ConnectionStats:
+    """Counts responses served on a fresh connection vs. a pooled keep-alive one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = weakref.WeakSet()
+        self.new = 0
+        self.reused = 0
+
+    def on_response(self, response):
+        stream = response.extensions.get("network_stream")
+        if stream is None:
+            return
+        with self._lock:
+            if stream in self._seen:
+                self.reused += 1
+            else:
+                self._seen.add(stream)
+                self.new += 1
+
+    def as_dict(self):
+        total = self.new + self.reused
+        return {
+            "new_connections": self.new,
+            "reused_connections": self.reused,
+            "reuse_rate": self.reused / total if total else 0.0,
+        }
+
+
+connection_stats = ConnectionStats()
+_client = None
+_client_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def system_prompt(compiled):
+    """First message of every request; one string per compiled schema text."""
+    return (
+        "You are a JSON converter for trading strategies.\n"
+        "You are a trading strategy assistant. Output ONLY valid JSON.\n"
+        f"{SYSTEM_RULES}\n"
+        "Convert user instructions into JSON blocks conforming to this schema:\n"
+        f"{compiled}"
+    )
+
+
+# Simple prompts go to the small model; ROUTER_DISABLED=1 sends everything to MODEL's route
+router = ModelRouter(enabled=os.getenv("ROUTER_DISABLED", "").strip().lower() not in ("1", "true", "yes", "on"))
+
+# Races a second attempt when the first is slow; used by convert(hedge=True)
+hedger = Hedger()
+
+# Near-duplicate prompts reuse an earlier conversion with their own entities substituted
+semantic_cache = SemanticCache()
+
+# Parsed schemas with their prompt text, token count and keyword index precomputed
+schemas = SchemaRegistry(prompt_builder=system_prompt)
+
+
+def load_schema(path=None):
+    """Parsed once per file content (default: the registry's active schema); raises SchemaLoadError."""
+    return schemas.get(path).schema
+
+
+def create_client(api_key=None, base_url=None, max_retries=None):
+    """A Groq client on its own keep-alive connection pool."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise LLMConfigError("GROQ_API_KEY not found in environment variables.")
+
+    timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    http_client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={"response": [connection_stats.on_response]},
+    )
+    return Groq(
+        api_key=api_key,
+        base_url=base_url,
+        http_client=http_client,
+        timeout=timeout,
+        max_retries=SDK_MAX_RETRIES if max_retries is None else max_retries,
+    )
+
+
+def get_client():
+    """Process-wide client, created on first use and reused by every call."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_client()
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def build_messages(schema, prompt, prune_schema=True, correction=None, schema_version=None, trace=None):
+    trace = trace or metrics.Trace()
+    with trace.span("prompt_build", pruned=prune_schema) as span:
+        entry = None if prune_schema or schema_version is None else schemas.by_version(schema_version)
+        if entry is not None and entry.schema is schema:
+            # Unpruned prompt of a registry schema: built once when the file was loaded
+            instructions, schema_tokens = entry.prompt_text, entry.tokens
+        else:
+            compiled = compile_schema(schema, prompt, prune=prune_schema, version=schema_version)
+            instructions, schema_tokens = system_prompt(compiled), count_tokens(compiled)
+        messages = [
+            {
+                "role": "user",
+                "content": instructions
+            },
+            {
+                "role": "user",
+                "content": "Now convert the following input into JSON. And only give the final json nothing else:"
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        if correction:
+            # Targeted re-ask: carries the parse error and broken fragment from the last attempt
+            messages.append({"role": "user", "content": correction})
+        span.set(schema_tokens=schema_tokens)
+    trace.registry.observe(
+        "schema_tokens", schema_tokens, metrics.TOKEN_BUCKETS,
+        help="Estimated tokens the compiled schema adds to each prompt", pruned=str(prune_schema).lower(),
+    )
+    return messages
+
+
+def _record_usage(trace, span, messages, content, usage):
+    # Streams without a usage block (and stubs) fall back to local estimates
+    if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+        tokens = usage.prompt_tokens, usage.completion_tokens or 0
+        metrics.record_llm_usage(span, *tokens, estimated=False, registry=trace.registry)
+    else:
+        tokens = sum(estimate_tokens(message["content"]) for message in messages), estimate_tokens(content or "")
+        metrics.record_llm_usage(span, *tokens, estimated=True, registry=trace.registry)
+    return tokens
+
+
+def _model_params(route):
+    """Model and sampling parameters for a route (None = MODEL with SAMPLING_PARAMS)."""
+    if route is None:
+        return MODEL, SAMPLING_PARAMS
+    return route.model, {**SAMPLING_PARAMS, "max_completion_tokens": route.max_completion_tokens}
+
+
+def _complete(client, messages, model, params, trace):
+    """
+    One non-streaming completion; returns (content, (prompt tokens,
+    completion tokens), seconds, finish_reason). finish_reason "length"
+    means the output was cut off at max_completion_tokens.
+    """
+    with trace.span("llm_call", model=model, stream=False) as span:
+        completion = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **params,
+        )
+        content = completion.choices[0].message.content
+        finish_reason = getattr(completion.choices[0], "finish_reason", None)
+        span.set(finish_reason=finish_reason)
+        tokens = _record_usage(trace, span, messages, content, getattr(completion, "usage", None))
+    return content, tokens, span.duration, finish_reason
+
+
+def llm(schema, prompt, prune_schema=True, correction=None, client=None, schema_version=None, trace=None, route=None):
+    return llm_completion(schema, prompt, prune_schema, correction, client, schema_version, trace, route)[0]
+
+
+def llm_completion(schema, prompt, prune_schema=True, correction=None, client=None, schema_version=None, trace=None,
+                   route=None):
+    """llm() that also returns the completion's finish_reason ("length" when it was cut off)."""
+    client = client or get_client()
+    trace = trace or metrics.Trace()
+    model, params = _model_params(route)
+    messages = build_messages(schema, prompt, prune_schema, correction, schema_version, trace=trace)
+    content, tokens, seconds, finish_reason = _complete(client, messages, model, params, trace)
+    if route is not None:
+        router.record_call(route, seconds, *tokens)
+
+    return content, finish_reason
+
+
+def llm_stream(schema, prompt, prune_schema=True, correction=None, client=None, schema_version=None, trace=None,
+               route=None, cancel=None):
+    """
+    Yields content deltas as the completion streams in. The llm_call span
+    runs until the stream is exhausted, so it includes the caller's time
+    spent rendering between deltas. With `cancel` (a hedging.Cancellation)
+    the stream is closed as soon as it is set, even before the first token.
+    """
+    client = client or get_client()
+    trace = trace or metrics.Trace()
+    model, params = _model_params(route)
+    messages = build_messages(schema, prompt, prune_schema, correction, schema_version, trace=trace)
+    with trace.span("llm_call", model=model, stream=True) as span:
+        started = time.perf_counter()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **params,
+        )
+        if cancel is not None:
+            cancel.on_set(stream.close)
+        parts = []
+        usage = None
+        try:
+            for chunk in stream:
+                # Groq reports usage on the last chunk under x_groq
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or getattr(chunk, "usage", None) or usage
+                if chunk.choices and getattr(chunk.choices[0], "finish_reason", None):
+                    span.set(finish_reason=chunk.choices[0].finish_reason)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        ttft = time.perf_counter() - started
+                        span.set(ttft_ms=round(ttft * 1000, 2))
+                        trace.registry.observe("llm_ttft_seconds", ttft, help="Time to the first streamed token")
+                    parts.append(chunk.choices[0].delta.content)
+                    yield parts[-1]
+        finally:
+            stream.close()
+            tokens = _record_usage(trace, span, messages, "".join(parts), usage)
+            if route is not None:
+                router.record_call(route, time.perf_counter() - started, *tokens)
+
+
+def _check(raw, catalog, validator, trace, optimize_conditions=False):
+    """
+    Local repair, keyword canonicalization, the optional condition
+    optimization and validation of one completion. Returns (parsed, stage,
+    rewrites, optimizer report, issues); raises JSONDecodeError.
+    """
+    with trace.span("parse") as span:
+        parsed, stage = repair_json(raw)
+        span.set(repair_stage=stage)
+    # Near-miss keyword names are fixed locally instead of costing a re-ask
+    with trace.span("canonicalize") as span:
+        rewrites = catalog.canonicalize(parsed)
+        span.set(rewrites=len(rewrites))
+    report = None
+    if optimize_conditions:
+        # Before validation: a folded-away `1 >= 1` need not cost a re-ask
+        with trace.span("optimize") as span:
+            parsed, report = condition_optimizer.optimize_strategy(parsed)
+            span.set(nodes_before=report["before"]["nodes"], nodes_after=report["after"]["nodes"])
+    with trace.span("validate") as span:
+        issues = validator.validate(parsed)
+        span.set(issues=len(issues))
+    return parsed, stage, rewrites, report, issues
+
+
+def hedged_llm(schema, prompt, validator, client=None, schema_version=None, trace=None, route=None, priority=False,
+               optimize_conditions=False):
+    """
+    First LLM attempt raced by `hedger`: the completion that parses and
+    validates first wins and the others are cancelled mid-stream. Hedges
+    go to the larger route when there is one. Returns (raw, route, checked,
+    HedgeResult), where `checked` is the attempt's _check() result, or the
+    JSONDecodeError its output raised, so the caller need not repair and
+    validate it again. If no attempt was valid, they are those of the first
+    attempt to finish, for the caller's usual re-ask.
+    """
+    client = client or get_client()
+    trace = trace or metrics.Trace()
+    schema_version = schema_version or hash_schema(schema)
+
+    catalog = get_catalog(schema, schema_version)
+
+    def attempt(index, cancel, attempt_trace):
+        attempt_route = route if index == 0 or route is None else router.escalate(route) or route
+        parts = []
+        stream = llm_stream(
+            schema, prompt, client=client, schema_version=schema_version, trace=attempt_trace, route=attempt_route,
+            cancel=cancel,
+        )
+        try:
+            for delta in stream:
+                if cancel.is_set():
+                    return None, False
+                parts.append(delta)
+        except Exception:
+            if cancel.is_set():
+                # The stream was closed under a blocked read
+                return None, False
+            raise
+        finally:
+            stream.close()
+        raw = "".join(parts)
+        try:
+            checked = _check(raw, catalog, validator, attempt_trace, optimize_conditions)
+        except json.JSONDecodeError as e:
+            return (raw, attempt_route, e), False
+        return (raw, attempt_route, checked), not checked[-1]
+
+    result = hedger.run(attempt, priority=priority, trace=trace)
+    raw, route, checked = result.value
+    return raw, route, checked, result
+
+
+def convert(schema, prompt, client=None, max_retries=MAX_RETRIES, schema_version=None, use_fast_path=True,
+            trace=None, use_semantic_cache=True, hedge=False, priority=False, optimize_conditions=False):
+    """
+    Headless NL -> JSON -> text pipeline: rule-based fast path, then the
+    near-duplicate cache, else LLM call (routed by prompt complexity; the
+    small model's unparseable or invalid output escalates to the large
+    one), local repair, keyword canonicalization and targeted re-asks,
+    then rendering. Schema-valid LLM output is added to the near-duplicate
+    cache. Output that parses but breaks the schema gets one re-ask listing
+    the offending JSON pointers; if that still fails, the last parse is
+    rendered with its `validation_errors`. Raises the last JSONDecodeError
+    if no attempt produced parseable JSON; API errors propagate as-is. With
+    `hedge` the first attempt is raced (see hedged_llm), `priority` racing
+    at once. With `optimize_conditions` the LLM's condition trees are
+    simplified (see condition_optimizer) ahead of validation and the
+    report is returned under `optimized`. Output cut off at the token limit
+    (finish_reason "length", or only parseable by closing its brackets) is
+    re-asked or escalated like a parse failure: balancing would silently
+    drop its unfinished tail. It is returned only as a last resort, with
+    `truncated` set. The request's span table is returned under `spans`.
+    """
+    trace = trace or metrics.Trace("convert")
+    try:
+        result = _convert(
+            schema, prompt, client, max_retries, schema_version, use_fast_path, use_semantic_cache, hedge, priority,
+            optimize_conditions, trace,
+        )
+    except json.JSONDecodeError:
+        trace.close("parse_error", "llm")
+        raise
+    except Exception:
+        trace.close("error", "llm")
+        raise
+    source = "fast_path" if "fast_path" in result else "semantic_cache" if "semantic_match" in result else "llm"
+    outcome = "truncated" if result.get("truncated") else "invalid" if "validation_errors" in result else "ok"
+    trace.close(outcome, source)
+    result["spans"] = trace.rows()
+    return result
+
+
+def _render(parsed, trace):
+    with trace.span("render"):
+        return convert_json_to_text(parsed)
+
+
+def _convert(schema, prompt, client, max_retries, schema_version, use_fast_path, use_semantic_cache, hedge, priority,
+             optimize_conditions, trace):
+    schema_version = schema_version or hash_schema(schema)
+    with trace.span("schema_load"):
+        validator = get_validator(schema, schema_version)
+        catalog = get_catalog(schema, schema_version)
+    with trace.span("fast_path", enabled=use_fast_path) as span:
+        # Templates build v3 JSON: a schema that rejects it sends the prompt to the LLM
+        fast = fast_path.parse(prompt, validator=validator) if use_fast_path else None
+        span.set(hit=fast is not None)
+    if fast is not None:
+        return {
+            "json": fast.strategy,
+            "text": _render(fast.strategy, trace),
+            "attempts": 0,
+            "repair_stage": None,
+            "fast_path": fast.template,
+        }
+    if use_semantic_cache:
+        with trace.span("semantic_lookup") as span:
+            hit = semantic_cache.lookup(prompt, schema_version, validator)
+            span.set(hit=hit is not None)
+        if hit is not None:
+            return {
+                "json": hit.strategy,
+                "text": _render(hit.strategy, trace),
+                "attempts": 0,
+                "repair_stage": None,
+                "semantic_match": {
+                    "prompt": hit.source_prompt,
+                    "similarity": hit.similarity,
+                    "substitutions": [list(change) for change in hit.substitutions],
+                },
+            }
+    route, score = router.route(prompt, get_keyword_index(schema, schema_version))
+    trace.event("route", route=route.name, score=score.score)
+    correction = None
+    prune_schema = True
+    last_error = None
+    invalid = None
+    validation_retries = 0
+    hedged = None
+    truncated = None
+    for attempt in range(1, max_retries + 1):
+        finish_reason = checked = None
+        if hedge and attempt == 1:
+            raw, route, checked, hedged = hedged_llm(
+                schema, prompt, validator, client, schema_version, trace=trace, route=route, priority=priority,
+                optimize_conditions=optimize_conditions,
+            )
+        else:
+            raw, finish_reason = llm_completion(
+                schema, prompt, prune_schema, correction, client, schema_version, trace, route,
+            )
+        # Retries on the same model fall back to the full keyword catalogue
+        prune_schema = False
+        try:
+            if checked is None:
+                checked = _check(raw, catalog, validator, trace, optimize_conditions)
+            elif isinstance(checked, json.JSONDecodeError):
+                raise checked
+        except json.JSONDecodeError as e:
+            last_error = e
+            larger = router.escalate(route)
+            if larger is not None:
+                # The small model's attempt is dropped; the large one starts fresh
+                router.record_outcome(route, score, ok=False, escalated=True)
+                route, correction, prune_schema = larger, None, True
+                trace.retry("escalation", attempt)
+                continue
+            correction = reask_message(e)
+            trace.retry("json_decode", attempt)
+            continue
+        parsed, stage, rewrites, report, issues = checked
+        cut_off = finish_reason == "length" or stage == "balance"
+        if cut_off and attempt < max_retries:
+            # Kept only in case no later attempt does better
+            truncated = (parsed, stage, issues, rewrites, report)
+            larger = router.escalate(route)
+            if larger is not None:
+                router.record_outcome(route, score, ok=False, escalated=True)
+                route, correction, prune_schema = larger, None, True
+                trace.retry("escalation", attempt)
+            else:
+                correction = truncation_message()
+                trace.retry("truncated", attempt)
+            continue
+        larger = router.escalate(route) if issues and attempt < max_retries else None
+        if larger is not None:
+            router.record_outcome(route, score, ok=False, escalated=True)
+            invalid = (parsed, stage, issues)
+            route, correction, prune_schema = larger, None, True
+            trace.retry("escalation", attempt)
+            continue
+        if issues and validation_retries < MAX_VALIDATION_RETRIES and attempt < max_retries:
+            validation_retries += 1
+            invalid = (parsed, stage, issues)
+            correction = correction_message(issues)
+            trace.retry("validation", attempt)
+            continue
+
+        trace.registry.observe("attempts", attempt, metrics.COUNT_BUCKETS, help="LLM attempts per request")
+        router.record_outcome(route, score, ok=not issues)
+        result = {
+            "json": parsed,
+            "text": _render(parsed, trace),
+            "attempts": attempt,
+            "repair_stage": stage,
+            "route": {"name": route.name, "model": route.model, "complexity": score.as_dict()},
+        }
+        if hedged is not None:
+            result["hedge"] = {"launched": hedged.launched, "winner": hedged.winner}
+        if rewrites:
+            result["canonicalized"] = [list(change) for change in rewrites]
+        if report is not None:
+            result["optimized"] = report
+        if cut_off:
+            result["truncated"] = True
+        if issues:
+            result["validation_errors"] = [list(issue) for issue in issues]
+        elif use_semantic_cache and not cut_off:
+            semantic_cache.add(prompt, parsed, schema_version)
+        return result
+
+    trace.registry.observe("attempts", max_retries, metrics.COUNT_BUCKETS, help="LLM attempts per request")
+    router.record_outcome(route, score, ok=False)
+    if invalid is not None:
+        parsed, stage, issues = invalid
+        return {
+            "json": parsed,
+            "text": _render(parsed, trace),
+            "attempts": max_retries,
+            "repair_stage": stage,
+            "validation_errors": [list(issue) for issue in issues],
+            "route": {"name": route.name, "model": route.model, "complexity": score.as_dict()},
+        }
+    if truncated is not None:
+        # Last resort: the balanced attempt, flagged so the caller knows its tail is missing
+        parsed, stage, issues, rewrites, report = truncated
+        result = {
+            "json": parsed,
+            "text": _render(parsed, trace),
+            "attempts": max_retries,
+            "repair_stage": stage,
+            "truncated": True,
+            "route": {"name": route.name, "model": route.model, "complexity": score.as_dict()},
+        }
+        if rewrites:
+            result["canonicalized"] = [list(change) for change in rewrites]
+        if report is not None:
+            result["optimized"] = report
+        if issues:
+            result["validation_errors"] = [list(issue) for issue in issues]
+        return result
+    raise last_error
+
+
+def build_edit_messages(strategy, request, correction=None):
+    """The change request with the current strategy as compact JSON; no schema text."""
+    messages = [
+        {"role": "user", "content": f"{EDIT_RULES}\n{SYSTEM_RULES}"},
+        {"role": "user", "content": "CURRENT STRATEGY:\n" + json.dumps(strategy, separators=(",", ":"), ensure_ascii=False)},
+        {"role": "user", "content": request},
+    ]
+    if correction:
+        messages.append({"role": "user", "content": correction})
+    return messages
+
+
+def _patch_operations(parsed):
+    # Models sometimes wrap the array ({"patch": [...]}); anything else that is not an array
+    # (a lone operation may be all that survived of one) is re-asked rather than applied in part
+    if isinstance(parsed, dict) and isinstance(parsed.get("patch"), list):
+        parsed = parsed["patch"]
+    if not isinstance(parsed, list):
+        raise JSONPatchError("the reply is not a JSON Patch array")
+    return parsed
+
+
+def edit_strategy(schema, strategy, request, client=None, schema_version=None, trace=None, phase_texts=None,
+                  max_retries=EDIT_MAX_RETRIES):
+    """
+    Follow-up edit of `strategy`, the last parsed one: the model sees only
+    the change request and the strategy as compact JSON and answers with
+    an RFC 6902 patch, so a tweak costs a few dozen completion tokens
+    instead of the whole document. The patch is applied, canonicalized and
+    validated locally; with `phase_texts` (render_phase_texts of
+    `strategy`) only the phases it touches are rendered again, and
+    `rerendered` counts them ("all" otherwise). A patch that
+    does not parse or apply is re-asked, on the larger model when there is
+    one; if none applies, the last JSONPatchError or JSONDecodeError is
+    raised and the caller can fall back to convert(). The request's span
+    table is returned under `spans`.
+    """
+    trace = trace or metrics.Trace("edit")
+    try:
+        result = _edit_strategy(schema, strategy, request, client, schema_version, trace, phase_texts, max_retries)
+    except json.JSONDecodeError:
+        trace.close("parse_error", "edit")
+        raise
+    except Exception:
+        trace.close("error", "edit")
+        raise
+    trace.close("invalid" if "validation_errors" in result else "ok", "edit")
+    result["spans"] = trace.rows()
+    return result
+
+
+def _edit_strategy(schema, strategy, request, client, schema_version, trace, phase_texts, max_retries):
+    client = client or get_client()
+    schema_version = schema_version or hash_schema(schema)
+    with trace.span("schema_load"):
+        validator = get_validator(schema, schema_version)
+        catalog = get_catalog(schema, schema_version)
+    route, score = router.route(request, get_keyword_index(schema, schema_version))
+    trace.event("route", route=route.name, score=score.score)
+    correction = None
+    last_error = None
+    invalid = None
+    for attempt in range(1, max_retries + 1):
+        with trace.span("prompt_build", edit=True):
+            messages = build_edit_messages(strategy, request, correction)
+        raw, _, _, _ = _complete(
+            client, messages, route.model, {**SAMPLING_PARAMS, "max_completion_tokens": EDIT_MAX_COMPLETION_TOKENS},
+            trace,
+        )
+        try:
+            with trace.span("parse") as span:
+                parsed, stage = repair_json(raw, container=list)
+                span.set(repair_stage=stage)
+            with trace.span("apply_patch") as span:
+                patch = _patch_operations(parsed)
+                edited = apply_patch(strategy, patch)
+                span.set(operations=len(patch))
+        except (json.JSONDecodeError, JSONPatchError) as e:
+            last_error = e
+            larger = router.escalate(route)
+            if larger is not None:
+                route, correction = larger, None
+                trace.retry("escalation", attempt)
+            else:
+                correction = (
+                    reask_message(e) if isinstance(e, json.JSONDecodeError)
+                    else f"Your patch could not be applied: {e}. Reply with a corrected JSON Patch array only."
+                )
+                trace.retry("patch", attempt)
+            continue
+
+        with trace.span("canonicalize") as span:
+            rewrites = catalog.canonicalize(edited)
+            span.set(rewrites=len(rewrites))
+        with trace.span("validate") as span:
+            issues = validator.validate(edited)
+            span.set(issues=len(issues))
+        if issues and attempt < max_retries:
+            invalid = (edited, patch, rewrites, issues)
+            correction = (
+                "The strategy after your patch does not conform to the schema:\n" + issue_lines(issues)
+                + "\nReply with a corrected JSON Patch against the CURRENT STRATEGY only, nothing else."
+            )
+            trace.retry("validation", attempt)
+            continue
+        return _edit_result(edited, patch, rewrites, issues, attempt, route, phase_texts, trace)
+
+    if invalid is not None:
+        return _edit_result(*invalid, max_retries, route, phase_texts, trace)
+    raise last_error
+
+
+def _edit_result(edited, patch, rewrites, issues, attempts, route, phase_texts, trace):
+    # Keyword names canonicalized inside the patched values dirty their phases too
+    dirty = affected_phases(patch + [{"op": "replace", "path": pointer} for pointer, *_ in rewrites])
+    rerendered = "all" if phase_texts is None or dirty is None else len(dirty)
+    with trace.span("render") as span:
+        texts = render_phase_texts(edited, previous=phase_texts, dirty=dirty)
+        span.set(rerendered=rerendered)
+        text = join_phase_texts(edited, texts)
+    result = {
+        "json": edited,
+        "text": text,
+        "phase_texts": texts,
+        "rerendered": rerendered,
+        "patch": patch,
+        "attempts": attempts,
+        "route": {"name": route.name, "model": route.model},
+    }
+    if rewrites:
+        result["canonicalized"] = [list(change) for change in rewrites]
+    if issues:
+        result["validation_errors"] = [list(issue) for issue in issues]
+    return result
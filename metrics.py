@@ -0,0 +1,289 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8)
+PREFIX = "strategy_"
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0)) # 0 = no HTTP endpoint
+METRICS_FILE = os.getenv("METRICS_FILE") # Prometheus text file rewritten after each request
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+
+class Registry:
+    """Histograms and counters keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One file export at a time; metric updates only wait on _lock
+        self._export_lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.help = {}
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+            if help:
+                self.help.setdefault(name, help)
+
+    def inc(self, name, amount=1, help=None, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+            if help:
+                self.help.setdefault(name, help)
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def summary(self):
+        """Rows of (metric, labels, count, mean, p50, p95) for display."""
+        with self._lock:
+            rows = [
+                {
+                    "metric": name,
+                    "labels": ", ".join(f"{k}={v}" for k, v in labels),
+                    "count": h.count,
+                    "mean": h.sum / h.count if h.count else 0.0,
+                    "p50": h.quantile(0.5),
+                    "p95": h.quantile(0.95),
+                }
+                for (name, labels), h in sorted(self.histograms.items())
+            ]
+            rows.extend(
+                {"metric": name, "labels": ", ".join(f"{k}={v}" for k, v in labels), "count": value}
+                for (name, labels), value in sorted(self.counters.items())
+            )
+        return rows
+
+    def render_prometheus(self):
+        def fmt_labels(labels, extra=()):
+            pairs = [*labels, *extra]
+            if not pairs:
+                return ""
+            escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+            return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            seen = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = PREFIX + name
+                if metric not in seen:
+                    seen.add(metric)
+                    if name in self.help:
+                        lines.append(f"# HELP {metric} {self.help[name]}")
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{fmt_labels(labels)} {value}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                metric = PREFIX + name
+                if metric not in seen:
+                    seen.add(metric)
+                    if name in self.help:
+                        lines.append(f"# HELP {metric} {self.help[name]}")
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    lines.append(f"{metric}_bucket{fmt_labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{metric}_bucket{fmt_labels(labels, (('le', '+Inf'),))} {h.count}")
+                lines.append(f"{metric}_sum{fmt_labels(labels)} {h.sum}")
+                lines.append(f"{metric}_count{fmt_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Written to a private temp file beside `path` and renamed, so a scraper never reads half a file
+        directory, name = os.path.split(os.path.abspath(path))
+        with self._export_lock:
+            fd, tmp = tempfile.mkstemp(prefix=f".{name}.", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w") as f:
+                    f.write(self.render_prometheus())
+                os.replace(tmp, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+                raise
+
+
+registry = Registry()
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "attrs")
+
+    def __init__(self, name, start, attrs):
+        self.name = name
+        self.start = start
+        self.duration = 0.0
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span", "t0")
+
+    def __init__(self, trace, span):
+        self.trace = trace
+        self.span = span
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.duration = time.perf_counter() - self.t0
+        if exc_type is not None:
+            self.span.attrs["error"] = exc_type.__name__
+        self.trace.finish(self.span)
+        return False
+
+
+class Trace:
+    """
+    Spans of one conversion request. Every finished span is also observed
+    into `strategy_stage_seconds{stage=...}` on the registry.
+    """
+
+    def __init__(self, name="request", registry=registry):
+        self.name = name
+        self.registry = registry
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def span(self, name, **attrs):
+        return _SpanContext(self, Span(name, time.perf_counter() - self.started, attrs))
+
+    def finish(self, span):
+        self.spans.append(span)
+        self.registry.observe("stage_seconds", span.duration, help="Time per pipeline stage", stage=span.name)
+
+    def fork(self):
+        """A trace on this one's clock and registry for work in another thread; merge it back with join()."""
+        fork = Trace(self.name, self.registry)
+        fork.started = self.started
+        return fork
+
+    def join(self, fork, **attrs):
+        """Adds a fork's spans, each tagged with `attrs`."""
+        for span in fork.spans:
+            span.attrs.update(attrs)
+        self.spans.extend(fork.spans)
+
+    def event(self, name, **attrs):
+        """Zero-length span, e.g. a retry decision."""
+        self.spans.append(Span(name, time.perf_counter() - self.started, attrs))
+
+    def retry(self, reason, attempt):
+        self.event("retry", reason=reason, attempt=attempt)
+        self.registry.inc("retries_total", help="Re-asks by cause (json_decode, validation)", reason=reason)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def close(self, outcome, source):
+        """Records the request-level metrics; call once when the request is done."""
+        self.registry.observe("request_seconds", self.total(), help="End-to-end request time", source=source)
+        self.registry.inc("requests_total", help="Requests by outcome and answer source", outcome=outcome, source=source)
+        if METRICS_FILE:
+            # A failed export must not fail the request it describes
+            try:
+                self.registry.write_prometheus(METRICS_FILE)
+            except OSError as e:
+                self.registry.inc("metrics_export_errors_total", help="Failed METRICS_FILE writes")
+                log.warning("could not write %s: %s", METRICS_FILE, e)
+
+    def rows(self):
+        """Span table for display, in start order."""
+        return [
+            {
+                "span": span.name,
+                "start_ms": round(span.start * 1000, 2),
+                "duration_ms": round(span.duration * 1000, 2),
+                **span.attrs,
+            }
+            for span in sorted(self.spans, key=lambda s: s.start)
+        ]
+
+
+def record_llm_usage(span, prompt_tokens, completion_tokens, estimated, registry=registry):
+    """Sets the token counts on an llm_call span and adds them to `registry` (pass the trace's)."""
+    span.set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, tokens_estimated=estimated)
+    help_text = "Tokens per LLM call (estimated when the API reports no usage)"
+    registry.observe("llm_tokens", prompt_tokens, TOKEN_BUCKETS, help=help_text, kind="prompt")
+    registry.observe("llm_tokens", completion_tokens, TOKEN_BUCKETS, help=help_text, kind="completion")
+    registry.inc("llm_tokens_total", prompt_tokens, help="Tokens sent and received", kind="prompt")
+    registry.inc("llm_tokens_total", completion_tokens, help="Tokens sent and received", kind="completion")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = self.server.registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve_metrics(port=METRICS_PORT, host="127.0.0.1", registry=registry):
+    """Serves GET /metrics from a daemon thread; returns the server."""
+    httpd = ThreadingHTTPServer((host, port), _MetricsHandler)
+    httpd.daemon_threads = True
+    httpd.registry = registry
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
@@ -0,0 +1,218 @@
+import os
+import re
+import sys
+import threading
+
+import metrics
+from schema_compiler import match_index
+
+SMALL_MODEL = "openai/gpt-oss-20b"
+LARGE_MODEL = "openai/gpt-oss-120b"
+# Prompts scoring at most this go to the small model
+SMALL_MAX_SCORE = float(os.getenv("ROUTER_SMALL_MAX_SCORE", 4))
+
+
+class Route:
+    """A model with its completion cap and price (USD per million tokens, input / output)."""
+    __slots__ = ("name", "model", "max_completion_tokens", "input_cost", "output_cost")
+
+    def __init__(self, name, model, max_completion_tokens, input_cost, output_cost):
+        self.name = name
+        self.model = model
+        self.max_completion_tokens = max_completion_tokens
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+
+    def cost(self, prompt_tokens, completion_tokens):
+        return (prompt_tokens * self.input_cost + completion_tokens * self.output_cost) / 1e6
+
+
+# Prices are Groq's list prices at the time of writing; override via env when they change
+SMALL = Route(
+    "small", SMALL_MODEL, int(os.getenv("ROUTER_SMALL_MAX_TOKENS", 1536)),
+    float(os.getenv("ROUTER_SMALL_INPUT_COST", 0.075)), float(os.getenv("ROUTER_SMALL_OUTPUT_COST", 0.30)),
+)
+LARGE = Route(
+    "large", LARGE_MODEL, int(os.getenv("ROUTER_LARGE_MAX_TOKENS", 4096)),
+    float(os.getenv("ROUTER_LARGE_INPUT_COST", 0.15)), float(os.getenv("ROUTER_LARGE_OUTPUT_COST", 0.60)),
+)
+SCORE_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 24)
+
+# Weight per feature in the complexity score
+WEIGHTS = {"legs": 1.0, "conditions": 1.0, "runtime_vars": 3.0, "phases": 2.0}
+
+_LEG_STRUCTURES = (
+    (re.compile(r"\biron\s+(?:condor|fly|butterfly)\b"), 4),
+    (re.compile(r"\b(?:butterfly|condor)\b"), 4),
+    (re.compile(r"\b(?:straddle|strangle|spread|ratio)s?\b"), 2),
+)
+_LEG_COUNT = re.compile(r"\b(\d+)\s+legs?\b")
+_OPTION = re.compile(r"\b(?:call|put|ce|pe|future|fut)s?\b")
+_COMPARISON = re.compile(
+    r"(?:>=|<=|==|!=|[<>=]|\bcross(?:es|ed|ing)?\s+(?:above|below|over|under)\b"
+    r"|\b(?:above|below|greater|less|more|higher|lower)\s+than\b|\b(?:above|below)\b)"
+)
+_CONNECTIVE = re.compile(r"\b(?:and|or)\b")
+_RUNTIME = re.compile(
+    r"\b(?:runtime|variable|store|save|remember|record|trail(?:ing)?|highest|lowest|since\s+entry|re-?entr(?:y|ies)|counter)\b"
+)
+_PHASES = (
+    re.compile(r"\b(?:exit|square\s*off|close\s+(?:all|positions?))\b"),
+    re.compile(r"\b(?:stop\s*-?\s*loss|sl)\b"),
+    re.compile(r"\b(?:target|take\s+profit|tp)\b"),
+    re.compile(r"\b(?:adjust(?:ment)?|roll|re-?enter|re-?entry|hedge)\b"),
+)
+
+
+class Complexity:
+    __slots__ = ("score", "legs", "conditions", "runtime_vars", "phases")
+
+    def __init__(self, score, legs, conditions, runtime_vars, phases):
+        self.score = score
+        self.legs = legs
+        self.conditions = conditions
+        self.runtime_vars = runtime_vars
+        self.phases = phases
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def complexity(prompt, keyword_index=()):
+    """
+    Scores how much structure the prompt asks for. `keyword_index` (from
+    schema_compiler.keyword_index) lets indicator mentions count as
+    conditions even without an explicit comparison.
+    """
+    text = " ".join((prompt or "").lower().split())
+
+    legs = 0
+    rest = text
+    for pattern, n in _LEG_STRUCTURES:
+        # Each structure consumes its words so "iron condor" is not also a "condor"
+        rest, found = pattern.subn(" ", rest)
+        legs += n * found
+    legs = max(legs, len(_OPTION.findall(text)), *(int(n) for n in _LEG_COUNT.findall(text)), 1)
+
+    comparisons = len(_COMPARISON.findall(text))
+    indicators = sum(len(matches) for _, _, matches in match_index(keyword_index, prompt or ""))
+    # "A and B" is two conditions even when only one comparison is spelled out
+    conditions = max(comparisons, indicators, len(_CONNECTIVE.findall(text)) + 1 if comparisons else 0)
+
+    runtime_vars = len(_RUNTIME.findall(text))
+    phases = 1 + sum(1 for pattern in _PHASES if pattern.search(text))
+
+    score = (
+        WEIGHTS["legs"] * (legs - 1)
+        + WEIGHTS["conditions"] * conditions
+        + WEIGHTS["runtime_vars"] * runtime_vars
+        + WEIGHTS["phases"] * (phases - 1)
+    )
+    return Complexity(score, legs, conditions, runtime_vars, phases)
+
+
+class RouteStats:
+    """Per-route calls, tokens, cost and latency, plus request outcomes by score."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latency = metrics.Histogram(metrics.LATENCY_BUCKETS)
+        self.successes = 0
+        self.failures = 0
+        self.escalations = 0
+        self.by_score = {} # score -> [requests, successes]
+
+
+class ModelRouter:
+    """
+    Sends prompts scoring <= `small_max_score` to the small route, the rest
+    to the large one. Call and outcome stats are kept per route (and
+    exported to the metrics registry) so the threshold can be tuned.
+    """
+
+    def __init__(self, small=SMALL, large=LARGE, small_max_score=SMALL_MAX_SCORE, enabled=True):
+        self.small = small
+        self.large = large
+        self.small_max_score = small_max_score
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stats = {small.name: RouteStats(), large.name: RouteStats()}
+
+    def route(self, prompt, keyword_index=(), allow_small=True):
+        """Returns (Route, Complexity)."""
+        score = complexity(prompt, keyword_index)
+        if self.enabled and allow_small and score.score <= self.small_max_score:
+            return self.small, score
+        return self.large, score
+
+    def escalate(self, route):
+        """The next larger route, or None if `route` is the largest."""
+        return self.large if route is self.small else None
+
+    def record_call(self, route, seconds, prompt_tokens, completion_tokens):
+        cost = route.cost(prompt_tokens, completion_tokens)
+        with self._lock:
+            stats = self.stats[route.name]
+            stats.calls += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += cost
+            stats.latency.observe(seconds)
+        metrics.registry.observe("route_call_seconds", seconds, help="LLM call time per route", route=route.name)
+        metrics.registry.inc("route_cost_usd_total", cost, help="Estimated spend per route", route=route.name)
+
+    def record_outcome(self, route, score, ok, escalated=False):
+        """One request's result on `route`; an escalated request counts as a failure of the route it left."""
+        with self._lock:
+            stats = self.stats[route.name]
+            counts = stats.by_score.setdefault(score.score, [0, 0])
+            counts[0] += 1
+            if ok:
+                stats.successes += 1
+                counts[1] += 1
+            else:
+                stats.failures += 1
+            if escalated:
+                stats.escalations += 1
+        outcome = "escalated" if escalated else "ok" if ok else "failed"
+        metrics.registry.inc("route_requests_total", help="Requests per route and outcome", route=route.name, outcome=outcome)
+        metrics.registry.observe("route_score", score.score, SCORE_BUCKETS, help="Complexity score per route", route=route.name)
+
+    def report(self):
+        with self._lock:
+            report = {}
+            for name, stats in self.stats.items():
+                requests = stats.successes + stats.failures
+                report[name] = {
+                    "calls": stats.calls,
+                    "requests": requests,
+                    "success_rate": round(stats.successes / requests, 3) if requests else None,
+                    "escalations": stats.escalations,
+                    "p50_s": round(stats.latency.quantile(0.5), 3),
+                    "p95_s": round(stats.latency.quantile(0.95), 3),
+                    "tokens": stats.prompt_tokens + stats.completion_tokens,
+                    "cost_usd": round(stats.cost, 6),
+                    "success_by_score": {
+                        score: round(ok / n, 3) for score, (n, ok) in sorted(stats.by_score.items())
+                    },
+                }
+        report["small_max_score"] = self.small_max_score
+        return report
+
+
+if __name__ == "__main__":
+    from schema_registry import SchemaRegistry
+
+    router = ModelRouter()
+    keyword_index = SchemaRegistry().get().keyword_index
+    for prompt in sys.argv[1:] or [
+        "Buy NIFTY ATM call",
+        "Sell BANKNIFTY strangle +-2 strikes, exit at 15:15",
+        "Buy NIFTY ATM call when RSI(14) crosses above 60 and EMA 20 > EMA 50",
+        "Iron condor on NIFTY, store entry premium in a runtime variable, exit on 30% stop loss or 50% target, re-enter once",
+    ]:
+        route, score = router.route(prompt, keyword_index)
+        print(f"{route.name:<6} {score.score:>5.1f} {score.as_dict()}  {prompt}")
@@ -0,0 +1,321 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken is optional, fall back to a heuristic
+    _ENCODING = None
+
+SCHEMA_DIR = "schemas"
+
+# (definition name, property holding the enum) for the large keyword catalogues
+PRUNABLE_ENUMS = (
+    ("indicator_series_function", "function_name"),
+    ("real_time_utility_keyword", "keyword"),
+    ("candle_pattern_function", "pattern_name"),
+)
+
+# Always offered for their catalogue, whatever the prompt says
+CORE_KEYWORDS = {
+    "function_name": ("OPEN", "HIGH", "LOW", "CLOSE"),
+    "keyword": ("LTP",),
+    "pattern_name": (),
+}
+
+# Common phrasing -> catalogue entries it implies
+KEYWORD_ALIASES = {
+    "moving average": ("SMA", "EMA", "WMA"),
+    "crossover": ("SMA", "EMA"),
+    "bollinger": ("Bolinger Band width", "Lower Bolinger", "BBPercentage"),
+    "supertrend": ("SUPERTREND",),
+    "super trend": ("SUPERTREND",),
+    "volume": ("Volume", "Volume series"),
+    "price": ("LTP",),
+    "premium": ("LTP",),
+    "stop loss": ("LTP", "PNL"),
+    "target": ("LTP", "PNL"),
+    "profit": ("PNL", "Max Profit"),
+    "loss": ("PNL",),
+    "open interest": ("Total Ol", "Max Ol Strike", "Max Ol Instrument"),
+    "implied volatility": ("Iv", "Atmiv"),
+    "iv": ("Iv", "Atmiv"),
+    "time": ("Now", "Hour", "Minute"),
+    "candle": ("OPEN", "HIGH", "LOW", "CLOSE"),
+    "doji": ("DRAGONFLY DOJI", "GRAVESTONE DOJI", "MORNINGDOJISTAR"),
+    "macd": ("MACD", "Macdhist", "Macdsignal"),
+    "stochastic": ("StochD", "Stochk"),
+}
+
+_WORD_RE = re.compile(r"[a-z0-9%+\-]+")
+
+
+def schema_version(schema):
+    """Stable content hash of a schema dict."""
+    payload = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text):
+    """Token count via tiktoken when installed, otherwise a BPE-like approximation."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return len(re.findall(r"[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]", text))
+
+
+def _normalize(text):
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _prompt_terms(prompt):
+    """(padded normalized prompt, its words, alias targets it mentions)."""
+    norm_prompt = f" {_normalize(prompt)} "
+    wanted = set()
+    for phrase, targets in KEYWORD_ALIASES.items():
+        if f" {phrase} " in norm_prompt:
+            wanted.update(targets)
+    return norm_prompt, set(norm_prompt.split()), wanted
+
+
+def _match_entries(entries, terms):
+    norm_prompt, prompt_words, wanted = terms
+    matches = []
+    for value, norm_value, words in entries:
+        if not norm_value:
+            continue
+        if value in wanted or f" {norm_value} " in norm_prompt:
+            matches.append(value)
+        elif len(norm_value) > 3 and words <= prompt_words:
+            matches.append(value)
+    return matches
+
+
+def _index_entries(values):
+    entries = []
+    for value in values:
+        norm_value = _normalize(value)
+        entries.append((value, norm_value, frozenset(norm_value.split())))
+    return tuple(entries)
+
+
+def match_keywords(values, prompt):
+    """Returns the catalogue entries the prompt plausibly refers to, in catalogue order."""
+    return _match_entries(_index_entries(values), _prompt_terms(prompt))
+
+
+def match_index(index, prompt):
+    """`match_keywords` for every enum of a keyword_index: ((def_name, prop, matches), ...)."""
+    terms = _prompt_terms(prompt)
+    return tuple((def_name, prop, _match_entries(entries, terms)) for def_name, prop, entries in index)
+
+
+def keyword_index(schema):
+    """
+    The prunable enums with every value normalized up front, so matching a
+    prompt only normalizes the prompt: ((def_name, prop, entries), ...).
+    """
+    definitions = schema.get("definitions", {})
+    index = []
+    for def_name, prop in PRUNABLE_ENUMS:
+        enum = definitions.get(def_name, {}).get("properties", {}).get(prop, {}).get("enum")
+        if enum:
+            index.append((def_name, prop, _index_entries(enum)))
+    return tuple(index)
+
+
+_indexes = {}
+
+
+def get_keyword_index(schema, version=None):
+    """`keyword_index`, built once per schema version."""
+    version = version or schema_version(schema)
+    index = _indexes.get(version)
+    if index is None:
+        index = _indexes[version] = keyword_index(schema)
+    return index
+
+
+def select_enums(schema, prompt, index=None):
+    """
+    Picks the subset of each prunable enum to keep for `prompt`.
+    Returns a hashable selection, or None when the full schema should be used.
+    """
+    if not prompt or not prompt.strip():
+        return None
+
+    terms = _prompt_terms(prompt)
+    selection = []
+    for def_name, prop, entries in index if index is not None else keyword_index(schema):
+        matched = set(_match_entries(entries, terms))
+        matched.update(CORE_KEYWORDS.get(prop, ()))
+        selection.append((def_name, tuple(value for value, _, _ in entries if value in matched)))
+
+    return tuple(selection) if selection else None
+
+
+def strip_descriptions(node):
+    """Drops prose the model does not need to produce valid output."""
+    if isinstance(node, dict):
+        return {
+            k: strip_descriptions(v)
+            for k, v in node.items()
+            if k not in ("description", "examples", "$schema")
+        }
+    if isinstance(node, list):
+        return [strip_descriptions(v) for v in node]
+    return node
+
+
+def _ref_name(node):
+    if isinstance(node, dict) and len(node) == 1 and isinstance(node.get("$ref"), str):
+        ref = node["$ref"]
+        if ref.startswith("#/definitions/"):
+            return ref[len("#/definitions/"):]
+    return None
+
+
+def _collect_refs(node, counts):
+    name = _ref_name(node)
+    if name:
+        counts[name] += 1
+    elif isinstance(node, dict):
+        for v in node.values():
+            _collect_refs(v, counts)
+    elif isinstance(node, list):
+        for v in node:
+            _collect_refs(v, counts)
+    return counts
+
+
+def resolve_refs(schema):
+    """
+    Inlines definitions referenced exactly once and drops unused ones.
+    Shared or self-recursive definitions stay as $ref so the output stays finite.
+    """
+    definitions = schema.get("definitions", {})
+    if not definitions:
+        return schema
+
+    body = {k: v for k, v in schema.items() if k != "definitions"}
+    counts = _collect_refs(schema, Counter())
+    inline = {name for name, count in counts.items() if count == 1 and name in definitions}
+
+    def expand(node, stack):
+        name = _ref_name(node)
+        if name:
+            if name in inline and name not in stack:
+                return expand(definitions[name], stack + (name,))
+            return node
+        if isinstance(node, dict):
+            return {k: expand(v, stack) for k, v in node.items()}
+        if isinstance(node, list):
+            return [expand(v, stack) for v in node]
+        return node
+
+    resolved = expand(body, ())
+    kept = {}
+    pending = set(_collect_refs(resolved, Counter()))
+    while pending:
+        name = pending.pop()
+        if name in kept or name not in definitions:
+            continue
+        kept[name] = expand(definitions[name], (name,))
+        pending.update(_collect_refs(kept[name], Counter()))
+
+    if kept:
+        resolved["definitions"] = {name: kept[name] for name in definitions if name in kept}
+    return resolved
+
+
+def _drop_refs(node, dropped):
+    """Removes oneOf branches pointing at dropped definitions."""
+    if isinstance(node, dict):
+        out = {}
+        for k, v in node.items():
+            if k == "oneOf" and isinstance(v, list):
+                v = [b for b in v if _ref_name(b) not in dropped]
+            out[k] = _drop_refs(v, dropped)
+        return out
+    if isinstance(node, list):
+        return [_drop_refs(v, dropped) for v in node]
+    return node
+
+
+def prune_schema(schema, selection):
+    """Applies an enum selection from `select_enums` to a copy of the schema."""
+    pruned = copy.deepcopy(schema)
+    definitions = pruned.get("definitions", {})
+    dropped = set()
+
+    for def_name, values in selection:
+        prop = dict(PRUNABLE_ENUMS)[def_name]
+        if values:
+            definitions[def_name]["properties"][prop]["enum"] = list(values)
+        else:
+            # Nothing in this catalogue is relevant: remove it as an operand choice
+            dropped.add(def_name)
+            del definitions[def_name]
+
+    return _drop_refs(pruned, dropped) if dropped else pruned
+
+
+_registered = {}
+
+
+@lru_cache(maxsize=256)
+def _compile(version, selection):
+    schema = _registered[version]
+    if selection is not None:
+        schema = prune_schema(schema, selection)
+    schema = resolve_refs(strip_descriptions(schema))
+    return json.dumps(schema, separators=(",", ":"), ensure_ascii=False)
+
+
+def compile_schema(schema, prompt=None, prune=True, version=None):
+    """
+    Compact JSON rendering of `schema` for the system prompt.
+    With a prompt, the large keyword enums are cut down to what the prompt
+    plausibly uses; without one (or prune=False) the full catalogue is sent.
+    Results are cached per schema version and enum selection.
+    """
+    version = version or schema_version(schema)
+    _registered.setdefault(version, schema)
+    selection = select_enums(schema, prompt, get_keyword_index(schema, version)) if prune else None
+    return _compile(version, selection)
+
+
+@lru_cache(maxsize=256)
+def count_tokens(compiled):
+    """`estimate_tokens` for compiled schema text, which repeats across requests."""
+    return estimate_tokens(compiled)
+
+
+def report(schema_dir=SCHEMA_DIR, sample_prompt="Buy NIFTY ATM call when RSI 14 on 5m crosses above 60"):
+    """Prints token counts before/after compilation for every schema file."""
+    print(f"{'schema':<34} {'repr':>8} {'compiled':>9} {'pruned':>8} {'saved':>6}")
+    for name in sorted(os.listdir(schema_dir)):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(schema_dir, name)
+        try:
+            with open(path, "r") as f:
+                schema = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"{name:<34} skipped ({e.__class__.__name__})")
+            continue
+
+        before = estimate_tokens(f"{schema}")
+        full = estimate_tokens(compile_schema(schema, prune=False))
+        pruned = estimate_tokens(compile_schema(schema, sample_prompt))
+        saved = 1 - pruned / before if before else 0
+        print(f"{name:<34} {before:>8} {full:>9} {pruned:>8} {saved:>6.0%}")
+
+
+if __name__ == "__main__":
+    report(*sys.argv[1:2])
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+
+from schema_compiler import SCHEMA_DIR, compile_schema, count_tokens, get_keyword_index
+
+# Process-wide default; callers may pick another per request
+DEFAULT_SCHEMA = os.getenv("SCHEMA_NAME", "test_schemav3.json")
+
+
+class SchemaLoadError(RuntimeError):
+    """Raised when a schema file is missing, empty or not a JSON object."""
+
+
+class SchemaEntry:
+    """
+    One parsed schema file and the prompt artifacts derived from it.
+    `version` is the SHA-256 of the file bytes (same as llm_cache.file_sha256).
+    """
+    __slots__ = ("name", "path", "stamp", "version", "schema", "tokens", "keyword_index", "prompt_text")
+
+    def __init__(self, name, path, stamp, version, schema, tokens, keyword_index, prompt_text):
+        self.name = name
+        self.path = path
+        self.stamp = stamp
+        self.version = version
+        self.schema = schema
+        self.tokens = tokens
+        self.keyword_index = keyword_index
+        self.prompt_text = prompt_text
+
+
+class SchemaRegistry:
+    """
+    Schemas under `schema_dir`, each parsed once. A lookup costs one stat():
+    a changed mtime or size re-hashes the file, and only changed content is
+    parsed again and its artifacts rebuilt. `prompt_builder(compiled)` turns
+    the full compiled schema into the prompt text stored on the entry.
+    `active` names the schema returned when no name is given.
+    """
+
+    def __init__(self, schema_dir=SCHEMA_DIR, active=DEFAULT_SCHEMA, prompt_builder=None):
+        self.schema_dir = schema_dir
+        self.prompt_builder = prompt_builder
+        self.active = active
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._by_version = {}
+        self._failed = {} # path -> (stamp, error) of a file that did not load
+
+    def resolve(self, name):
+        """Bare file names live in `schema_dir`; anything with a directory is a path."""
+        if os.path.dirname(name):
+            return os.path.normpath(name)
+        return os.path.normpath(os.path.join(self.schema_dir, name))
+
+    def get(self, name=None):
+        path = self.resolve(name or self.active)
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            raise SchemaLoadError(f"{path}: {e.strerror}") from e
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        entry = self._entries.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.stamp == stamp:
+                return entry
+            return self._load(path, stamp, entry)
+
+    def _load(self, path, stamp, entry):
+        failed = self._failed.get(path)
+        if failed is not None and failed[0] == stamp:
+            raise SchemaLoadError(failed[1])
+        with open(path, "rb") as f:
+            data = f.read()
+        version = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry.version == version:
+            # Touched but not edited: keep every artifact
+            entry.stamp = stamp
+            return entry
+
+        try:
+            schema = json.loads(data)
+            error = None if isinstance(schema, dict) else "top level is not a JSON object"
+        except ValueError as e:
+            error = f"not valid JSON ({e})"
+        if error:
+            self._failed[path] = (stamp, f"{path}: {error}")
+            raise SchemaLoadError(self._failed[path][1])
+        self._failed.pop(path, None)
+
+        compiled = compile_schema(schema, prune=False, version=version)
+        new_entry = SchemaEntry(
+            name=os.path.basename(path),
+            path=path,
+            stamp=stamp,
+            version=version,
+            schema=schema,
+            tokens=count_tokens(compiled),
+            keyword_index=get_keyword_index(schema, version),
+            prompt_text=self.prompt_builder(compiled) if self.prompt_builder else compiled,
+        )
+        if entry is not None:
+            self._by_version.pop(entry.version, None)
+        self._entries[path] = new_entry
+        self._by_version[version] = new_entry
+        self.loads += 1
+        return new_entry
+
+    def by_version(self, version):
+        """Entry whose file content hashes to `version`, if it is loaded."""
+        return self._by_version.get(version)
+
+    def names(self):
+        """Schema files in `schema_dir`, loadable or not."""
+        return sorted(name for name in os.listdir(self.schema_dir) if name.endswith(".json"))
+
+    def available(self):
+        """Names of the schema files that load."""
+        names = []
+        for name in self.names():
+            try:
+                self.get(name)
+            except SchemaLoadError:
+                continue
+            names.append(name)
+        return names
@@ -0,0 +1,361 @@
+import re
+import threading
+from collections import namedtuple
+
+ValidationIssue = namedtuple("ValidationIssue", ["pointer", "message"])
+
+MAX_REPORTED_ISSUES = 20
+
+_TYPE_CHECKS = {
+    "object": "isinstance({v}, dict)",
+    "array": "isinstance({v}, list)",
+    "string": "isinstance({v}, str)",
+    "boolean": "isinstance({v}, bool)",
+    "null": "{v} is None",
+    "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+    "integer": "((isinstance({v}, int) and not isinstance({v}, bool)) or (isinstance({v}, float) and {v}.is_integer()))",
+}
+
+
+def escape_pointer(key):
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def _ref_name(ref):
+    if not ref.startswith("#/definitions/"):
+        raise ValueError(f"Unsupported $ref {ref!r}")
+    return ref[len("#/definitions/"):]
+
+
+_TYPE_PREDICATES = {
+    name: eval(f"lambda v: {check.format(v='v')}") for name, check in _TYPE_CHECKS.items()
+}
+
+
+class _Compiler:
+    """Turns a draft-07 subset into Python source: one function per definition and oneOf branch."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.definitions = schema.get("definitions", {})
+        self.constants = {}
+        self.functions = []
+        self.def_names = {}
+        self.counter = 0
+
+    def const(self, value, prefix="_c"):
+        self.counter += 1
+        name = f"{prefix}{self.counter}"
+        self.constants[name] = value
+        return name
+
+    def compile(self):
+        root = self.function(self.schema, "validate_root")
+        namespace = {"_escape": escape_pointer, **self.constants}
+        source = "\n\n".join(self.functions)
+        exec(compile(source, "<schema_validator>", "exec"), namespace)
+        return namespace[root], source
+
+    def function(self, node, name=None):
+        if name is None:
+            self.counter += 1
+            name = f"_f{self.counter}"
+        body = []
+        self.emit(node, "v", "p", body, 1, 0)
+        self.functions.append(f"def {name}(v, p, e):\n" + ("\n".join(body) if body else "    pass"))
+        return name
+
+    def definition(self, ref):
+        name = _ref_name(ref)
+        if name not in self.def_names:
+            fname = f"_def_{re.sub(r'[^0-9a-zA-Z_]', '_', name)}"
+            self.def_names[name] = fname
+            self.function(self.definitions[name], fname)
+        return self.def_names[name]
+
+    def emit(self, node, v, p, out, indent, depth):
+        pad = "    " * indent
+        if node is True or node == {}:
+            return
+        if node is False:
+            out.append(f"{pad}e.append(({p}, 'no value is allowed here'))")
+            return
+
+        if "$ref" in node:
+            out.append(f"{pad}{self.definition(node['$ref'])}({v}, {p}, e)")
+
+        types = node.get("type")
+        if types is not None:
+            types = [types] if isinstance(types, str) else types
+            check = " or ".join(_TYPE_CHECKS[t].format(v=v) for t in types)
+            out.append(f"{pad}if not ({check}):")
+            out.append(f"{pad}    e.append(({p}, {('expected ' + ' or '.join(types))!r}))")
+
+        if "const" in node:
+            c = self.const(node["const"])
+            out.append(f"{pad}if {v} != {c}:")
+            out.append(f"{pad}    e.append(({p}, 'must be ' + repr({c})))")
+
+        if "enum" in node:
+            values = node["enum"]
+            if all(isinstance(x, str) for x in values):
+                c = self.const(frozenset(values))
+                out.append(f"{pad}if not isinstance({v}, str) or {v} not in {c}:")
+            else:
+                c = self.const(list(values))
+                out.append(f"{pad}if {v} not in {c}:")
+            out.append(f"{pad}    e.append(({p}, 'not one of the allowed values: ' + repr({v})))")
+
+        if "pattern" in node:
+            c = self.const(re.compile(node["pattern"]))
+            out.append(f"{pad}if isinstance({v}, str) and not {c}.search({v}):")
+            out.append(f"{pad}    e.append(({p}, {('does not match ' + node['pattern'])!r}))")
+
+        for keyword, op in (("minimum", "<"), ("maximum", ">")):
+            if keyword in node:
+                out.append(f"{pad}if {_TYPE_CHECKS['number'].format(v=v)} and {v} {op} {node[keyword]!r}:")
+                out.append(f"{pad}    e.append(({p}, {(keyword + ' is ' + repr(node[keyword]))!r}))")
+
+        self.emit_object(node, v, p, out, indent, depth)
+        self.emit_array(node, v, p, out, indent, depth)
+
+        for branch in node.get("allOf", ()):
+            self.emit(branch, v, p, out, indent, depth)
+        if "anyOf" in node:
+            self.emit_choice(node["anyOf"], v, p, out, indent, exactly_one=False)
+        if "oneOf" in node:
+            self.emit_choice(node["oneOf"], v, p, out, indent, exactly_one=True)
+
+    def emit_object(self, node, v, p, out, indent, depth):
+        props = node.get("properties", {})
+        required = node.get("required", ())
+        additional = node.get("additionalProperties", True)
+        if not props and not required and additional is True:
+            return
+
+        pad = "    " * indent
+        out.append(f"{pad}if isinstance({v}, dict):")
+        inner = pad + "    "
+        for key in required:
+            out.append(f"{inner}if {key!r} not in {v}:")
+            out.append(f"{inner}    e.append(({p}, {('missing required property ' + repr(key))!r}))")
+
+        child = f"v{depth + 1}"
+        for key, sub in props.items():
+            if sub is True or sub == {}:
+                continue
+            out.append(f"{inner}{child} = {v}.get({key!r}, _MISSING)")
+            out.append(f"{inner}if {child} is not _MISSING:")
+            self.emit(sub, child, f"{p} + {('/' + escape_pointer(key))!r}", out, indent + 2, depth + 1)
+
+        if additional is not True:
+            known = self.const(frozenset(props))
+            out.append(f"{inner}for k{depth}, {child} in {v}.items():")
+            out.append(f"{inner}    if k{depth} in {known}:")
+            out.append(f"{inner}        continue")
+            if additional is False:
+                out.append(f"{inner}    e.append(({p}, 'unexpected property ' + repr(k{depth})))")
+            else:
+                self.emit(additional, child, f"{p} + '/' + _escape(k{depth})", out, indent + 2, depth + 1)
+
+    def emit_array(self, node, v, p, out, indent, depth):
+        items = node.get("items")
+        min_items = node.get("minItems")
+        max_items = node.get("maxItems")
+        if items is None and min_items is None and max_items is None:
+            return
+
+        pad = "    " * indent
+        out.append(f"{pad}if isinstance({v}, list):")
+        inner = pad + "    "
+        if min_items is not None:
+            out.append(f"{inner}if len({v}) < {min_items}:")
+            out.append(f"{inner}    e.append(({p}, 'expected at least {min_items} item(s)'))")
+        if max_items is not None:
+            out.append(f"{inner}if len({v}) > {max_items}:")
+            out.append(f"{inner}    e.append(({p}, 'expected at most {max_items} item(s)'))")
+        if isinstance(items, dict):
+            child = f"v{depth + 1}"
+            out.append(f"{inner}for i{depth}, {child} in enumerate({v}):")
+            self.emit(items, child, f"{p} + '/' + str(i{depth})", out, indent + 2, depth + 1)
+
+    def emit_choice(self, branches, v, p, out, indent, exactly_one):
+        """
+        Branch errors are collected separately; when nothing matches, the
+        errors of the branch sharing most property names with the instance
+        are reported, since that is the shape the author was aiming for.
+        """
+        pad = "    " * indent
+        funcs = self.const(tuple(self.function(b) for b in branches), "_branches")
+        keysets = self.const(tuple(frozenset(self.properties_of(b)) for b in branches), "_keys")
+        self.functions.append(f"{funcs} = ({', '.join(self.constants.pop(funcs))},)")
+        out.append(f"{pad}_choose({v}, {p}, e, {funcs}, {keysets}, {exactly_one})")
+
+    def properties_of(self, node):
+        while isinstance(node, dict) and "$ref" in node:
+            node = self.definitions[_ref_name(node["$ref"])]
+        return node.get("properties", {}) if isinstance(node, dict) else {}
+
+
+_MISSING = object()
+
+
+def _choose(v, p, e, funcs, keysets, exactly_one):
+    matched = 0
+    best = None
+    best_score = None
+    keys = v.keys() if isinstance(v, dict) else ()
+    for func, keyset in zip(funcs, keysets):
+        errors = []
+        func(v, p, errors)
+        if not errors:
+            matched += 1
+            if not exactly_one:
+                return
+            continue
+        score = (-len(keyset.intersection(keys)), len(errors))
+        if best_score is None or score < best_score:
+            best, best_score = errors, score
+    if matched == 0:
+        e.extend(best)
+    elif exactly_one and matched > 1:
+        e.append((p, f"matches {matched} alternatives, expected exactly one"))
+
+
+class CompiledValidator:
+    """
+    Validator generated once per schema: every keyword check is emitted as
+    straight-line Python, so validating an instance does no schema lookups.
+    """
+
+    def __init__(self, schema):
+        compiler = _Compiler(schema)
+        compiler.constants["_MISSING"] = _MISSING
+        compiler.constants["_choose"] = _choose
+        self._validate, self.source = compiler.compile()
+
+    def validate(self, instance):
+        errors = []
+        self._validate(instance, "", errors)
+        return [ValidationIssue(pointer, message) for pointer, message in errors]
+
+    def is_valid(self, instance):
+        errors = []
+        self._validate(instance, "", errors)
+        return not errors
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_validator(schema, version):
+    """Compiled validator for a schema version (e.g. the schema file's hash)."""
+    validator = _validators.get(version)
+    if validator is None:
+        with _validators_lock:
+            validator = _validators.get(version)
+            if validator is None:
+                validator = _validators[version] = CompiledValidator(schema)
+    return validator
+
+
+def interpret(schema, instance, node=None, pointer="", errors=None):
+    """
+    Reference validator that walks the schema on every call.
+    Same keywords and messages as CompiledValidator, though issues may come
+    out in a different order; kept for benchmarking and cross-checks.
+    """
+    if errors is None:
+        errors = []
+    node = schema if node is None else node
+    definitions = schema.get("definitions", {})
+    if node is True or node == {}:
+        return errors
+    if node is False:
+        errors.append((pointer, "no value is allowed here"))
+        return errors
+
+    if "$ref" in node:
+        interpret(schema, instance, definitions[_ref_name(node["$ref"])], pointer, errors)
+    types = node.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else types
+        if not any(_TYPE_PREDICATES[t](instance) for t in types):
+            errors.append((pointer, "expected " + " or ".join(types)))
+    if "const" in node and instance != node["const"]:
+        errors.append((pointer, "must be " + repr(node["const"])))
+    if "enum" in node and instance not in node["enum"]:
+        errors.append((pointer, "not one of the allowed values: " + repr(instance)))
+    if "pattern" in node and isinstance(instance, str) and not re.search(node["pattern"], instance):
+        errors.append((pointer, "does not match " + node["pattern"]))
+    if _TYPE_PREDICATES["number"](instance):
+        if "minimum" in node and instance < node["minimum"]:
+            errors.append((pointer, "minimum is " + repr(node["minimum"])))
+        if "maximum" in node and instance > node["maximum"]:
+            errors.append((pointer, "maximum is " + repr(node["maximum"])))
+
+    if isinstance(instance, dict):
+        for key in node.get("required", ()):
+            if key not in instance:
+                errors.append((pointer, "missing required property " + repr(key)))
+        props = node.get("properties", {})
+        additional = node.get("additionalProperties", True)
+        for key, value in instance.items():
+            child = pointer + "/" + escape_pointer(key)
+            if key in props:
+                interpret(schema, value, props[key], child, errors)
+            elif additional is False:
+                errors.append((pointer, "unexpected property " + repr(key)))
+            elif additional is not True:
+                interpret(schema, value, additional, child, errors)
+
+    if isinstance(instance, list):
+        if "minItems" in node and len(instance) < node["minItems"]:
+            errors.append((pointer, f"expected at least {node['minItems']} item(s)"))
+        if "maxItems" in node and len(instance) > node["maxItems"]:
+            errors.append((pointer, f"expected at most {node['maxItems']} item(s)"))
+        if isinstance(node.get("items"), dict):
+            for i, value in enumerate(instance):
+                interpret(schema, value, node["items"], f"{pointer}/{i}", errors)
+
+    for branch in node.get("allOf", ()):
+        interpret(schema, instance, branch, pointer, errors)
+    for key, exactly_one in (("anyOf", False), ("oneOf", True)):
+        if key not in node:
+            continue
+        matched, best, best_score = 0, None, None
+        for branch in node[key]:
+            branch_errors = interpret(schema, instance, branch, pointer, [])
+            if not branch_errors:
+                matched += 1
+                continue
+            target = branch
+            while isinstance(target, dict) and "$ref" in target:
+                target = definitions[_ref_name(target["$ref"])]
+            keys = instance.keys() if isinstance(instance, dict) else ()
+            score = (-len(set(target.get("properties", {})).intersection(keys)), len(branch_errors))
+            if best_score is None or score < best_score:
+                best, best_score = branch_errors, score
+        if matched == 0:
+            errors.extend(best)
+        elif exactly_one and matched > 1:
+            errors.append((pointer, f"matches {matched} alternatives, expected exactly one"))
+    return errors
+
+
+def issue_lines(issues, limit=MAX_REPORTED_ISSUES):
+    """One "- pointer: message" line per issue, for re-ask prompts."""
+    lines = [f"- {issue.pointer or '/'}: {issue.message}" for issue in issues[:limit]]
+    if len(issues) > limit:
+        lines.append(f"- ... and {len(issues) - limit} more")
+    return "\n".join(lines)
+
+
+def correction_message(issues, limit=MAX_REPORTED_ISSUES):
+    """Targeted re-ask listing exactly which parts of the output broke the schema."""
+    return (
+        "Your previous JSON does not conform to the schema:\n"
+        + issue_lines(issues, limit)
+        + "\nFix only these problems and return the complete corrected JSON, nothing else."
+    )
@@ -0,0 +1,333 @@
+import json
+import os
+import random
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from fast_path import STOPWORDS, UNDERLYINGS, time_str
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_ENTRIES", 2048))
+# Estimated Jaccard a candidate needs; the structural check afterwards is exact,
+# so LSH is tuned for recall (32 bands x 2 rows: ~95% of pairs at 0.3 collide)
+DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.5))
+NUM_PERM = 64
+BANDS = 32
+_PRIME = (1 << 61) - 1
+GRAM_CACHE_SIZE = 50000
+
+# Matched in order on the lower-cased prompt; earlier patterns consume their span
+_TIME = r"(\d{1,2})[:.](\d{2})"
+ENTITY_PATTERNS = (
+    ("time", re.compile(rf"(?<![\w.]){_TIME}(?![\w.])")),
+    ("offset", re.compile(r"\batm\s*([+-])\s*(\d+)(?![\w.])")),
+    ("width", re.compile(r"(?:±|\+\s*/\s*-|\+\s*-|-\s*/?\s*\+)\s*(\d+)(?![\w.])")),
+    ("steps", re.compile(r"(?<![\w.])(\d+)\s+strikes?\b")),
+    ("lots", re.compile(r"(?<![\w.])(\d+)\s*lots?\b")),
+    ("qty", re.compile(r"\b(?:qty|quantity)\s*(?:of\s*)?(\d+)(?![\w.])")),
+    ("symbol", re.compile(r"\b(bank\s*nifty|fin\s*nifty|midcp\s*nifty|nifty|sensex)\b")),
+    ("number", re.compile(r"(?<![\w.])(\d+(?:\.\d+)?)(?![\w.])")),
+)
+_TOKEN_RE = re.compile(r"<[a-z]+>|[a-z0-9]+")
+_CLOCK_RE = re.compile(r"^(\d{1,2}):(\d{2})(:\d{2})?$")
+# Exchanges rewritten along with the symbol (fast_path lists SENSEX derivatives on BSE)
+_INDEX_EXCHANGES = {"NSE", "NFO", "BSE"}
+
+
+class SemanticHit:
+    __slots__ = ("strategy", "source_prompt", "similarity", "substitutions")
+
+    def __init__(self, strategy, source_prompt, similarity, substitutions):
+        self.strategy = strategy
+        self.source_prompt = source_prompt
+        self.similarity = similarity
+        self.substitutions = substitutions
+
+
+class _Entry:
+    __slots__ = ("prompt", "version", "structure", "entities", "signature", "document")
+
+    def __init__(self, prompt, version, structure, entities, signature, document):
+        self.prompt = prompt
+        self.version = version
+        self.structure = structure
+        self.entities = entities
+        self.signature = signature
+        self.document = document
+
+
+def _entity_value(kind, m):
+    if kind == "time":
+        return time_str(*m.group(1, 2))
+    if kind == "offset":
+        return int(m.group(2)) * (1 if m.group(1) == "+" else -1)
+    if kind == "symbol":
+        return re.sub(r"\s+", "", m.group(1)).upper()
+    if kind == "number":
+        return float(m.group(1)) if "." in m.group(1) else int(m.group(1))
+    return int(m.group(1))
+
+
+def analyze(prompt):
+    """
+    Splits a prompt into its template tokens (entities replaced by
+    `<kind>` placeholders) and the [(kind, value)] entities, in order.
+    """
+    text = " ".join((prompt or "").lower().split())
+    consumed = [False] * len(text)
+    spans = []
+    for kind, pattern in ENTITY_PATTERNS:
+        for m in pattern.finditer(text):
+            if any(consumed[m.start():m.end()]):
+                continue
+            value = _entity_value(kind, m)
+            if value is None: # e.g. 27:90 is not a time; leave it as text
+                continue
+            consumed[m.start():m.end()] = [True] * (m.end() - m.start())
+            spans.append((m.start(), m.end(), kind, value))
+    spans.sort()
+
+    parts = []
+    last = 0
+    for start, end, kind, _ in spans:
+        parts.append(text[last:start])
+        parts.append(f" <{kind}> ")
+        last = end
+    parts.append(text[last:])
+    tokens = _TOKEN_RE.findall("".join(parts))
+    return tokens, [(kind, value) for _, _, kind, value in spans]
+
+
+def _shingles(tokens):
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+def _walk(node, parent_key=None):
+    """Yields (container, key, value, parent_key) for every leaf and dict."""
+    stack = [(node, parent_key)]
+    while stack:
+        node, parent_key = stack.pop()
+        items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for key, value in items:
+            yield node, key, value, parent_key
+            if isinstance(value, (dict, list)):
+                stack.append((value, key if isinstance(node, dict) else parent_key))
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _field_class(container, key, parent_key):
+    """Which entity kinds may rewrite this leaf."""
+    if key == "offset" and "selection_method" in container:
+        return "strike"
+    if key == "value" and parent_key == "quantity_setup":
+        return "quantity"
+    if key in ("offset", "set_index") or (key == "value" and parent_key == "expiry_config"):
+        return None
+    return "number"
+
+
+_KIND_FIELDS = {"offset": "strike", "width": "strike", "steps": "strike", "lots": "quantity", "qty": "quantity", "number": "number"}
+
+
+def substitute(document, old_entities, new_entities):
+    """
+    Rewrites `document` in place so the values of `old_entities` become
+    those of `new_entities` (same kinds, same order). Returns the list of
+    substitutions, or None when a change cannot be applied unambiguously.
+    """
+    mappings = {"strike": {}, "quantity": {}, "number": {}, "time": {}, "symbol": {}}
+    for (kind, old), (_, new) in zip(old_entities, new_entities):
+        field = _KIND_FIELDS.get(kind, kind)
+        pairs = [(old, new)]
+        if kind in ("width", "steps"):
+            # Two-sided widths and OTM steps appear as +n and -n strike offsets
+            pairs.append((-old, -new))
+        for a, b in pairs:
+            if mappings[field].setdefault(a, b) != b:
+                return None
+
+    changes = {field: {a: b for a, b in mapping.items() if a != b} for field, mapping in mappings.items()}
+    if not any(changes.values()):
+        return []
+    applied = set()
+    strike_keys = {a for a in changes["strike"]}
+
+    for container, key, value, parent_key in list(_walk(document)):
+        if isinstance(value, dict) and changes["symbol"] and isinstance(value.get("symbol_token"), str):
+            _substitute_symbol(value, changes["symbol"], applied)
+            continue
+        if _is_number(value):
+            field = _field_class(container, key, parent_key)
+            mapping = changes.get(field) if field else None
+            if mapping and value in mapping:
+                container[key] = mapping[value]
+                applied.add((field, value))
+        elif isinstance(value, str) and changes["time"]:
+            m = _CLOCK_RE.match(value)
+            if m:
+                clock = f"{int(m.group(1)):02d}:{m.group(2)}"
+                if clock in changes["time"]:
+                    container[key] = changes["time"][clock] + (m.group(3) or "")
+                    applied.add(("time", clock))
+
+    substitutions = []
+    for field, mapping in changes.items():
+        for old, new in mapping.items():
+            if (field, old) not in applied:
+                if field == "strike" and (-old in strike_keys) and (field, -old) in applied:
+                    continue # only one side of a ±n pair was used (e.g. a single OTM leg)
+                return None # the document does not carry this value, so the change would be lost
+            substitutions.append((field, old, new))
+    return substitutions
+
+
+def _substitute_symbol(instrument, mapping, applied):
+    token = instrument["symbol_token"]
+    for old, new in mapping.items():
+        new_exchange, new_underlying = UNDERLYINGS[new]
+        old_underlying = UNDERLYINGS[old][1]
+        if token not in (old, old_underlying):
+            continue
+        is_index = instrument.get("instrument_type", "EQUITY") == "EQUITY"
+        # Keep the token's form; SENSEX is both symbol and index name, so the type decides
+        if token == old_underlying and (is_index or token != old):
+            instrument["symbol_token"] = new_underlying
+        else:
+            instrument["symbol_token"] = new
+        if instrument.get("exchange") in _INDEX_EXCHANGES:
+            if is_index:
+                instrument["exchange"] = new_exchange
+            else:
+                instrument["exchange"] = "BSE" if new == "SENSEX" else "NFO"
+        applied.add(("symbol", old))
+        return
+
+
+class SemanticCache:
+    """
+    In-process near-duplicate cache for converted prompts.
+    Prompts are reduced to a template with typed entity placeholders and
+    indexed by MinHash over its word 1/2-grams with banded LSH. A candidate
+    is used only when its stopword-free template is identical (so
+    "above"/"below" never match), its entities can all be substituted into
+    the stored JSON, and the result passes the schema validator.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        self._gram_cache = {}
+        self.rows = num_perm // bands
+        self.bands = bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self.stats = {"lookups": 0, "hits": 0, "no_candidate": 0, "not_substitutable": 0, "invalid": 0, "entries": 0}
+
+    def _gram_hashes(self, gram):
+        # Template grams repeat across prompts, so their permuted hashes are kept
+        hashes = self._gram_cache.get(gram)
+        if hashes is None:
+            if len(self._gram_cache) >= GRAM_CACHE_SIZE:
+                self._gram_cache.clear()
+            h = zlib.crc32(gram.encode("utf-8"))
+            hashes = self._gram_cache[gram] = tuple((a * h + b) % _PRIME for a, b in self._perms)
+        return hashes
+
+    def signature(self, tokens):
+        return tuple(map(min, zip(*map(self._gram_hashes, _shingles(tokens)))))
+
+    def _band_keys(self, version, signature):
+        rows = self.rows
+        return [(version, i, signature[i * rows:(i + 1) * rows]) for i in range(self.bands)]
+
+    def add(self, prompt, strategy, schema_version):
+        tokens, entities = analyze(prompt)
+        if not tokens:
+            return
+        signature = self.signature(tokens)
+        structure = tuple(t for t in tokens if t not in STOPWORDS)
+        entry = _Entry(prompt, schema_version, structure, entities, signature, json.dumps(strategy))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            for key in self._band_keys(schema_version, signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, old = self._entries.popitem(last=False)
+                for key in self._band_keys(old.version, old.signature):
+                    bucket = self._buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(old_id)
+                        if not bucket:
+                            del self._buckets[key]
+            self.stats["entries"] = len(self._entries)
+
+    def _candidates(self, version, tokens, signature):
+        structure = tuple(t for t in tokens if t not in STOPWORDS)
+        with self._lock:
+            ids = set()
+            for key in self._band_keys(version, signature):
+                ids.update(self._buckets.get(key, ()))
+            entries = [(entry_id, self._entries[entry_id]) for entry_id in ids]
+        scored = []
+        for entry_id, entry in entries:
+            if entry.structure != structure:
+                continue
+            similarity = sum(x == y for x, y in zip(signature, entry.signature)) / len(signature)
+            if similarity >= self.threshold:
+                scored.append((similarity, entry_id, entry))
+        # Best match first; among equals the most recent
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        return scored
+
+    def lookup(self, prompt, schema_version, validator=None):
+        """Returns a SemanticHit whose strategy validates, or None."""
+        self.stats["lookups"] += 1
+        tokens, entities = analyze(prompt)
+        if not tokens:
+            self.stats["no_candidate"] += 1
+            return None
+        candidates = self._candidates(schema_version, tokens, self.signature(tokens))
+        if not candidates:
+            self.stats["no_candidate"] += 1
+            return None
+
+        outcome = "not_substitutable"
+        for similarity, entry_id, entry in candidates:
+            document = json.loads(entry.document)
+            substitutions = substitute(document, entry.entities, entities)
+            if substitutions is None:
+                continue
+            if validator is not None and validator.validate(document):
+                outcome = "invalid"
+                continue
+            with self._lock:
+                if entry_id in self._entries:
+                    self._entries.move_to_end(entry_id)
+            self.stats["hits"] += 1
+            return SemanticHit(document, entry.prompt, similarity, substitutions)
+        self.stats[outcome] += 1
+        return None
+
+    def hit_rate(self):
+        lookups = self.stats["lookups"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.stats["entries"] = 0
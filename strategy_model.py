@@ -0,0 +1,308 @@
+import sys
+import weakref
+
+from json_to_yaml import (
+    CONDITION_INDENT, DIALECTS, LineWriter, detect_schema_version, format_operand, set_header_lines, write_condition_tree,
+)
+
+_intern = sys.intern
+
+
+def _str(value):
+    return _intern(value) if type(value) is str else value
+
+
+class Instrument:
+    __slots__ = ("exchange", "symbol", "instrument_type", "expiry_type", "expiry_offset",
+                 "expiry_date", "strike_method", "strike_offset", "__weakref__")
+
+    def __init__(self, exchange, symbol, instrument_type, expiry_type=None, expiry_offset=None,
+                 expiry_date=None, strike_method=None, strike_offset=None):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.instrument_type = instrument_type
+        self.expiry_type = expiry_type
+        self.expiry_offset = expiry_offset
+        self.expiry_date = expiry_date
+        self.strike_method = strike_method
+        self.strike_offset = strike_offset
+
+
+class Operand:
+    """
+    One side of a comparison, or a standalone keyword condition.
+    kind: "indicator" | "keyword" | "pattern" | "literal" | "other"
+    `text` is the rendered form, computed once at load time.
+    `inputs` is the operand's inputs as sorted (key, value) pairs, nested dicts
+    and lists frozen the same way, so EMA(5) and EMA(50) stay distinct.
+    """
+    __slots__ = ("kind", "name", "timeframe", "position_offset", "instrument", "params", "value", "text",
+                 "inputs", "__weakref__")
+
+    def __init__(self, kind, name=None, timeframe=None, position_offset=None, instrument=None,
+                 params=None, value=None, text="", inputs=()):
+        self.kind = kind
+        self.name = name
+        self.timeframe = timeframe
+        self.position_offset = position_offset
+        self.instrument = instrument
+        self.params = params
+        self.value = value
+        self.text = text
+        self.inputs = inputs
+
+
+class Comparison:
+    __slots__ = ("left", "operator", "right")
+
+    def __init__(self, left, operator, right):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+
+class ConditionGroup:
+    """`children` may hold None for members that render as nothing."""
+    __slots__ = ("logic", "children")
+
+    def __init__(self, logic, children):
+        self.logic = logic
+        self.children = children
+
+
+class Position:
+    __slots__ = ("transaction_type", "product_type", "instrument", "quantity_type", "quantity", "text", "__weakref__")
+
+    def __init__(self, transaction_type, product_type, instrument, quantity_type, quantity, text):
+        self.transaction_type = transaction_type
+        self.product_type = product_type
+        self.instrument = instrument
+        self.quantity_type = quantity_type
+        self.quantity = quantity
+        self.text = text
+
+
+class Phase:
+    """`conditions` is None when the phase has none."""
+    __slots__ = ("phase_type", "conditions", "positions")
+
+    def __init__(self, phase_type, conditions, positions):
+        self.phase_type = phase_type
+        self.conditions = conditions
+        self.positions = positions
+
+
+class StrategySet:
+    __slots__ = ("set_index", "phases")
+
+    def __init__(self, set_index, phases):
+        self.set_index = set_index
+        self.phases = phases
+
+
+class Strategy:
+    __slots__ = ("version", "sets")
+
+    def __init__(self, version, sets):
+        self.version = version
+        self.sets = sets
+
+    def iter_phases(self):
+        for strategy_set in self.sets:
+            yield from strategy_set.phases
+
+    def iter_conditions(self):
+        """Comparisons and standalone keyword operands of every phase, depth first."""
+        stack = [phase.conditions for phase in self.iter_phases()]
+        stack.reverse()
+        while stack:
+            node = stack.pop()
+            if type(node) is ConditionGroup:
+                stack.extend(reversed(node.children))
+            elif node is not None:
+                yield node
+
+
+# Identical instruments, operands and positions are shared between strategies
+_instruments = weakref.WeakValueDictionary()
+_operands = weakref.WeakValueDictionary()
+_positions = weakref.WeakValueDictionary()
+
+
+def _flyweight(cache, key, factory):
+    try:
+        obj = cache.get(key)
+    except TypeError: # unhashable values (e.g. a list where a scalar belongs)
+        return factory()
+    if obj is None:
+        obj = factory()
+        cache[key] = obj
+    return obj
+
+
+def _frozen(value):
+    """Hashable form of a JSON value: dicts as sorted item tuples, lists as tuples."""
+    if isinstance(value, dict):
+        return tuple(sorted((_str(k), _frozen(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_frozen(v) for v in value)
+    return _str(value)
+
+
+def load_instrument(inst):
+    if not isinstance(inst, dict):
+        return None
+    expiry = inst.get("expiry_config") or {}
+    strike = inst.get("strike_config") or {}
+    fields = (
+        _str(inst.get("exchange")), _str(inst.get("symbol_token")), _str(inst.get("instrument_type")),
+        _str(expiry.get("type")), expiry.get("offset"), _str(expiry.get("date")),
+        _str(strike.get("selection_method")), strike.get("offset"),
+    )
+    return _flyweight(_instruments, fields, lambda: Instrument(*fields))
+
+
+_KINDS = (("function_name", "indicator"), ("keyword", "keyword"), ("pattern_name", "pattern"))
+
+
+def load_operand(op, version="v3"):
+    text = _intern(format_operand(op, version))
+    if type(op) is not dict:
+        return _flyweight(_operands, (type(op), op, text), lambda: Operand("literal", value=op, text=text))
+
+    kind, name = "other", None
+    for key, key_kind in _KINDS:
+        if op.get(key):
+            kind, name = key_kind, _str(op[key])
+            break
+    inputs = op.get("inputs")
+    instrument = load_instrument((isinstance(inputs, dict) and inputs.get("instrument")) or op.get("instrument"))
+    fields = (
+        kind, name, _str(op.get("timeframe")), op.get("position_offset"), instrument,
+        None, op.get("title", op.get("value")) if kind == "other" else None, text,
+        _frozen(inputs) if isinstance(inputs, dict) else (),
+    )
+
+    params = op.get("params")
+    if isinstance(params, dict):
+        # Parameterised operands (Set Runtime, Find Strike, ...) are not shared
+        loaded = {k: load_operand(v, version) if isinstance(v, dict) else _str(v) for k, v in params.items()}
+        return Operand(*fields[:5], loaded, *fields[6:])
+    return _flyweight(_operands, fields, lambda: Operand(*fields))
+
+
+def load_position(pos, format_position):
+    quantity = pos.get("quantity_setup") or {}
+    fields = (
+        _str(pos.get("transaction_type")), _str(pos.get("product_type")), load_instrument(pos.get("instrument")),
+        _str(quantity.get("type")), quantity.get("value"), _intern(format_position(pos)),
+    )
+    return _flyweight(_positions, fields, lambda: Position(*fields))
+
+
+def load_conditions(node, version="v3"):
+    """
+    Builds the condition tree with an explicit stack (no recursion limit).
+    Mirrors the renderer: GROUP, COMPARE, standalone keyword, anything else None.
+    """
+    standalone_keywords = DIALECTS[version].standalone_keywords
+    root = [None]
+    stack = [(node, root, 0)]
+    while stack:
+        node, parent, slot = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        c_type = node.get("condition_type")
+        if c_type == "GROUP":
+            members = node.get("conditions", [])
+            children = [None] * len(members)
+            parent[slot] = ConditionGroup(_str(node.get("connection_logic", "AND")), children)
+            stack.extend((member, children, i) for i, member in enumerate(members))
+        elif c_type == "COMPARE":
+            parent[slot] = Comparison(
+                load_operand(node.get("left"), version),
+                _str(node.get("operator")),
+                load_operand(node.get("right"), version),
+            )
+        elif standalone_keywords and "keyword" in node:
+            parent[slot] = load_operand(node, version)
+    return root[0]
+
+
+def _freeze(root):
+    # Children lists become tuples once filled in (smaller, and read-only by convention)
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if type(node) is ConditionGroup:
+            node.children = tuple(node.children)
+            stack.extend(node.children)
+    return root
+
+
+def load_strategy(json_data, version=None):
+    """Parses strategy JSON (v2 or v3) once into the slotted model."""
+    version = version or detect_schema_version(json_data)
+    dialect = DIALECTS[version]
+    sets = []
+    for strategy_set in json_data.get("strategy_sets", []):
+        phases = []
+        for phase in strategy_set.get("phases", []):
+            conditions = phase.get(dialect.conditions_key, {})
+            loaded = None
+            if conditions:
+                # Truthy but unrenderable conditions still print an (empty) conditions line
+                loaded = _freeze(load_conditions(conditions, version)) or ConditionGroup("AND", ())
+            phases.append(Phase(
+                _str(phase.get("phase_type", dialect.default_phase_type)),
+                loaded,
+                tuple(load_position(pos, dialect.format_position) for pos in phase.get("positions", [])),
+            ))
+        sets.append(StrategySet(strategy_set.get("set_index", dialect.default_set_index), tuple(phases)))
+    return Strategy(version, tuple(sets))
+
+
+def _read_node(node):
+    # Leaves carry their text from load time; ConditionGroup members may be None
+    node_type = type(node)
+    if node_type is Comparison:
+        return f"{node.left.text} {node.operator} {node.right.text}"
+    if node_type is ConditionGroup:
+        return node.logic, node.children
+    if node_type is Operand:
+        return node.text
+    return None
+
+
+def write_conditions(node, write, dialect, line_prefix=CONDITION_INDENT):
+    """json_to_yaml.write_condition for a loaded condition tree, reading the precomputed operand text."""
+    write_condition_tree(node, write, dialect.group_separator, _read_node, line_prefix)
+
+
+def write_strategy(strategy, write):
+    """Renders a loaded Strategy; output matches convert_json_to_text on the source JSON."""
+    dialect = DIALECTS[strategy.version]
+    lines = LineWriter(write)
+    for strategy_set in strategy.sets:
+        for line in set_header_lines(strategy_set.set_index, dialect):
+            lines.new_line(line)
+        for phase in strategy_set.phases:
+            lines.new_line(f"Phase: {phase.phase_type}")
+            if phase.conditions is not None:
+                lines.new_line("  Conditions:")
+                lines.new_line(CONDITION_INDENT)
+                write_conditions(phase.conditions, lines.write, dialect)
+            elif dialect.always_show_conditions:
+                lines.new_line("  Conditions:")
+                lines.new_line("    (None)")
+            if phase.positions:
+                lines.new_line("\n  Positions:")
+                for position in phase.positions:
+                    lines.new_line(f"    {position.text}")
+            lines.new_line(dialect.phase_trailer)
+
+
+def render_strategy(strategy):
+    parts = []
+    write_strategy(strategy, parts.append)
+    return "".join(parts)
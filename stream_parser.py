@@ -0,0 +1,236 @@
+import json
+import re
+
+_NUMBER_CHARS = frozenset("-+.eE0123456789")
+_NUMBER_RE = re.compile(r"-?(0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?\Z")
+_LITERALS = {"t": "true", "f": "false", "n": "null"}
+_HEX = frozenset("0123456789abcdefABCDEF")
+_WHITESPACE = frozenset(" \t\r\n")
+
+
+class StreamJSONError(json.JSONDecodeError):
+    """Raised at the first character that cannot be part of valid JSON."""
+
+    def __init__(self, msg, doc, pos):
+        super().__init__(msg, doc, pos)
+        self.fragment = doc[max(0, pos - 40):pos + 1]
+
+
+class IncrementalPhaseParser:
+    """
+    Validates a streamed JSON document character by character and emits
+    every `strategy_sets[*].phases[*]` object as soon as it closes.
+
+    feed() returns a list of (set_position, set_index, phase) tuples;
+    set_index is None when the set's "set_index" has not been streamed yet.
+    A single leading/trailing markdown fence is tolerated.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.pos = 0
+        # Frames are [kind, state, key_or_index, start_offset]
+        self.stack = []
+        self.mode = "start"
+        self.root_start = None
+        self.root_end = None
+        self.set_indexes = {}
+
+        self._token_start = 0
+        self._is_key = False
+        self._escape = False
+        self._unicode_left = 0
+        self._literal = ""
+
+    def _fail(self, msg, pos):
+        raise StreamJSONError(msg, self.text, pos)
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        i = self.pos
+        end = len(text)
+
+        while i < end:
+            c = text[i]
+            mode = self.mode
+
+            if mode == "string":
+                if self._unicode_left:
+                    if c not in _HEX:
+                        self._fail("Invalid \\u escape", i)
+                    self._unicode_left -= 1
+                elif self._escape:
+                    self._escape = False
+                    if c == "u":
+                        self._unicode_left = 4
+                    elif c not in '"\\/bfnrt':
+                        self._fail("Invalid escape", i)
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self.mode = "value"
+                    if self._is_key:
+                        frame = self.stack[-1]
+                        frame[2] = json.loads(text[self._token_start:i + 1])
+                        frame[1] = "colon"
+                    else:
+                        self._value_done(i, events)
+                elif c < " ":
+                    self._fail("Control character in string", i)
+                i += 1
+                continue
+
+            if mode == "number":
+                if c in _NUMBER_CHARS:
+                    i += 1
+                    continue
+                self._end_number(i, events)
+                continue  # re-examine c as structure
+
+            if mode == "literal":
+                expected = self._literal[i - self._token_start]
+                if c != expected:
+                    self._fail(f"Invalid literal, expected {self._literal!r}", i)
+                if i - self._token_start == len(self._literal) - 1:
+                    self.mode = "value"
+                    self._value_done(i, events)
+                i += 1
+                continue
+
+            if mode == "fence":
+                if c == "\n":
+                    self.mode = "start"
+                i += 1
+                continue
+
+            if c in _WHITESPACE:
+                i += 1
+                continue
+
+            if mode == "start":
+                if c == "`":
+                    self.mode = "fence"
+                    i += 1
+                    continue
+                if c != "{":
+                    self._fail("Expected '{' to start the document", i)
+                self.root_start = i
+                self.mode = "value"
+                self.stack.append(["{", "key_or_end", None, i])
+                i += 1
+                continue
+
+            if mode == "done":
+                if c != "`":
+                    self._fail("Unexpected data after the document", i)
+                i += 1
+                continue
+
+            frame = self.stack[-1]
+            kind, state = frame[0], frame[1]
+
+            if state in ("value", "value_or_end"):
+                if c == "]" and state == "value_or_end":
+                    self._close(i, events)
+                else:
+                    self._start_value(c, i)
+            elif state in ("key", "key_or_end"):
+                if c == '"':
+                    self.mode = "string"
+                    self._is_key = True
+                    self._token_start = i
+                elif c == "}" and state == "key_or_end":
+                    self._close(i, events)
+                else:
+                    self._fail("Expected object key", i)
+            elif state == "colon":
+                if c != ":":
+                    self._fail("Expected ':'", i)
+                frame[1] = "value"
+            else:  # comma_or_end
+                if c == ",":
+                    if kind == "{":
+                        frame[1] = "key"
+                    else:
+                        frame[1] = "value"
+                        frame[2] += 1
+                elif (c == "}" and kind == "{") or (c == "]" and kind == "["):
+                    self._close(i, events)
+                else:
+                    self._fail("Expected ',' or closing bracket", i)
+            i += 1
+
+        self.pos = i
+        return events
+
+    def _start_value(self, c, i):
+        if c == "{":
+            self.stack.append(["{", "key_or_end", None, i])
+        elif c == "[":
+            self.stack.append(["[", "value_or_end", 0, i])
+        elif c == '"':
+            self.mode = "string"
+            self._is_key = False
+            self._token_start = i
+        elif c == "-" or c.isdigit():
+            self.mode = "number"
+            self._token_start = i
+        elif c in _LITERALS:
+            self.mode = "literal"
+            self._literal = _LITERALS[c]
+            self._token_start = i
+        else:
+            self._fail("Expected a value", i)
+
+    def _end_number(self, i, events):
+        token = self.text[self._token_start:i]
+        if not _NUMBER_RE.match(token):
+            self._fail(f"Invalid number {token!r}", i - 1)
+        self.mode = "value"
+        self._value_done(i - 1, events, number=token)
+
+    def _in_set(self):
+        stack = self.stack
+        return len(stack) >= 3 and stack[0][2] == "strategy_sets" and stack[1][0] == "["
+
+    def _close(self, i, events):
+        frame = self.stack.pop()
+        stack = self.stack
+        if (
+            frame[0] == "{"
+            and len(stack) == 4
+            and self._in_set()
+            and stack[2][2] == "phases"
+            and stack[3][0] == "["
+        ):
+            set_position = stack[1][2]
+            phase = json.loads(self.text[frame[3]:i + 1])
+            events.append((set_position, self.set_indexes.get(set_position), phase))
+        self._value_done(i, events)
+
+    def _value_done(self, i, events, number=None):
+        stack = self.stack
+        if not stack:
+            self.mode = "done"
+            self.root_end = i
+            return
+        if number is not None and len(stack) == 3 and self._in_set() and stack[2][2] == "set_index":
+            self.set_indexes[stack[1][2]] = json.loads(number)
+        stack[-1][1] = "comma_or_end"
+
+    def close(self):
+        """Finishes the stream and returns the complete parsed document."""
+        if self.mode == "number":
+            self._end_number(len(self.text), [])
+        if self.mode != "done":
+            self._fail("Unexpected end of stream", len(self.text))
+        return json.loads(self.text[self.root_start:self.root_end + 1])
+
+    @property
+    def document_text(self):
+        if self.root_start is None:
+            return self.text
+        end = self.root_end + 1 if self.root_end is not None else len(self.text)
+        return self.text[self.root_start:end]
@@ -0,0 +1,178 @@
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+_SYMBOL_RE = re.compile(r"\b(BANKNIFTY|FINNIFTY|MIDCPNIFTY|SENSEX|NIFTY)\b", re.IGNORECASE)
+_STRIKE_RE = re.compile(r"\bATM\s*([+-]\s*\d+)", re.IGNORECASE)
+_LOTS_RE = re.compile(r"\b(\d+)\s*lots?\b", re.IGNORECASE)
+
+
+class StubAPIError(Exception):
+    """Mimics groq.APIStatusError closely enough for retry logic (`status_code`)."""
+
+    def __init__(self, status_code, message="stub error"):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+
+def default_strategy(prompt):
+    """A small valid v3 strategy whose symbol follows the prompt."""
+    match = _SYMBOL_RE.search(prompt or "")
+    symbol = match.group(1).upper() if match else "NIFTY"
+    underlying = "NIFTY 50" if symbol == "NIFTY" else symbol
+    return {
+        "strategy_sets": [
+            {
+                "set_index": 1,
+                "phases": [
+                    {
+                        "phase_type": "Entry",
+                        "conditions": {
+                            "condition_type": "COMPARE",
+                            "left": {
+                                "keyword": "LTP",
+                                "inputs": {
+                                    "instrument": {
+                                        "exchange": "NSE",
+                                        "symbol_token": underlying,
+                                        "instrument_type": "EQUITY",
+                                    }
+                                },
+                            },
+                            "operator": ">",
+                            "right": 0,
+                        },
+                        "positions": [
+                            {
+                                "transaction_type": "BUY",
+                                "product_type": "MIS",
+                                "instrument": {
+                                    "exchange": "NFO",
+                                    "symbol_token": symbol,
+                                    "instrument_type": "CALL",
+                                    "expiry_config": {"type": "Current Week", "offset": 0},
+                                    "strike_config": {"selection_method": "ATM", "offset": 0},
+                                },
+                                "quantity_setup": {"type": "Lots", "value": 1},
+                            }
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+def default_patch(messages):
+    """JSON Patch for an edit request (see llm_pipeline.build_edit_messages): "ATM+n" and "n lots" on every leg."""
+    strategy = json.loads(messages[1]["content"].split("\n", 1)[1])
+    request = messages[2]["content"]
+    strike = _STRIKE_RE.search(request)
+    lots = _LOTS_RE.search(request)
+    patch = []
+    for i, strategy_set in enumerate(strategy.get("strategy_sets", [])):
+        for j, phase in enumerate(strategy_set.get("phases", [])):
+            for k, position in enumerate(phase.get("positions", [])):
+                path = f"/strategy_sets/{i}/phases/{j}/positions/{k}"
+                if strike and "strike_config" in position.get("instrument", {}):
+                    offset = int(strike.group(1).replace(" ", ""))
+                    patch.append({"op": "replace", "path": f"{path}/instrument/strike_config/offset", "value": offset})
+                if lots:
+                    patch.append({"op": "replace", "path": f"{path}/quantity_setup/value", "value": int(lots.group(1))})
+    return json.dumps(patch)
+
+
+def default_responder(messages):
+    if messages and "JSON Patch" in messages[0]["content"]:
+        return default_patch(messages)
+    prompt = messages[-1]["content"] if messages else ""
+    # A correction re-ask still refers to the original prompt two messages up
+    if len(messages) > 3:
+        prompt = messages[2]["content"]
+    return json.dumps(default_strategy(prompt))
+
+
+class _Stream:
+    def __init__(self, content, chunk_size, delay):
+        self._content = content
+        self._chunk_size = chunk_size
+        self._delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for i in range(0, len(self._content), self._chunk_size):
+            if self.closed:
+                return
+            if self._delay:
+                time.sleep(self._delay)
+            delta = SimpleNamespace(content=self._content[i:i + self._chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)])
+
+    def close(self):
+        self.closed = True
+
+
+class _Completions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model=None, messages=None, stream=False, **kwargs):
+        return self._owner._create(model, messages or [], stream, kwargs)
+
+
+class StubGroq:
+    """
+    Offline stand-in for the Groq client: same `client.chat.completions.create`
+    surface, deterministic responses and configurable latency/failures.
+
+    latency: seconds per call, or a zero-arg callable returning seconds.
+    error_rate: fraction of calls raising StubAPIError(error_status).
+    responder: callable(messages) -> completion text.
+    """
+
+    def __init__(self, latency=0.0, responder=default_responder, error_rate=0.0,
+                 error_status=429, stream_chunk_size=16, seed=0):
+        self.latency = latency
+        self.responder = responder
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stream_chunk_size = stream_chunk_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def _sleep_time(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _create(self, model, messages, stream, params):
+        with self._lock:
+            self.calls += 1
+            fail = self.error_rate and self._random.random() < self.error_rate
+
+        delay = self._sleep_time()
+        if fail:
+            if delay:
+                time.sleep(delay / 10)
+            raise StubAPIError(self.error_status)
+
+        content = self.responder(messages)
+        if stream:
+            chunks = max(1, len(content) // self.stream_chunk_size)
+            return _Stream(content, self.stream_chunk_size, delay / chunks if delay else 0)
+
+        if delay:
+            time.sleep(delay)
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=len(content) // 4,
+                total_tokens=prompt_tokens + len(content) // 4,
+            ),
+        )
@@ -0,0 +1,445 @@
+"""
+Local stand-in for the Groq chat-completions API.
+
+    python stub_server.py --port 8089 --cassette cassettes/runs.jsonl --latency lognormal:0.8,0.4
+    GROQ_BASE_URL=http://127.0.0.1:8089 GROQ_API_KEY=stub streamlit run app2.py
+
+Serves recorded responses (or stub_llm.default_responder on a miss) with
+latency drawn from a distribution, SSE token streaming, injected 429/500
+errors and truncated ("malformed") JSON content, plus request-rate and
+concurrency limits that answer 429 like the real service. --record
+proxies to the real API and appends every exchange to the cassette.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from stub_llm import default_responder
+
+COMPLETION_PATHS = ("/openai/v1/chat/completions", "/v1/chat/completions")
+UPSTREAM_URL = os.getenv("GROQ_UPSTREAM_URL", "https://api.groq.com")
+
+
+def parse_latency(spec):
+    """
+    "0.5" | "fixed:0.5" | "uniform:a,b" | "normal:mean,sd" | "lognormal:median,sigma" | "recorded".
+    Returns a callable(rng, recorded_seconds) -> seconds.
+    """
+    kind, _, args = str(spec).partition(":")
+    if not args:
+        kind, args = ("recorded", "") if kind == "recorded" else ("fixed", kind)
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda rng, recorded: values[0]
+    if kind == "uniform":
+        return lambda rng, recorded: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng, recorded: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng, recorded: rng.lognormvariate(math.log(values[0]), values[1])
+    if kind == "recorded":
+        return lambda rng, recorded: recorded or 0.0
+    raise ValueError(f"Unknown latency distribution {spec!r}")
+
+
+def prompt_of(messages):
+    """The user's instruction: third message in llm_pipeline.build_messages, else the last one."""
+    if len(messages) >= 3:
+        return messages[2].get("content", "")
+    return messages[-1].get("content", "") if messages else ""
+
+
+def request_key(model, messages):
+    """SHA-256 of the model and the whole message list, so re-asks and escalations get their own recordings."""
+    conversation = [[m.get("role"), m.get("content")] for m in messages]
+    return hashlib.sha256(json.dumps([model, conversation], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    JSONL of {"key", "prompt", "model", "content", "latency_s"} keyed by
+    request_key(); "prompt" is kept only to make the file readable.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if "key" in entry: # recordings keyed by prompt alone cannot be matched exactly
+                            self.entries[entry["key"]] = entry
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def record(self, key, prompt, model, content, latency_s):
+        entry = {"key": key, "prompt": prompt, "model": model, "content": content, "latency_s": round(latency_s, 3)}
+        with self._lock:
+            self.entries[key] = entry
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return entry
+
+
+class RateLimiter:
+    """Token bucket; `try_acquire` returns 0 when admitted, else seconds until a token frees up."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class StubConfig:
+    def __init__(self, latency="0", token_rate=0.0, chunk_chars=8, error_429=0.0, error_500=0.0,
+                 malformed=0.0, rate=0.0, burst=None, max_concurrency=0, cassette=None,
+                 record=False, on_miss="default", seed=0):
+        self.latency = parse_latency(latency)
+        self.token_rate = token_rate # streamed chunks per second after the first (0 = no pacing)
+        self.chunk_chars = chunk_chars
+        self.error_429 = error_429
+        self.error_500 = error_500
+        self.malformed = malformed
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.cassette = cassette
+        self.record = record
+        self.on_miss = on_miss # "default" (stub_llm.default_responder) or "error" (404)
+        self.seed = seed
+
+
+class StubState:
+    def __init__(self, config):
+        self.config = config
+        self.cassette = Cassette(config.cassette)
+        self.limiter = RateLimiter(config.rate, config.burst) if config.rate else None
+        self.rng = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = Counter()
+
+    def draw(self):
+        with self.lock:
+            return self.rng.random()
+
+    def latency(self, recorded):
+        with self.lock:
+            return self.config.latency(self.rng, recorded)
+
+    def count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "StubGroq/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def send_json(self, status, payload, headers=None, count=True):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        if count:
+            self.state.count(f"status_{status}")
+
+    def send_error_json(self, status, message, error_type, headers=None):
+        self.send_json(status, {"error": {"message": message, "type": error_type, "code": error_type}}, headers)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"}, count=False)
+        elif self.path == "/stats":
+            with self.state.lock:
+                payload = dict(self.state.stats, in_flight=self.state.in_flight)
+            self.send_json(200, payload, count=False)
+        else:
+            self.send_error_json(404, f"No route {self.path}", "not_found")
+
+    def do_POST(self):
+        if self.path not in COMPLETION_PATHS:
+            self.send_error_json(404, f"No route {self.path}", "not_found")
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error_json(400, "Request body is not JSON", "invalid_request_error")
+            return
+
+        state, config = self.state, self.state.config
+        state.count("requests")
+
+        if state.limiter:
+            wait = state.limiter.try_acquire()
+            if wait:
+                state.count("rate_limited")
+                self.send_error_json(429, "Rate limit reached (requests per second)", "rate_limit_exceeded",
+                                     {"retry-after": f"{wait:.3f}"})
+                return
+
+        with state.lock:
+            if config.max_concurrency and state.in_flight >= config.max_concurrency:
+                state.stats["concurrency_limited"] += 1
+                admitted = False
+            else:
+                state.in_flight += 1
+                state.stats["max_in_flight"] = max(state.stats["max_in_flight"], state.in_flight)
+                admitted = True
+        if not admitted:
+            self.send_error_json(429, "Too many concurrent requests", "rate_limit_exceeded", {"retry-after": "1"})
+            return
+        try:
+            self.complete(request)
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def complete(self, request):
+        state, config = self.state, self.state.config
+        messages = request.get("messages") or []
+        model = request.get("model") or "stub"
+        key = request_key(model, messages)
+
+        roll = state.draw()
+        if roll < config.error_429:
+            time.sleep(state.latency(None) / 10)
+            self.send_error_json(429, "Injected rate limit", "rate_limit_exceeded", {"retry-after": "0.1"})
+            return
+        if roll < config.error_429 + config.error_500:
+            time.sleep(state.latency(None) / 10)
+            self.send_error_json(500, "Injected server error", "internal_server_error")
+            return
+
+        entry = state.cassette.get(key)
+        if entry is not None:
+            state.count("cassette_hits")
+        elif config.record:
+            entry = self.record_upstream(request, key, prompt_of(messages), model)
+            if entry is None:
+                return
+        elif config.on_miss == "error":
+            state.count("cassette_misses")
+            self.send_error_json(404, "Prompt not in cassette", "not_found")
+            return
+        else:
+            state.count("cassette_misses")
+            entry = {"content": default_responder(messages), "latency_s": None}
+
+        content = entry["content"]
+        if state.draw() < config.malformed:
+            # Cut the JSON short, as a length-limited or garbled completion would be
+            state.count("malformed")
+            content = content[: max(1, int(len(content) * (0.3 + 0.4 * state.draw())))]
+
+        delay = 0.0 if entry.get("recorded_now") else state.latency(entry.get("latency_s"))
+        if request.get("stream"):
+            self.stream(model, content, messages, delay)
+        else:
+            time.sleep(delay)
+            self.send_json(200, completion_payload(model, content, messages))
+
+    def record_upstream(self, request, key, prompt, model):
+        body = dict(request, stream=False)
+        t0 = time.monotonic()
+        try:
+            response = httpx.post(
+                f"{UPSTREAM_URL}/openai/v1/chat/completions",
+                json=body,
+                headers={"Authorization": self.headers.get("Authorization") or f"Bearer {os.getenv('GROQ_API_KEY', '')}"},
+                timeout=120,
+            )
+        except httpx.HTTPError as e:
+            self.send_error_json(502, f"Upstream error: {e}", "upstream_error")
+            return None
+        if response.status_code != 200:
+            self.send_json(response.status_code, response.json())
+            return None
+        content = response.json()["choices"][0]["message"]["content"]
+        self.state.count("recorded")
+        entry = self.state.cassette.record(key, prompt, model, content, time.monotonic() - t0)
+        # The upstream call already took real time; do not add synthetic latency on top
+        return dict(entry, recorded_now=True)
+
+    def stream(self, model, content, messages, delay):
+        """
+        Server-sent events in chunked transfer encoding, like the real endpoint;
+        the last chunk carries the usage block under x_groq, as Groq's does.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.state.count("status_200")
+        self.state.count("streamed")
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        pace = 1 / self.state.config.token_rate if self.state.config.token_rate else 0.0
+        size = self.state.config.chunk_chars
+
+        def event(delta, finish_reason=None, usage=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason, "logprobs": None}],
+            }
+            if usage:
+                chunk["x_groq"] = {"id": completion_id, "usage": usage}
+            data = f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+        try:
+            time.sleep(delay) # time to first token
+            event({"role": "assistant", "content": ""})
+            for i in range(0, len(content), size):
+                if pace:
+                    time.sleep(pace)
+                event({"content": content[i:i + size]})
+            event({}, "stop", usage_payload(messages, content))
+            done = b"data: [DONE]\n\n"
+            self.wfile.write(f"{len(done):x}\r\n".encode("ascii") + done + b"\r\n0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.state.count("client_disconnects") # the client closed the stream early
+            self.close_connection = True
+
+
+def usage_payload(messages, content):
+    prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def completion_payload(model, content, messages):
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+            "logprobs": None,
+        }],
+        "usage": usage_payload(messages, content),
+    }
+
+
+class StubServer:
+    """Runs the stub in a background thread: `with StubServer(config) as url: ...`."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = StubState(config or StubConfig())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        with self.httpd.state.lock:
+            return dict(self.httpd.state.stats)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI/Groq-compatible stub chat-completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--cassette", help="JSONL of recorded responses (appended to with --record)")
+    parser.add_argument("--record", action="store_true", help="proxy cassette misses to the real API and record them")
+    parser.add_argument("--on-miss", choices=("default", "error"), default="default")
+    parser.add_argument("--latency", default="0", help='e.g. "0.5", "uniform:0.2,1", "lognormal:0.8,0.4", "recorded"')
+    parser.add_argument("--token-rate", type=float, default=0.0, help="streamed chunks per second")
+    parser.add_argument("--chunk-chars", type=int, default=8)
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered 429")
+    parser.add_argument("--error-500", type=float, default=0.0, help="fraction of requests answered 500")
+    parser.add_argument("--malformed", type=float, default=0.0, help="fraction of completions cut short")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests per second before 429 (0 = unlimited)")
+    parser.add_argument("--burst", type=float, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="in-flight requests before 429 (0 = unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(
+        latency=args.latency, token_rate=args.token_rate, chunk_chars=args.chunk_chars,
+        error_429=args.error_429, error_500=args.error_500, malformed=args.malformed,
+        rate=args.rate, burst=args.burst, max_concurrency=args.max_concurrency,
+        cassette=args.cassette, record=args.record, on_miss=args.on_miss, seed=args.seed,
+    )
+    server = StubServer(config, args.host, args.port)
+    print(f"Stub chat-completions server on {server.url} (set GROQ_BASE_URL={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+import ast
+import copy
+import re
+
+from fast_path import UNDERLYINGS
+from json_to_yaml import DIALECTS, format_operand, parse_condition, parse_position
+
+DIALECT = DIALECTS["v3"]
+OPERATORS = (">=", "<=", "==", "!=", ">", "<", "Crosses Above", "Crosses Below")
+STRIKE_METHODS = ("ATM SPOT", "ATM", "OTM", "ITM", "Strike Price")
+DEFAULT_EXPIRY = {"type": "Current Week", "offset": 0}
+DEFAULT_QUANTITY_TYPE = "Lots"
+TIMEFRAMES = ("1m", "3m", "5m", "10m", "15m", "30m", "1h", "1d", "1w", "day", "All")
+
+# Spot exchange by index name or derivative symbol ("NIFTY 50" / "NIFTY" -> NSE)
+SPOT_EXCHANGES = {name: exchange for exchange, name in UNDERLYINGS.values()}
+SPOT_EXCHANGES.update((symbol, exchange) for symbol, (exchange, _) in UNDERLYINGS.items())
+
+_SET_RE = re.compile(r"Set #(-?\d+)$")
+_RULE_RE = re.compile(r"-{3,}$")
+_PHASE_RE = re.compile(r"Phase:\s*(.*)$")
+_POSITION_RE = re.compile(r"(BUY|SELL)\s*\[\s*(.*?)\s*\]$")
+_LOGIC_RE = re.compile(r"(AND|OR)\s+(.*)$")
+_OPERATOR_RE = re.compile(" (" + "|".join(re.escape(op) for op in OPERATORS) + ") ")
+_NUMBER_RE = re.compile(r"-?\d+(\.\d+)?([eE][+-]?\d+)?$")
+_TIME_RE = re.compile(r"([0-1]?[0-9]|2[0-3]):[0-5][0-9]$")
+_SET_RUNTIME_RE = re.compile(r"Set Runtime\((.*?) = (.*)\)$")
+_GET_RUNTIME_RE = re.compile(r"Get Runtime \((.*)\)$")
+_CALL_RE = re.compile(r"(.+?) \(([^()]*)\)$")
+_ARGS_RE = re.compile(r"([^()]*[^\s()])\(([^()]*)\)$")
+_STRIKE_RE = re.compile(r"(" + "|".join(STRIKE_METHODS) + r")\s*([+-]\s*\d+)?$")
+
+
+class TextParseError(ValueError):
+    """Raised for text that is not in the rendered strategy format; `line` is 1-based."""
+
+    def __init__(self, message, line=None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+
+def _top_level(text, pattern):
+    """First match of `pattern` outside brackets and quotes, or None."""
+    depth = 0
+    quote = None
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif depth == 0 and char == " ":
+            match = pattern.match(text, i)
+            if match:
+                return match
+    return None
+
+
+def condition_leaves(node):
+    """COMPARE and standalone keyword nodes in the order the renderer writes them."""
+    leaves = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if node.get("condition_type") == "GROUP":
+            stack.extend(reversed(node.get("conditions", [])))
+        elif node.get("condition_type") == "COMPARE" or "keyword" in node:
+            leaves.append(node)
+    return leaves
+
+
+def _operand_name(op):
+    if isinstance(op, dict):
+        for field in ("function_name", "keyword", "pattern_name"):
+            if op.get(field):
+                return field, op[field]
+    return None, None
+
+
+class _Parser:
+    def __init__(self, base, catalog):
+        self.base = base
+        self.catalog = catalog
+
+    # --- operands ---
+
+    def operand(self, text, base, line):
+        text = text.strip()
+        if base is not None and format_operand(base) == text:
+            return copy.deepcopy(base)
+        if not text:
+            raise TextParseError("missing operand", line)
+        if text[0] == "{":
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError) as e:
+                raise TextParseError(f"unreadable operand {text!r}", line) from e
+            if isinstance(value, dict):
+                return value
+        if _NUMBER_RE.match(text):
+            return float(text) if any(c in text for c in ".eE") else int(text)
+        if _TIME_RE.match(text):
+            return text
+
+        match = _SET_RUNTIME_RE.match(text)
+        if match:
+            base_value = base.get("params", {}).get("value") if _operand_name(base)[1] == "Set Runtime" else None
+            op = copy.deepcopy(base) if base_value is not None else {"keyword": "Set Runtime", "params": {}}
+            op["params"]["variable_name"] = match.group(1).strip()
+            op["params"]["value"] = self.operand(match.group(2), base_value, line)
+            return op
+        match = _GET_RUNTIME_RE.match(text)
+        if match:
+            name = _operand_name(base)[1]
+            # "Get Runtime Number" renders the same; the base document tells them apart
+            if name in ("Get Runtime", "Get Runtime Number"):
+                op = copy.deepcopy(base)
+                op.setdefault("params", {})["variable_name"] = match.group(1).strip()
+                return op
+            return {"keyword": "Get Runtime", "params": {"variable_name": match.group(1).strip()}}
+
+        match = _ARGS_RE.match(text)
+        if match and not self._known(text):
+            return self.with_inputs(match.group(1), [arg.strip() for arg in match.group(2).split(",")], base, line)
+
+        name, symbol, timeframe = text, None, None
+        match = _CALL_RE.match(text)
+        if match and not self._known(text):
+            name = match.group(1).strip()
+            args = [arg.strip() for arg in match.group(2).split(",")]
+            symbol = args[0] or None
+            timeframe = args[1] if len(args) > 1 else None
+        return self.named(name, symbol, timeframe, base)
+
+    def with_inputs(self, name, args, base, line):
+        """
+        `name(inputs..., timeframe)` of an instrument-less operand. The text
+        does not name the inputs, so they fill the base operand's, in order.
+        """
+        timeframe = args.pop() if args and args[-1] in TIMEFRAMES else None
+        op = self.named(name, None, timeframe, base)
+        inputs = op.get("inputs") if isinstance(op.get("inputs"), dict) else {}
+        keys = [key for key in inputs if key != "instrument"]
+        if len(keys) != len(args):
+            raise TextParseError(f"cannot tell which inputs of {name} {', '.join(args)} set", line)
+        for key, arg in zip(keys, args):
+            inputs[key] = (float(arg) if any(c in arg for c in ".eE") else int(arg)) if _NUMBER_RE.match(arg) else arg
+        return op
+
+    def _known(self, name):
+        return self.catalog is not None and any(name in index.names for index in self.catalog.fields.values())
+
+    def field_for(self, name, timeframe):
+        """(field, canonical name) for an operand name, using the keyword catalog when there is one."""
+        preferred = ("function_name", "pattern_name", "keyword") if timeframe else ("keyword", "function_name", "pattern_name")
+        if self.catalog is None:
+            return preferred[0], name
+        for field in preferred:
+            index = self.catalog.fields.get(field)
+            if index is not None and name in index.names:
+                return field, name
+        for field in preferred:
+            match = self.catalog.lookup(name, field)
+            if match is not None:
+                return field, match.keyword.name
+        return preferred[0], name
+
+    def named(self, name, symbol, timeframe, base):
+        field, name = self.field_for(name, timeframe)
+        base_field, base_name = _operand_name(base)
+        if base_name == name:
+            # Same keyword: keep what the text does not show (position offset, params, exchange)
+            op = copy.deepcopy(base)
+            field = base_field
+        else:
+            op = {field: name}
+            if field in ("function_name", "pattern_name"):
+                op["position_offset"] = 0
+
+        if timeframe:
+            op["timeframe"] = timeframe
+        else:
+            op.pop("timeframe", None)
+
+        holder = op.get("inputs") if isinstance(op.get("inputs"), dict) and "instrument" in op["inputs"] else op
+        if symbol:
+            if field == "keyword" and holder is op and "instrument" not in op:
+                holder = op.setdefault("inputs", {})
+            holder["instrument"] = self.instrument(symbol, holder.get("instrument"))
+        else:
+            holder.pop("instrument", None)
+            if holder is not op and not holder:
+                op.pop("inputs")
+        return op
+
+    def instrument(self, symbol, base):
+        if isinstance(base, dict) and base.get("symbol_token") == symbol:
+            return base
+        instrument = dict(base) if isinstance(base, dict) else {"instrument_type": "EQUITY"}
+        instrument["symbol_token"] = symbol
+        if instrument.get("instrument_type", "EQUITY") == "EQUITY":
+            instrument["exchange"] = SPOT_EXCHANGES.get(symbol, instrument.get("exchange", "NSE"))
+        elif symbol in UNDERLYINGS:
+            instrument["exchange"] = "BSE" if symbol == "SENSEX" else "NFO"
+        return instrument
+
+    # --- conditions ---
+
+    def leaf(self, text, base, line):
+        if base is not None and parse_condition(base) == text:
+            return copy.deepcopy(base)
+        match = _top_level(text, _OPERATOR_RE)
+        if match is None:
+            op = self.operand(text, base, line)
+            if not isinstance(op, dict) or "keyword" not in op:
+                raise TextParseError(f"expected a comparison or keyword, got {text!r}", line)
+            return op
+        base_left = base_right = None
+        if base is not None and base.get("condition_type") == "COMPARE":
+            base_left, base_right = base.get("left"), base.get("right")
+        node = {k: v for k, v in base.items() if k == "description"} if base_left is not None else {}
+        node.update({
+            "condition_type": "COMPARE",
+            "left": self.operand(text[:match.start()], base_left, line),
+            "operator": match.group(1),
+            "right": self.operand(text[match.end():], base_right, line),
+        })
+        return node
+
+    def conditions(self, lines, base):
+        """`lines` are (line number, text) of one Conditions section."""
+        base_leaves = condition_leaves(base) if base else []
+        base_texts = [parse_condition(leaf) for leaf in base_leaves]
+        unused = {}
+        for leaf, text in zip(base_leaves, base_texts):
+            unused.setdefault(text, []).append(leaf)
+        leaves, separators = [], []
+        for i, (number, raw) in enumerate(lines):
+            text = raw.strip()
+            if i:
+                match = _LOGIC_RE.match(text)
+                if match is None:
+                    raise TextParseError("continuation line must start with AND or OR", number)
+                separators.append((len(raw) - len(raw.lstrip()), match.group(1), number))
+                text = match.group(2)
+            # The base leaf in the same place, else an identical one elsewhere (a moved line)
+            aligned = base_leaves[i] if i < len(base_leaves) else None
+            if aligned is None or base_texts[i] != text:
+                aligned = (unused.get(text) or [aligned])[0]
+            if aligned is not None and aligned in unused.get(text, ()):
+                unused[text].remove(aligned)
+            leaves.append(self.leaf(text, aligned, number))
+        return _tree(leaves, separators)
+
+    # --- positions ---
+
+    def position(self, text, base, line):
+        if base is not None and parse_position(base) == text:
+            return copy.deepcopy(base)
+        match = _POSITION_RE.match(text)
+        if match is None:
+            raise TextParseError(f"expected 'BUY [ ... ]' or 'SELL [ ... ]', got {text!r}", line)
+        fields = [field.strip() for field in match.group(2).split(",")]
+        if len(fields) != 7:
+            raise TextParseError(
+                "a position lists exchange, symbol, type, expiry, strike, product and quantity", line
+            )
+        exchange, symbol, instrument_type, expiry, strike, product, quantity = fields
+        if not _NUMBER_RE.match(quantity):
+            raise TextParseError(f"quantity {quantity!r} is not a number", line)
+
+        position = copy.deepcopy(base) if base is not None else {}
+        position["transaction_type"] = match.group(1)
+        position["product_type"] = product
+        instrument = position.setdefault("instrument", {})
+        instrument.update(exchange=exchange, symbol_token=symbol, instrument_type=instrument_type)
+
+        if expiry != "-":
+            instrument["expiry_config"] = {"type": "Specific Date", "date": expiry}
+        elif instrument.get("expiry_config", {}).get("type") in (None, "Specific Date"):
+            if instrument_type in ("CALL", "PUT", "FUTURE"):
+                instrument["expiry_config"] = dict(DEFAULT_EXPIRY)
+            else:
+                instrument.pop("expiry_config", None)
+
+        if strike == "-":
+            if instrument_type in ("CALL", "PUT"):
+                raise TextParseError("an option needs a strike such as ATM or ATM+2", line)
+        else:
+            strike_match = _STRIKE_RE.match(strike)
+            if strike_match is None:
+                raise TextParseError(f"strike {strike!r} is not one of {', '.join(STRIKE_METHODS)} with an offset", line)
+            strike_config = instrument.setdefault("strike_config", {})
+            strike_config["selection_method"] = strike_match.group(1)
+            strike_config["offset"] = int(strike_match.group(2).replace(" ", "")) if strike_match.group(2) else 0
+
+        quantity_setup = position.setdefault("quantity_setup", {"type": DEFAULT_QUANTITY_TYPE})
+        quantity_setup["value"] = float(quantity) if "." in quantity else int(quantity)
+        return position
+
+
+def _tree(leaves, separators):
+    """
+    Rebuilds the condition tree from its leaves and the (indent, logic,
+    line) separators between them: the shallowest separators split a group
+    into members, and deeper ones belong to nested groups.
+    """
+    if not separators:
+        return leaves[0]
+    top = min(indent for indent, _, _ in separators)
+    members = []
+    logic = None
+    start = 0
+    for i, (indent, separator_logic, number) in enumerate(separators):
+        if indent != top:
+            continue
+        if logic is not None and separator_logic != logic:
+            raise TextParseError("AND and OR mixed at the same indentation; indent one of them further", number)
+        logic = separator_logic
+        members.append(_tree(leaves[start:i + 1], separators[start:i]))
+        start = i + 1
+    members.append(_tree(leaves[start:], separators[start:]))
+    return {"condition_type": "GROUP", "connection_logic": logic, "conditions": members}
+
+
+def _index(items, i):
+    return items[i] if items is not None and i < len(items) else None
+
+
+def parse_strategy_text(text, base=None, catalog=None):
+    """
+    Parses text rendered by json_to_yaml.convert_json_to_text (v3 layout)
+    back into strategy JSON. The text does not show everything (expiry
+    type, candle offsets, indicator inputs, exchanges of operands), so
+    those come from `base`, the document the text was rendered from,
+    wherever a line is unchanged or names the same keyword, and otherwise
+    default. With a keyword_catalog.KeywordCatalog, operand names are
+    classified by the schema and misspellings canonicalized.
+    Raises TextParseError.
+    """
+    parser = _Parser(base, catalog)
+    base_sets = base.get("strategy_sets") if isinstance(base, dict) else None
+    sets = []
+    strategy_set = base_set = phase = base_phase = None
+    section = None
+    condition_lines = []
+
+    def finish_conditions():
+        if section == "conditions":
+            base_conditions = base_phase.get("conditions") if base_phase else None
+            if condition_lines:
+                phase["conditions"] = parser.conditions(condition_lines, base_conditions)
+            elif base_conditions is not None and not base_conditions:
+                phase["conditions"] = copy.deepcopy(base_conditions)
+            condition_lines.clear()
+
+    def new_set(set_index):
+        base_set = _index(base_sets, len(sets))
+        strategy_set = {"set_index": set_index, "phases": []}
+        if base_set:
+            strategy_set.update((k, copy.deepcopy(v)) for k, v in base_set.items() if k not in strategy_set)
+        sets.append(strategy_set)
+        return strategy_set, base_set
+
+    def finish_phase():
+        if phase is None:
+            return
+        phase.setdefault("conditions", {})
+        # An empty Positions section is not rendered; keep the base's empty list
+        if "positions" not in phase and base_phase and base_phase.get("positions") == []:
+            phase["positions"] = []
+
+    for number, raw in enumerate(text.splitlines(), 1):
+        stripped = raw.strip()
+        if not stripped:
+            continue
+        match = _SET_RE.match(stripped)
+        if match:
+            finish_conditions()
+            finish_phase()
+            strategy_set, base_set = new_set(int(match.group(1)) - DIALECT.set_index_offset)
+            phase = base_phase = section = None
+            continue
+        if _RULE_RE.match(stripped):
+            continue
+        match = _PHASE_RE.match(stripped)
+        if match:
+            finish_conditions()
+            finish_phase()
+            if strategy_set is None:
+                strategy_set, base_set = new_set(DIALECT.default_set_index)
+            base_phase = _index(base_set.get("phases") if base_set else None, len(strategy_set["phases"]))
+            phase = {"phase_type": match.group(1).strip()}
+            if base_phase:
+                phase.update((k, copy.deepcopy(v)) for k, v in base_phase.items()
+                             if k not in ("phase_type", "conditions", "positions"))
+            strategy_set["phases"].append(phase)
+            section = None
+            continue
+        if phase is None:
+            raise TextParseError(f"expected 'Set #n' or 'Phase: ...', got {stripped!r}", number)
+        if stripped == "Conditions:":
+            finish_conditions()
+            section = "conditions"
+        elif stripped == "Positions:":
+            finish_conditions()
+            section = "positions"
+            phase["positions"] = []
+        elif section == "conditions":
+            if stripped != "(None)":
+                condition_lines.append((number, raw))
+        elif section == "positions":
+            base_position = _index(base_phase.get("positions") if base_phase else None, len(phase["positions"]))
+            phase["positions"].append(parser.position(stripped, base_position, number))
+        else:
+            raise TextParseError(f"expected 'Conditions:' or 'Positions:', got {stripped!r}", number)
+    finish_conditions()
+    finish_phase()
+    return {"strategy_sets": sets}